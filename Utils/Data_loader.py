@@ -6,12 +6,14 @@ from pathlib import Path
 from spacy.tokens import DocBin
 from tqdm import tqdm
 import json
-from tools import create_spacy_files
+from tools import create_spacy_files, stream_spacy_files, clean_corpus
+from readers import read_records
 
 
 def load_and_export_ner_data(
     exclude_entities=["UNKNOWN","Graduation Year","Years of Experience"],
     split_skill_entities=True,
+    n_process=1,
 ):
     """
     Enhanced resume NER data loader with advanced cleaning and analysis.
@@ -28,7 +30,52 @@ def load_and_export_ner_data(
         exclude_entities=exclude_entities,
         split_skill_entities=split_skill_entities,
         train_ratio=0.8,
+        n_process=n_process,
     )
     return train_data, val_data
 
 
+
+
+def stream_and_export_ner_data(
+    exclude_entities=["UNKNOWN","Graduation Year","Years of Experience"],
+    split_skill_entities=True,
+    shard_size=1000,
+    seed=0,
+):
+    """
+    Constant-memory counterpart of load_and_export_ner_data for large corpora.
+    Writes sharded train/dev DocBins instead of returning the records.
+    """
+    return stream_spacy_files(
+        path1=r"C:\ML\CV-Parsing\Data\Entity Recognition in Resumes.json",
+        path2=r'C:\ML\CV-Parsing\Data\training\train_data.json',
+        train_dir=r"C:\ML\CV-Parsing\Data\train_shards",
+        dev_dir=r"C:\ML\CV-Parsing\Data\dev_shards",
+        exclude_entities=exclude_entities,
+        split_skill_entities=split_skill_entities,
+        train_ratio=0.8,
+        seed=seed,
+        shard_size=shard_size,
+    )
+
+
+def load_ner_records(
+    path1,
+    path2,
+    exclude_entities=["UNKNOWN","Graduation Year","Years of Experience"],
+    split_skill_entities=True,
+    train_ratio=0.8,
+    seed=0,
+):
+    """
+    Parse, clean and split both corpora without writing any DocBin.
+    The shuffle is seeded so the split is reproducible (and cacheable).
+    """
+    data = list(read_records(path1, "dataturks", exclude_entities=exclude_entities,
+                             split_skill_entities=split_skill_entities))
+    data.extend(read_records(path2, "spacy_json", exclude_entities=exclude_entities))
+    random.Random(seed).shuffle(data)
+    data = clean_corpus(data)
+    split = int(len(data) * train_ratio)
+    return data[:split], data[split:]
@@ -1,197 +1,249 @@
 import random
 from typing import List, Tuple, Dict
-from tools import filter_non_overlapping_spans , clean_entities
-import re
-from faker import Faker
+from tools import filter_non_overlapping_spans , clean_entities, clean_corpus
+from docbin_builder import write_docbin
+from readers import Record
+from span_store import SpanCorpus
+from rebalancing import plan_augmentation_budget
+from entity_variations import SUBSTITUTION_RATES, extract_entities_of_type, faker
+from variation_pool import build_variation_pools
 import json
 import logging
 import spacy
 from spacy.tokens import DocBin
 from tqdm import tqdm
-faker = Faker()
 
+# Synthetic examples added by augment_and_balance_data, as fractions of the corpus size
+SYNTHETIC_RATIOS = {"context": 0.5, "skills": 0.4, "lookalike": 0.2}
+
+# Entity boundary patterns used by generate_boundary_edge_cases
+BOUNDARY_PATTERNS = {
+    "Email Address": [
+        ["Contact: ", ""],
+        ["Email: ", ""],
+        ["", " (preferred contact)"],
+        ["", " | Phone:"]
+    ],
+    "Phone": [
+        ["Phone: ", ""],
+        ["Call: ", ""],
+        ["Tel: ", ""],
+        ["", " (mobile)"],
+        ["", " (cell)"]
+    ],
+    "Name": [
+        ["Candidate: ", ""],
+        ["Applicant: ", ""],
+        ["", ", Applicant"],
+        ["", " - Resume"]
+    ],
+    "Designation": [
+        ["Role: ", ""],
+        ["Position: ", ""],
+        ["", " role"],
+        ["Current: ", ""]
+    ],
+    "Companies worked at": [
+        ["Company: ", ""],
+        ["Employer: ", ""],
+        ["", " (employer)"],
+        ["", ", Inc."]
+    ],
+    "Degree": [
+        ["Qualification: ", ""],
+        ["Education: ", ""],
+        ["", " (completed)"],
+        ["", " with honors"]
+    ],
+    "College Name": [
+        ["School: ", ""],
+        ["University: ", ""],
+        ["", " (Graduated)"],
+        ["", ", accredited"]
+    ],
+    "Location": [
+        ["Based in: ", ""],
+        ["Located at: ", ""],
+        ["", " area"],
+        ["", " region"]
+    ]
+}
+
+
+def substitute_entities(text, entities, rewrite):
+    """
+    Rebuild `text` with entity substitutions in a single pass.
+    `rewrite(label, entity_text)` returns None to keep an entity, or a
+    (prefix, new_text, suffix) triple to put in its place. The new document is
+    assembled from a list of slices joined once, and the shifted entity offsets
+    are computed in the same pass. Entities are visited by start position; an
+    entity overlapping an already rewritten one is only shifted.
+    """
+    pieces = []
+    aug_entities = []
+    cursor = 0
+    offset = 0
+    # Sort entities by position
+    for start, end, label in sorted(entities, key=lambda x: x[0]):
+        replacement = None if start < cursor else rewrite(label, text[start:end])
+        if replacement is None:
+            aug_entities.append((start + offset, end + offset, label))
+            continue
+        prefix, new_text, suffix = replacement
+        pieces.append(text[cursor:start])
+        pieces.append(prefix)
+        pieces.append(new_text)
+        pieces.append(suffix)
+        new_start = start + offset + len(prefix)
+        aug_entities.append((new_start, new_start + len(new_text), label))
+        offset += len(prefix) + len(new_text) + len(suffix) - (end - start)
+        cursor = end
+    if not pieces:
+        return text, aug_entities
+    pieces.append(text[cursor:])
+    return "".join(pieces), aug_entities
+
+
+
+def has_target_entity(entities):
+    """True if any entity has a label that augment_document can swap."""
+    return any(label in SUBSTITUTION_RATES for _, _, label in entities)
+
+
+def augment_document(text, entities, variations, rng=random):
+    """
+    Create one augmented copy of a document by swapping target entities for
+    random variations from `variations` (see entity_variations.build_variations).
+    """
+    def swap_entity(label, entity_text):
+        # Generate variations for target entity types
+        pool = variations.get(label)
+        if pool is None:
+            return None
+        # VariationPools carry their own swap rate and (possibly weighted) sampler
+        rate = getattr(pool, "swap_rate", None)
+        if rng.random() < (SUBSTITUTION_RATES[label] if rate is None else rate):
+            replacement = pool.sample(rng) if hasattr(pool, "sample") else rng.choice(pool)
+            return "", replacement, ""
+        # For other entities, keep them as is
+        return None
+
+    return Record(*substitute_entities(text, entities, swap_entity))
+
+
+def boundary_edge_case(text, entities, rng=random):
+    """
+    Create one copy of a document with boundary noise around its entities.
+    """
+    def add_boundary(label, entity_text):
+        # Apply boundary modification 50% of the time
+        if label in BOUNDARY_PATTERNS and rng.random() < 0.5:
+            # Choose a boundary pattern
+            prefix, suffix = rng.choice(BOUNDARY_PATTERNS[label])
+            return prefix, entity_text, suffix
+        # Keep entity as is
+        return None
 
+    return Record(*substitute_entities(text, entities, add_boundary))
 
-def augment_and_balance_data(train_data):
+
+def augment_and_balance_data(train_data, n_process=1):
     """
     Apply data augmentation and balancing techniques to the training data.
     Focus on improving recall for entities like Designation, Companies worked at, and Degree.
     """
     logging.info("Starting data augmentation and balancing...")
-    nlp = spacy.blank("en")
     
     # Analyze current entity distribution
     entity_counts = count_entities_by_type(train_data)
     logging.info(f"Initial entity distribution: {entity_counts}")
     
-    # Augment entities with low recall
-    augmented_entities = augment_entities(train_data, factor=30)
+    # Augment entities with low recall, only as many replicas per document as the rare labels need;
+    # one budget covers the swap and boundary replicas and the synthetic / look-alike examples
+    n_synthetic = {kind: int(ratio * len(train_data)) for kind, ratio in SYNTHETIC_RATIOS.items()}
+    plans, _ = plan_augmentation_budget(
+        train_data, SUBSTITUTION_RATES, budget=3.0, target_ratio=0.5,
+        n_synthetic=n_synthetic["context"] + n_synthetic["skills"] + 2 * n_synthetic["lookalike"])
+    variations = build_variation_pools(train_data, faker, weighting="rarity", label_rarity=True)
+    augmented_entities = augment_entities(train_data, replica_plan=plans["swap"], boundary_plan=plans["boundary"],
+                                          context_count=n_synthetic["context"], variations=variations)
     
     # Add augmented entities to training data
     train_data.extend(augmented_entities)
     
     # Generate synthetic examples focused on skills
     skills = extract_entities_of_type(train_data, "Skills")
-    synthetic_skills_examples = generate_synthetic_skills_examples(skills, count=100)
+    synthetic_skills_examples = generate_synthetic_skills_examples(skills, count=n_synthetic["skills"])
     train_data.extend(synthetic_skills_examples)
     
     # Introduce look-alike non-entities to improve precision
     lookalikes = []
-    for _ in range(50):
-        lookalikes.append((
-            generate_email_lookalike(),
-            {"entities": []}
-        ))
-        lookalikes.append((
-            generate_college_lookalike(),
-            {"entities": []}
-        ))
+    for _ in range(n_synthetic["lookalike"]):
+        lookalikes.append(Record(generate_email_lookalike(), []))
+        lookalikes.append(Record(generate_college_lookalike(), []))
     train_data.extend(lookalikes)
     
     # Shuffle the training data to mix original and augmented examples
     random.shuffle(train_data)
     # Final entity distribution after augmentation
     final_entity_counts = count_entities_by_type(train_data)
-    train_data = [(text, {"entities": clean_entities(text,entities["entities"] )}) for text, entities in train_data]
+    random.shuffle(train_data)
+    # Store the augmented corpus column-wise from here on
+    train_data = clean_corpus(SpanCorpus.from_records(train_data))
     logging.info(f"Final entity distribution after augmentation: {final_entity_counts}")
     
     logging.info(f"Total training samples after augmentation: {len(train_data)}")
-
-
-    random.shuffle(train_data)
+    logging.info(f"Span store size: {train_data.nbytes / 1e6:.1f} MB for {train_data.n_spans} spans")
     
     train_path = r"C:\ML\CV-Parsing\Data\augmented_training_data.spacy"
     
-    doc_bin = DocBin()
-    for text, entities in tqdm(train_data, desc=f"Processing {train_path}"):
-        doc = nlp.make_doc(text)
-        spans = []
-        for start, end, label in entities["entities"]:
-            span = doc.char_span(start, end, label=label, alignment_mode="strict")
-            if span is not None:
-                spans.append(span)
-        filtered_spans = filter_non_overlapping_spans(spans)
-        doc.ents = filtered_spans
-        doc_bin.add(doc)
-    doc_bin.to_disk(train_path)
+    write_docbin(train_data, train_path, n_process=n_process)
     print(f"Saved augmented train to {train_path}")
 
     with open(r"C:\ML\CV-Parsing\Data\augmented_train_data.json", "w", encoding="utf-8") as f:
-        json.dump([{"text": text, "entities": [[s, e, l] for s, e, l in anns["entities"]]} 
-            for text, anns in train_data], f, indent=2)
+        json.dump([{"text": text, "entities": [[s, e, l] for s, e, l in entities]} 
+            for text, entities in train_data], f, indent=2)
     
     return train_data
 
 
 
 
-def augment_entities(data, factor=6):
+def augment_entities(data, factor=6, replica_plan=None, boundary_plan=None, context_count=None, variations=None):
     """
     Focus on improving recall for entities like Designation, Companies worked at, and Degree
     by generating more diverse examples and contextual variations.
+    `variations` are prebuilt replacement pools (label -> VariationPool, see
+    variation_pool.build_variation_pools), so callers build them once per corpus;
+    without them the pools are built from `data`.
+    `replica_plan` and `boundary_plan` (see rebalancing.plan_augmentation_budget) give the
+    number of swap and boundary replicas per document instead of `factor` copies of
+    every document; `context_count` synthetic context examples are added (default factor * 4).
     """
     logging.info("Augmenting entities with low recall (Designation, Companies worked at, Degree)")
     augmented = []
-    
-    # Extract all examples of these entity types
-    designations = extract_entities_of_type(data, "Designation")
-    companies = extract_entities_of_type(data, "Companies worked at")
-    degrees = extract_entities_of_type(data, "Degree")
-    skills= extract_entities_of_type(data, "Skills")
-    
-    # Generate position title variations
-    designation_variations = generate_designation_variations(designations)
-    
-    # Generate company name variations
-    company_variations = generate_company_variations(companies)
-    
-    # Generate degree variations
-    degree_variations = generate_degree_variations(degrees)
 
-    # Expand skills vocabulary
-    skills_variations = expand_skills_vocabulary(skills)
-    
+    if variations is None:
+        variations = build_variation_pools(data, faker)
+    if replica_plan is None:
+        replica_plan = [factor if has_target_entity(entities) else 0 for _, entities in data]
+
     # Apply entity swapping and contextual enrichment
-    for text, annotations in tqdm(data, desc="Augmenting entities"):
-        entities = annotations["entities"]
-        has_target_entity = any(label in ["Designation", "Companies worked at", "Degree", "Skills"] 
-                               for _, _, label in entities)
-        
-        if not has_target_entity:
-            continue
-            
+    for (text, entities), n_replicas in tqdm(zip(data, replica_plan), total=len(data), desc="Augmenting entities"):
         # Create multiple augmented versions
-        for _ in range(factor):
-            aug_text = text
-            aug_entities = []
-            offset = 0
-            
-            # Sort entities by position
-            sorted_entities = sorted(entities, key=lambda x: x[0])
-            
-            for start, end, label in sorted_entities:
-                entity_text = text[start:end]
-                
-                # Generate variations for target entity types
-                if label == "Designation":
-                    if random.random() < 0.8:  # 80% chance to substitute
-                        new_designation = random.choice(designation_variations)
-                        before = aug_text[:start + offset]
-                        after = aug_text[end + offset:]
-                        aug_text = before + new_designation + after
-                        
-                        new_offset = offset + len(new_designation) - len(entity_text)
-                        aug_entities.append((start + offset, start + offset + len(new_designation), label))
-                        offset = new_offset
-                        continue
-                
-                elif label == "Companies worked at":
-                    if random.random() < 0.7:  # 70% chance to substitute
-                        new_company = random.choice(company_variations)
-                        before = aug_text[:start + offset]
-                        after = aug_text[end + offset:]
-                        aug_text = before + new_company + after
-                        
-                        new_offset = offset + len(new_company) - len(entity_text)
-                        aug_entities.append((start + offset, start + offset + len(new_company), label))
-                        offset = new_offset
-                        continue
-                        
-                elif label == "Degree":
-                    if random.random() < 0.8:  # 80% chance to substitute
-                        new_degree = random.choice(degree_variations)
-                        before = aug_text[:start + offset]
-                        after = aug_text[end + offset:]
-                        aug_text = before + new_degree + after
-                        
-                        new_offset = offset + len(new_degree) - len(entity_text)
-                        aug_entities.append((start + offset, start + offset + len(new_degree), label))
-                        offset = new_offset
-                        continue
-                elif label == "Skills":
-                    if random.random() < 0.6:  # 60% chance to substitute
-                        new_skill = random.choice(skills_variations)
-                        before = aug_text[:start + offset]
-                        after = aug_text[end + offset:]
-                        aug_text = before + new_skill + after
-                        
-                        new_offset = offset + len(new_skill) - len(entity_text)
-                        aug_entities.append((start + offset, start + offset + len(new_skill), label))
-                        offset = new_offset
-                        continue
-                
-                # For other entities, keep them as is
-                aug_entities.append((start + offset, end + offset, label))
-            
-            augmented.append((aug_text, {"entities": aug_entities}))
+        for _ in range(n_replicas):
+            augmented.append(augment_document(text, entities, variations))
             
     # Generate synthetic examples with rich context for these entities
 
 
-    synthetic_examples = generate_synthetic_context_examples(factor * 4)
+    synthetic_examples = generate_synthetic_context_examples(factor * 4 if context_count is None else context_count)
     augmented.extend(synthetic_examples)
-    augmentation=generate_boundary_edge_cases(data, factor=6)
-    augmented.extend(augmentation)
+    if boundary_plan is None:
+        augmented.extend(generate_boundary_edge_cases(data, factor=factor))
+    else:
+        for (text, entities), n_replicas in zip(data, boundary_plan):
+            augmented.extend(boundary_edge_case(text, entities) for _ in range(n_replicas))
     logging.info(f"Created {len(augmented)} examples of entities")
     return augmented
 
@@ -201,228 +253,7 @@ def augment_entities(data, factor=6):
 
 
 
-def generate_designation_variations(designations):
-    """
-    Generate variations of job titles and designations to improve recall.
-    """
-    base_titles = set()
-    for designation in designations:
-        # Extract root title
-        base = re.sub(r'^(Senior|Junior|Lead|Principal|Chief|Associate|Assistant)\s+', '', designation)
-        base = re.sub(r'\s+(I|II|III|IV|V)$', '', base)
-        if len(base) > 3:  # Avoid too short titles
-            base_titles.add(base)
-    
-    variations = []
-    prefixes = ['Senior', 'Junior', 'Lead', 'Principal', 'Chief', 'Associate', 'Assistant', '']
-    suffixes = [' I', ' II', ' III', '', ' Manager', ' Lead']
-    
-    for base in base_titles:
-        for prefix in prefixes:
-            for suffix in suffixes:
-                variation = f"{prefix} {base}{suffix}".strip()
-                if variation and variation != base:
-                    variations.append(variation)
-    
-    # Add completely new designations
-    additional_titles = [
-        "Machine Learning Engineer", "Cloud Architect", "DevOps Specialist",
-        "AI Researcher", "Data Engineer", "Blockchain Developer",
-        "Frontend Engineer", "Backend Developer", "Full Stack Engineer",
-        "Site Reliability Engineer", "UX Designer", "UI Developer",
-        "Product Owner", "Scrum Master", "Technical Program Manager",
-        "Solutions Architect", "Systems Analyst", "Network Administrator",
-        "Information Security Analyst", "Database Administrator"
-    ]
-    
-    variations.extend(additional_titles)
-    
-    # Add fake but realistic titles from Faker
-    for _ in range(50):
-        variations.append(faker.job())
-    
-    return list(set(variations))
-
-
-def generate_company_variations(companies):
-    """
-    Generate company name variations to improve recall.
-    """
-    variations = []
-    suffixes = [' Inc.', ' LLC', ' Ltd.', ' Corporation', ' Corp.', ' Company', 
-                ' Technologies', ' Group', ' Solutions', ' International', '']
-    
-    for company in companies:
-        # Remove existing suffix if any
-        base = re.sub(r'\s+(Inc|LLC|Ltd|Corporation|Corp|Company|Technologies|Group|Solutions|International)\.?$', '', company)
-        
-        # Add different suffixes
-        for suffix in suffixes:
-            if not company.endswith(suffix):
-                variation = f"{base}{suffix}".strip()
-                if variation and variation != company:
-                    variations.append(variation)
-    
-    # Add completely new company names
-    tech_companies = [
-        "Quantum Computing", "Neural Dynamics", "Cloud Solutions",
-        "Data Insights", "Blockchain Innovations", "Tech Frontiers",
-        "Digital Transformation", "AI Systems", "Smart Analytics",
-        "Future Technologies", "Cyber Security Solutions", "Virtual Systems",
-        "Global Software", "Mobile Innovations", "Enterprise Solutions"
-    ]
-    
-    for company in tech_companies:
-        for suffix in suffixes:
-            variations.append(f"{company}{suffix}".strip())
-    
-    # Add fake but realistic company names from Faker
-    for _ in range(50):
-        variations.append(faker.company())
-    
-    return list(set(variations))
-
-
-def generate_degree_variations(degrees):
-    """
-    Generate degree variations to improve recall.
-    """
-    variations = []
-    
-    # Common degree types and their variations
-    degree_types = {
-        "Bachelor": ["Bachelor of", "Bachelor's in", "Bachelor's degree in", "B.S. in", "B.A. in", "BS in", "BA in"],
-        "Master": ["Master of", "Master's in", "Master's degree in", "M.S. in", "M.A. in", "MS in", "MA in"],
-        "PhD": ["PhD in", "Ph.D. in", "Doctorate in", "Doctoral degree in"],
-        "Associate": ["Associate of", "Associate's in", "A.S. in", "A.A. in"]
-    }
-    
-    # Common fields of study
-    fields = [
-        "Computer Science", "Information Technology", "Software Engineering", 
-        "Data Science", "Artificial Intelligence", "Business Administration",
-        "Information Systems", "Electrical Engineering", "Computer Engineering",
-        "Mathematics", "Statistics", "Economics", "Finance", "Marketing",
-        "Management", "Human Resources", "Psychology", "Communications"
-    ]
-    
-    # Generate variations
-    for degree_type, variations_list in degree_types.items():
-        for variation in variations_list:
-            for field in fields:
-                variations.append(f"{variation} {field}")
-    
-    # Add existing degrees with slight modifications
-    for degree in degrees:
-        # Try different abbreviations and formatting
-        degree = degree.replace("Bachelor of", "B.S. in")
-        degree = degree.replace("Master of", "M.S. in")
-        variations.append(degree)
-        
-        # Add "honors" or other qualifiers
-        if "Bachelor" in degree or "B.S." in degree or "B.A." in degree:
-            variations.append(f"{degree} with Honors")
-            variations.append(f"{degree} (Honours)")
-    
-    return list(set(variations))
-
-
-def expand_skills_vocabulary(existing_skills):
-    """
-    Expand skills vocabulary with variations and additional skills.
-    """
-    expanded = set(existing_skills)
-    
-    # Technical skills
-    programming_languages = [
-        "Python", "Java", "JavaScript", "TypeScript", "C++", "C#", "Go", "Rust",
-        "Swift", "Kotlin", "PHP", "Ruby", "Scala", "R", "MATLAB", "Perl", "Shell"
-    ]
-    
-    web_technologies = [
-        "HTML", "CSS", "React", "Angular", "Vue.js", "Node.js", "Express.js", "Django",
-        "Flask", "Spring Boot", "ASP.NET", "jQuery", "Bootstrap", "Tailwind CSS", 
-        "GraphQL", "REST API", "SOAP", "WebSockets"
-    ]
-    
-    databases = [
-        "SQL", "MySQL", "PostgreSQL", "MongoDB", "SQLite", "Oracle", "SQL Server",
-        "Redis", "Cassandra", "DynamoDB", "Firebase", "Neo4j", "Elasticsearch"
-    ]
-    
-    cloud_technologies = [
-        "AWS", "Azure", "Google Cloud", "Docker", "Kubernetes", "Terraform",
-        "Jenkins", "GitLab CI/CD", "GitHub Actions", "Ansible", "Puppet", "Chef",
-        "Serverless", "Lambda", "S3", "EC2", "Azure Functions", "Cloud Run"
-    ]
-    
-    data_science = [
-        "Machine Learning", "Deep Learning", "NLP", "Computer Vision", "Data Analysis",
-        "Statistical Modeling", "TensorFlow", "PyTorch", "scikit-learn", "pandas",
-        "NumPy", "SciPy", "Matplotlib", "Tableau", "Power BI", "Big Data", "Hadoop",
-        "Spark", "Airflow", "Jupyter", "Neural Networks"
-    ]
-    
-    other_tech = [
-        "Git", "Agile", "Scrum", "Kanban", "Jira", "Confluence", "DevOps", "CI/CD",
-        "Test-Driven Development", "Microservices", "RESTful API", "OOP", "Linux",
-        "Unix", "Windows Server", "Networking", "Security", "A/B Testing" , "Excel" , "UI/UX Design"
-        , "Prototyping", "Figma", "Adobe XD" ,"R"
-    ]
-    
-    # Add all these skills
-    expanded.update(programming_languages)
-    expanded.update(web_technologies)
-    expanded.update(databases)
-    expanded.update(cloud_technologies)
-    expanded.update(data_science)
-    expanded.update(other_tech)
-    
-    # Create variations with frameworks and tools
-    variations = []
-    for skill in ["Python", "JavaScript", "Java", "C#"]:
-        if skill == "Python":
-            variations.extend([
-                "Python Django", "Python Flask", "Python FastAPI", "Python Pandas",
-                "Python scikit-learn", "Python Data Analysis", "Python Automation"
-            ])
-        elif skill == "JavaScript":
-            variations.extend([
-                "JavaScript React", "JavaScript Node.js", "JavaScript Angular",
-                "JavaScript Vue", "JavaScript Express", "JavaScript Front-end"
-            ])
-        elif skill == "Java":
-            variations.extend([
-                "Java Spring", "Java Hibernate", "Java J2EE", "Java Android",
-                "Java Microservices", "Java Backend Development"
-            ])
-        elif skill == "C#":
-            variations.extend([
-                "C# .NET", "C# ASP.NET", "C# Unity", "C# WPF", "C# Xamarin",
-                "C# Entity Framework"
-            ])
-    
-    expanded.update(variations)
-    
-    # Add specific versions
-    version_variations = []
-    for skill in ["Python", "Java", "JavaScript", "React", "Angular"]:
-        if skill == "Python":
-            version_variations.extend(["Python 3.8", "Python 3.9", "Python 3.10"])
-        elif skill == "Java":
-            version_variations.extend(["Java 11", "Java 17", "Java 8"])
-        elif skill == "JavaScript":
-            version_variations.extend(["JavaScript ES6", "JavaScript ES2022"])
-        elif skill == "React":
-            version_variations.extend(["React 16", "React 17", "React 18"])
-        elif skill == "Angular":
-            version_variations.extend(["Angular 12", "Angular 13", "Angular 14"])
-    
-    expanded.update(version_variations)
-    
-    return list(expanded)
-
-def generate_synthetic_skills_examples(skills, count=50):
+def generate_synthetic_skills_examples(skills, count=50, rng=random):
     """
     Generate synthetic examples focused on skills.
     """
@@ -440,13 +271,13 @@ def generate_synthetic_skills_examples(skills, count=50):
     
     for _ in range(count):
         # Select random skills
-        selected_skills = random.sample(skills, k=20) if len(skills) >= 20 else skills
+        selected_skills = rng.sample(skills, k=20) if len(skills) >= 20 else skills
         
         # Choose a template
-        template = random.choice(templates)
+        template = rng.choice(templates)
         
         # Choose a separator
-        separator = random.choice([", ", " | ", "; ", "\n- ", ", and "])
+        separator = rng.choice([", ", " | ", "; ", "\n- ", ", and "])
         
         # Create the skills list
         skills_list = separator.join(selected_skills)
@@ -462,11 +293,11 @@ def generate_synthetic_skills_examples(skills, count=50):
                 entities.append((skill_pos, skill_pos + len(skill), "Skills"))
         
         if entities:
-            examples.append((text, {"entities": entities}))
+            examples.append(Record(text, entities))
     
     return examples
 
-def generate_synthetic_context_examples(count=100):
+def generate_synthetic_context_examples(count=100, rng=random):
     """
     Generate synthetic resume examples with rich context around entities.
     """
@@ -485,24 +316,24 @@ def generate_synthetic_context_examples(count=100):
     
     # Generate synthetic examples
     for _ in range(count):
-        template = random.choice(templates)
+        template = rng.choice(templates)
         
         # Generate entities
-        designation = random.choice([
+        designation = rng.choice([
             "Software Engineer", "Data Scientist", "Project Manager", "Product Manager",
             "Senior Developer", "Technical Lead", "Engineering Manager", "CTO",
             "System Architect", "DevOps Engineer", "Frontend Developer", "Backend Engineer",
             "Full Stack Developer", "Machine Learning Engineer", "UI/UX Designer"
         ])
         
-        company = random.choice([
+        company = rng.choice([
             "Google", "Microsoft", "Amazon", "Apple", "Facebook", "Netflix", 
             "IBM", "Oracle", "Intel", "Salesforce", "Adobe", "Twitter",
             "LinkedIn", "Uber", "Airbnb", "Slack", "Spotify", "PayPal",
             "Dropbox", "Square", "Stripe", "Twilio", "Atlassian"
         ])
         
-        degree = random.choice([
+        degree = rng.choice([
             "Bachelor of Science in Computer Science",
             "Master of Science in Data Science",
             "MBA in Technology Management",
@@ -534,7 +365,7 @@ def generate_synthetic_context_examples(count=100):
             entities.append((degree_pos, degree_pos + len(degree), "Degree"))
         
         if entities:
-            synthetic_examples.append((text, {"entities": entities}))
+            synthetic_examples.append(Record(text, entities))
     
     return synthetic_examples
 
@@ -546,106 +377,18 @@ def generate_boundary_edge_cases(data, factor=1):
     logging.info("Generating boundary edge cases")
     augmented = []
     
-    # Entity boundary patterns
-    boundary_patterns = {
-        "Email Address": [
-            ["Contact: ", ""],
-            ["Email: ", ""],
-            ["", " (preferred contact)"],
-            ["", " | Phone:"]
-        ],
-        "Phone": [
-            ["Phone: ", ""],
-            ["Call: ", ""],
-            ["Tel: ", ""],
-            ["", " (mobile)"],
-            ["", " (cell)"]
-        ],
-        "Name": [
-            ["Candidate: ", ""],
-            ["Applicant: ", ""],
-            ["", ", Applicant"],
-            ["", " - Resume"]
-        ],
-        "Designation": [
-            ["Role: ", ""],
-            ["Position: ", ""],
-            ["", " role"],
-            ["Current: ", ""]
-        ],
-        "Companies worked at": [
-            ["Company: ", ""],
-            ["Employer: ", ""],
-            ["", " (employer)"],
-            ["", ", Inc."]
-        ],
-        "Degree": [
-            ["Qualification: ", ""],
-            ["Education: ", ""],
-            ["", " (completed)"],
-            ["", " with honors"]
-        ],
-        "College Name": [
-            ["School: ", ""],
-            ["University: ", ""],
-            ["", " (Graduated)"],
-            ["", ", accredited"]
-        ],
-        "Location": [
-            ["Based in: ", ""],
-            ["Located at: ", ""],
-            ["", " area"],
-            ["", " region"]
-        ]
-    }
-    
     for _ in range(factor):
-        for text, annotations in tqdm(data, desc="Creating boundary edge cases"):
-            entities = annotations["entities"]
+        for text, entities in tqdm(data, desc="Creating boundary edge cases"):
             
             # Create a new example with boundary challenges
-            aug_text = text
-            aug_entities = []
-            offset = 0
-            
-            # Sort entities by position
-            sorted_entities = sorted(entities, key=lambda x: x[0])
-            
-            for start, end, label in sorted_entities:
-                entity_text = text[start:end]
-                
-                # Apply boundary modification 50% of the time
-                if label in boundary_patterns and random.random() < 0.5:
-                    # Choose a boundary pattern
-                    prefix, suffix = random.choice(boundary_patterns[label])
-                    
-                    # Apply the pattern
-                    modified_text = prefix + entity_text + suffix
-                    
-                    # Replace in text
-                    before = aug_text[:start + offset]
-                    after = aug_text[end + offset:]
-                    aug_text = before + modified_text + after
-                    
-                    # Update entity position
-                    new_start = start + offset + len(prefix)
-                    new_end = new_start + len(entity_text)
-                    aug_entities.append((new_start, new_end, label))
-                    
-                    # Update offset
-                    offset += len(modified_text) - len(entity_text)
-                else:
-                    # Keep entity as is
-                    aug_entities.append((start + offset, end + offset, label))
-            
-            augmented.append((aug_text, {"entities": aug_entities}))
+            augmented.append(boundary_edge_case(text, entities))
     
     logging.info(f"Created {len(augmented)} boundary edge cases")
     return augmented
 
 
 
-def generate_email_lookalike():
+def generate_email_lookalike(rng=random):
     """
     Generate text that looks like email but isn't valid.
     """
@@ -659,9 +402,9 @@ def generate_email_lookalike():
         "info(at)company.com",
         "email-address.com"
     ]
-    return random.choice(almost_emails)
+    return rng.choice(almost_emails)
 
-def generate_college_lookalike():
+def generate_college_lookalike(rng=random):
     """
     Generate text that looks like college name but shouldn't be labeled as one.
     """
@@ -675,28 +418,18 @@ def generate_college_lookalike():
         "Corporate University",
         "The Knowledge Hub"
     ]
-    return random.choice(almost_colleges)
-
-
-def extract_entities_of_type(data, entity_type):
-    """
-    Extract all instances of a specific entity type from the data.
-    """
-    entities = []
-    for text, annotations in data:
-        for start, end, label in annotations["entities"]:
-            if label == entity_type:
-                entities.append(text[start:end])
-    return entities
+    return rng.choice(almost_colleges)
 
 
 def count_entities_by_type(data):
     """
     Count entities by type in the data.
     """
+    if isinstance(data, SpanCorpus):
+        return data.count_by_label()
     counts = {}
-    for text, annotations in data:
-        for start, end, label in annotations["entities"]:
+    for text, entities in data:
+        for start, end, label in entities:
             if label not in counts:
                 counts[label] = 0
             counts[label] += 1
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import os
+import random
+from collections import Counter
+
+from faker import Faker
+from tqdm import tqdm
+
+from augmentation import (
+    augment_document,
+    boundary_edge_case,
+    generate_college_lookalike,
+    generate_email_lookalike,
+    generate_synthetic_context_examples,
+    generate_synthetic_skills_examples,
+    has_target_entity,
+)
+from docbin_builder import build_docbin_shards
+from pool_utils import chunked, imap_bounded, worker_pool, worker_state
+from readers import Record, read_records
+from tools import clean_entities
+from variation_pool import build_variation_pools
+
+# Per-document augmentation strategies, each producing one replica from an rng
+STRATEGIES = {
+    "swap": lambda text, entities, variations, rng: augment_document(text, entities, variations, rng),
+    "boundary": lambda text, entities, variations, rng: boundary_edge_case(text, entities, rng),
+}
+
+def derive_seed(master_seed, *keys):
+    """
+    Derive an independent 64-bit seed from the master seed and any JSON-serializable keys.
+    """
+    payload = json.dumps([master_seed, *keys], ensure_ascii=False).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), "big")
+
+
+def fingerprint(text, entities):
+    """
+    Content hash of a source document and its annotations.
+    """
+    payload = json.dumps([text, [list(ent) for ent in entities]], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def make_replica(strategy, text, entities, variations, master_seed, key, replica):
+    """
+    Build replica number `replica` of a document with its own seeded random.Random.
+    The seed depends only on the master seed, the strategy, the document content
+    and the replica index, never on scheduling, so results are reproducible for any
+    worker count or chunking.
+    """
+    rng = random.Random(derive_seed(master_seed, strategy, key, replica))
+    aug_text, aug_entities = STRATEGIES[strategy](text, entities, variations, rng)
+    return Record(aug_text, clean_entities(aug_text, aug_entities))
+
+
+def _augment_chunk(task):
+    """
+    Worker entry point: build all replicas of one chunk of (text, entities, n_replicas) docs.
+    """
+    master_seed, strategy, docs = task
+    records = []
+    for text, entities, n_replicas in docs:
+        key = fingerprint(text, entities)
+        for replica in range(n_replicas):
+            records.append(make_replica(strategy, text, entities, worker_state["variations"],
+                                        master_seed, key, replica))
+    return records
+
+
+def seeded_variation_pools(data, master_seed, gazetteer=None):
+    """Variation pools of `data` built with a Faker seeded from `master_seed`, so they are reproducible."""
+    fake = Faker()
+    fake.seed_instance(derive_seed(master_seed, "variations"))
+    return build_variation_pools(data, fake, gazetteer)
+
+
+def write_jsonl_record(f, record):
+    text, entities = record
+    f.write(json.dumps({"text": text, "entities": [[s, e, l] for s, e, l in entities]},
+                       ensure_ascii=False) + "\n")
+
+
+def synthetic_records(variations, master_seed, context_count, skills_count, lookalike_count):
+    """
+    Synthetic context / skills / look-alike examples. They do not depend on a source
+    document, so one rng seeded from `master_seed` drives them all.
+    """
+    rng = random.Random(derive_seed(master_seed, "synthetic"))
+    synthetic = generate_synthetic_context_examples(context_count, rng)
+    synthetic.extend(generate_synthetic_skills_examples(variations["Skills"], skills_count, rng))
+    for _ in range(lookalike_count):
+        synthetic.append(Record(generate_email_lookalike(rng), []))
+        synthetic.append(Record(generate_college_lookalike(rng), []))
+    return [Record(text, clean_entities(text, entities)) for text, entities in synthetic]
+
+
+def schedule_augmentation(
+    data,
+    out_path,
+    master_seed=0,
+    n_process=None,
+    swap_factor=30,
+    boundary_factor=6,
+    replica_plan=None,
+    boundary_plan=None,
+    context_count=None,
+    skills_count=100,
+    lookalike_count=50,
+    chunk_size=64,
+    include_source=True,
+    gazetteer=None,
+    variations=None,
+):
+    """
+    Augment `data` across a process pool and stream the results to a JSONL file.
+    Work is split by (document, replica): every replica gets its own random.Random
+    derived from `master_seed`, and the variation pools are built once from a Faker
+    seeded the same way, so the output is bit-identical whatever `n_process` is.
+    `replica_plan` optionally gives the number of swap replicas per document
+    (aligned with `data`) instead of the flat `swap_factor`, and `boundary_plan`
+    the number of boundary replicas instead of `boundary_factor`. A SkillGazetteer
+    replaces the raw skills pool with its canonical terms. Prebuilt `variations`
+    (label -> VariationPool, see variation_pool.py) skip building the pools.
+    Records are written as: cleaned sources, swap replicas, boundary replicas,
+    then the synthetic context / skills / look-alike examples.
+    """
+    n_process = n_process or os.cpu_count() or 1
+    if variations is None:
+        variations = seeded_variation_pools(data, master_seed, gazetteer)
+    if context_count is None:
+        context_count = swap_factor * 4
+    if replica_plan is None:
+        replica_plan = [swap_factor if has_target_entity(entities) else 0 for _, entities in data]
+    if boundary_plan is None:
+        boundary_plan = [boundary_factor] * len(data)
+    plans = {
+        "swap": replica_plan,
+        "boundary": boundary_plan,
+    }
+    counts = Counter()
+    with open(out_path, "w", encoding="utf-8") as f:
+        if include_source:
+            for text, entities in data:
+                write_jsonl_record(f, Record(text, clean_entities(text, entities)))
+                counts["source"] += 1
+
+        with worker_pool(n_process, variations) as executor:
+            for strategy, plan in plans.items():
+                docs = ((text, entities, n) for (text, entities), n in zip(data, plan) if n)
+                tasks = ((master_seed, strategy, chunk) for chunk in chunked(docs, chunk_size))
+                results = imap_bounded(executor, _augment_chunk, tasks, 2 * n_process)
+                for records in tqdm(results, desc=f"Augmenting ({strategy})"):
+                    for record in records:
+                        write_jsonl_record(f, record)
+                    counts[strategy] += len(records)
+
+        synthetic = synthetic_records(variations, master_seed, context_count, skills_count, lookalike_count)
+        for record in synthetic:
+            write_jsonl_record(f, record)
+        counts["synthetic"] += len(synthetic)
+
+    logging.info(f"Augmented corpus written to {out_path}: {dict(counts)}")
+    return counts
+
+
+def export_augmented_docbin(jsonl_path, out_dir, n_process=None, shard_size=1000):
+    """
+    Convert a scheduler JSONL file into DocBin shards (see build_docbin_shards).
+    """
+    return build_docbin_shards(read_records(jsonl_path, "augmented_jsonl"), out_dir,
+                               prefix="augmented", n_process=n_process, shard_size=shard_size)
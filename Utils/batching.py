@@ -0,0 +1,142 @@
+import itertools
+import logging
+import random
+
+from spacy.tokens import Doc
+from spacy.training import Example
+from spacy.util import minibatch, registry
+
+
+class PaddingStats:
+    """
+    Running padding efficiency of the batches produced so far: real tokens over
+    padded tokens (longest item x batch size), plus how many items were windowed.
+    """
+
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.tokens = 0
+        self.padded_tokens = 0
+        self.windowed = 0
+        self.windows = 0
+
+    def add(self, lengths):
+        self.batches += 1
+        self.items += len(lengths)
+        self.tokens += sum(lengths)
+        self.padded_tokens += max(lengths) * len(lengths)
+
+    @property
+    def efficiency(self):
+        return self.tokens / self.padded_tokens if self.padded_tokens else 1.0
+
+    def to_dict(self):
+        return {"batches": self.batches, "items": self.items, "tokens": self.tokens,
+                "padded_tokens": self.padded_tokens, "padding_efficiency": round(self.efficiency, 4),
+                "windowed": self.windowed, "windows": self.windows}
+
+
+def window_bounds(doc, max_length):
+    """
+    Token boundaries of consecutive windows of at most `max_length` tokens. Each
+    cut is moved back to the start of the nearest entity or outside token, so
+    entities are not split unless one is longer than a window.
+    """
+    bounds = []
+    start = 0
+    while len(doc) - start > max_length:
+        end = start + max_length
+        cut = end
+        while cut > start + 1 and doc[cut].ent_iob_ == "I":
+            cut -= 1
+        if cut == start + 1:
+            cut = end
+        bounds.append((start, cut))
+        start = cut
+    bounds.append((start, len(doc)))
+    return bounds
+
+
+def window_item(item, max_length):
+    """
+    Split an Example (or Doc) longer than `max_length` tokens into windows. The
+    windows come from the reference doc; the predicted side is sliced the same way
+    when both sides share a tokenization, and rebuilt from the reference tokens otherwise.
+    """
+    if isinstance(item, Doc):
+        return [item[start:end].as_doc() for start, end in window_bounds(item, max_length)]
+    reference, predicted = item.reference, item.predicted
+    same_tokens = len(reference) == len(predicted) and all(
+        ref.idx == pred.idx and len(ref) == len(pred) for ref, pred in zip(reference, predicted))
+    windows = []
+    for start, end in window_bounds(reference, max_length):
+        ref_window = reference[start:end].as_doc()
+        if same_tokens:
+            pred_window = predicted[start:end].as_doc()
+        else:
+            pred_window = Doc(predicted.vocab, words=[t.text for t in ref_window],
+                              spaces=[bool(t.whitespace_) for t in ref_window])
+        windows.append(Example(pred_window, ref_window))
+    return windows
+
+
+def minibatch_by_length_buckets(items, size, buffer=1024, max_length=0, get_length=None, stats=None,
+                                report_every=1000):
+    """
+    Read `buffer` items at a time, sort them by length and cut them into batches
+    whose padded size (longest item x batch size) stays within the token budget
+    `size`, then shuffle the batch order. Items longer than `max_length` tokens
+    (default: `size`) are split into windows instead of being discarded, so long
+    resumes are trained on and short snippets end up in batches of their own.
+    `size` may be an int or a schedule, like spacy.batch_by_padded.v1.
+    """
+    size_ = itertools.repeat(size) if isinstance(size, int) else iter(size)
+    get_length = get_length or len
+    stats = stats if stats is not None else PaddingStats()
+    for outer in minibatch(items, size=buffer):
+        target_size = next(size_)
+        limit = min(max_length or target_size, target_size)
+        sized = []
+        for item in outer:
+            length = get_length(item)
+            if length > limit:
+                windows = window_item(item, limit)
+                stats.windowed += 1
+                stats.windows += len(windows)
+                sized.extend((get_length(window), window) for window in windows)
+            elif length:
+                sized.append((length, item))
+        sized.sort(key=lambda pair: pair[0])
+
+        batches, batch, longest = [], [], 0
+        for length, item in sized:
+            if batch and max(longest, length) * (len(batch) + 1) > target_size:
+                batches.append(batch)
+                batch, longest = [], 0
+            batch.append((length, item))
+            longest = max(longest, length)
+        if batch:
+            batches.append(batch)
+        random.shuffle(batches)
+
+        for batch in batches:
+            stats.add([length for length, _ in batch])
+            if report_every and stats.batches % report_every == 0:
+                logging.info(f"Batcher: {stats.to_dict()}")
+            yield [item for _, item in batch]
+
+
+@registry.batchers("cv_parsing.batch_by_length_buckets.v1")
+def configure_length_bucket_batcher(size, buffer=1024, max_length=0, get_length=None, report_every=1000):
+    """
+    Config entry point for minibatch_by_length_buckets. The returned batcher
+    exposes its PaddingStats as `.stats`.
+    """
+    stats = PaddingStats()
+
+    def batcher(items):
+        return minibatch_by_length_buckets(items, size, buffer, max_length, get_length, stats, report_every)
+
+    batcher.stats = stats
+    return batcher
@@ -0,0 +1,81 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+from overlaps import filter_non_overlapping_offsets
+
+# Boundaries to cut at, best first. Each pattern's match end is where the next chunk starts.
+SECTION_BOUNDARY = re.compile(
+    r"\n\s*\n|\s+(?=(?:WORK EXPERIENCE|EXPERIENCE|EDUCATION|SKILLS|PROJECTS|CERTIFICATIONS|"
+    r"ACHIEVEMENTS|AWARDS|LANGUAGES|SUMMARY|OBJECTIVE|ADDITIONAL INFORMATION)\b)"
+)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;])\s+|\n|\s+(?=[➢•▪●])")
+WORD_BOUNDARY = re.compile(r"\s+")
+
+
+def _last_boundary(boundaries, lo, hi):
+    """Last boundary in (lo, hi] of the best level that has one, or None."""
+    for level in boundaries:
+        i = bisect_right(level, hi) - 1
+        if i >= 0 and level[i] > lo:
+            return level[i]
+    return None
+
+
+def chunk_spans(text, max_chars=2000, overlap=200):
+    """
+    Split `text` into (start, end) character windows of at most `max_chars`.
+    A window is cut at the last section boundary in its second half, else at the
+    last sentence boundary, else between words, else hard at `max_chars`. The next
+    window starts up to `overlap` characters before the cut (on a word boundary) so
+    an entity straddling the cut is seen whole by at least one window.
+    Boundaries are found in one pass per pattern, so the cost is linear in len(text).
+    """
+    n = len(text)
+    if n <= max_chars:
+        return [(0, n)]
+    boundaries = [[m.end() for m in pattern.finditer(text)]
+                  for pattern in (SECTION_BOUNDARY, SENTENCE_BOUNDARY, WORD_BOUNDARY)]
+    words = boundaries[-1]
+    spans = []
+    start = 0
+    while start + max_chars < n:
+        limit = start + max_chars
+        cut = _last_boundary(boundaries, start + max_chars // 2, limit) or limit
+        spans.append((start, cut))
+        next_start = cut
+        if overlap:
+            i = bisect_left(words, cut - overlap)
+            if i < len(words) and start < words[i] < cut:
+                next_start = words[i]
+        start = next_start
+    spans.append((start, n))
+    return spans
+
+
+def pipe_chunked(nlp, items, max_chars=2000, overlap=200, batch_size=32, n_process=1):
+    """
+    Run (text, context) items through nlp.pipe as bounded chunks and yield
+    (text, context, entities) per item, with the chunk entities shifted back to
+    document offsets and stitched with filter_non_overlapping_offsets (an entity
+    found twice in an overlap collapses to one; a truncated copy loses to the
+    longer one). Only chunk offsets travel through nlp.pipe; the full texts wait
+    in a local queue, so memory is bounded by the batches in flight.
+    """
+    in_flight = deque()
+
+    def chunk_stream():
+        for text, context in items:
+            in_flight.append((text, context))
+            spans = chunk_spans(text, max_chars, overlap)
+            for k, (start, end) in enumerate(spans):
+                yield text[start:end], (start, k == len(spans) - 1)
+
+    entities = []
+    for doc, (offset, is_last) in nlp.pipe(chunk_stream(), as_tuples=True,
+                                           batch_size=batch_size, n_process=n_process):
+        entities.extend((offset + ent.start_char, offset + ent.end_char, ent.label_) for ent in doc.ents)
+        if is_last:
+            text, context = in_flight.popleft()
+            yield text, context, filter_non_overlapping_offsets(entities)
+            entities = []
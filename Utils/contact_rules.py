@@ -0,0 +1,109 @@
+import re
+
+import spacy
+from spacy.language import Language
+
+from overlaps import filter_non_overlapping_offsets
+
+# Each field is anchored on a literal or a narrow character class, so the regex
+# engine skips ahead instead of trying every position of a long resume
+# Matched right to left on the reversed text before the "@"
+_EMAIL_LOCAL_REVERSED = re.compile(r"[\w.%+-]{1,64}")
+_EMAIL_DOMAIN = re.compile(r"[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+# Indeed profile links, annotated as the email address in the Dataturks resumes
+_INDEED_LINK = re.compile(r"indeed\.com/r/[\w-]+(?:-\s[\w-]+)*/[0-9a-f]{16}\b")
+_LINK_PREFIX = re.compile(r"(?:https?://)?(?:www\.)?\Z")
+_PHONE = re.compile(r"[+(\d][\d \t.()-]{7,}\d")
+
+EMAIL_LABEL = "Email Address"
+PHONE_LABEL = "Phone"
+CONTACT_LABELS = [EMAIL_LABEL, PHONE_LABEL]
+PHONE_DIGITS = (10, 13)
+
+
+def _find_emails(text, spans):
+    at = text.find("@")
+    while at != -1:
+        local = _EMAIL_LOCAL_REVERSED.match(text[max(0, at - 64):at][::-1])
+        domain = _EMAIL_DOMAIN.match(text, at + 1)
+        if local and domain:
+            spans.append((at - local.end(), domain.end(), EMAIL_LABEL))
+            at = domain.end()
+        at = text.find("@", at + 1)
+
+
+def _find_indeed_links(text, spans):
+    for match in _INDEED_LINK.finditer(text):
+        prefix = _LINK_PREFIX.search(text, max(0, match.start() - 12), match.start())
+        spans.append((prefix.start(), match.end(), EMAIL_LABEL))
+
+
+def _find_phones(text, spans):
+    for match in _PHONE.finditer(text):
+        start, end = match.span()
+        # Not glued to a word, a "+" or an email address
+        if start and (text[start - 1].isalnum() or text[start - 1] in "_+"):
+            continue
+        if end < len(text) and (text[end].isalnum() or text[end] in "_@"):
+            continue
+        n_digits = sum(char.isdigit() for char in match.group())
+        if PHONE_DIGITS[0] <= n_digits <= PHONE_DIGITS[1]:
+            spans.append((start, end, PHONE_LABEL))
+
+
+def find_contacts(text):
+    """
+    Sorted, non-overlapping (start, end, label) character spans of the email
+    addresses, profile links and phone numbers in `text`.
+    """
+    spans = []
+    if "@" in text:
+        _find_emails(text, spans)
+    if "indeed.com/r/" in text:
+        _find_indeed_links(text, spans)
+    _find_phones(text, spans)
+    return filter_non_overlapping_offsets(spans)
+
+
+class ContactRules:
+    """
+    Pipeline component that tags contact fields with find_contacts. Placed before
+    `ner`, the spans are preset entities that the statistical model keeps and
+    predicts around; other tokens are left unset for `ner` to decide.
+    """
+
+    def __init__(self, nlp, name):
+        self.name = name
+
+    def __call__(self, doc):
+        spans = []
+        for start, end, label in find_contacts(doc.text):
+            span = doc.char_span(start, end, label=label, alignment_mode="expand")
+            if span is not None:
+                spans.append(span)
+        if spans:
+            doc.set_ents(spacy.util.filter_spans(list(doc.ents) + spans), default="unmodified")
+        return doc
+
+
+@Language.factory("contact_rules")
+def make_contact_rules(nlp, name):
+    return ContactRules(nlp, name)
+
+
+def add_contact_rules(nlp):
+    """Add the contact component ahead of `ner` (or last when there is no `ner`)."""
+    if "contact_rules" not in nlp.pipe_names:
+        if "ner" in nlp.pipe_names:
+            nlp.add_pipe("contact_rules", before="ner")
+        else:
+            nlp.add_pipe("contact_rules")
+    return nlp
+
+
+def load_contact_model(lang="en"):
+    """
+    Cheap mode: a tokenizer plus the contact rules, with no transformer or NER.
+    For callers that only need contact fields (e.g. deduplication).
+    """
+    return add_contact_rules(spacy.blank(lang))
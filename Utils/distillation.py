@@ -0,0 +1,207 @@
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+from collections import deque
+from pathlib import Path
+from queue import Empty
+
+import spacy
+
+from docbin_builder import write_docbin
+from evaluation import evaluate_models
+from inference import iter_inputs
+from readers import read_records
+from training import run_training
+
+TEACHER_PATH = Path(r"C:\ML\CV-Parsing\transformer\model-best")
+STUDENT_CONFIG_PATH = Path(r"C:\ML\CV-Parsing\config_student.cfg")
+TRAIN_PATH = Path(r"C:\ML\CV-Parsing\Data\augmented_training_data.spacy")
+DEV_PATH = Path(r"C:\ML\CV-Parsing\Data\dev.spacy")
+OUTPUT_DIR = Path(r"C:\ML\CV-Parsing\student")
+SILVER_NAME = "silver_training_data.spacy"
+REPORT_NAME = "distillation_report.json"
+
+
+def teacher_records(teacher, records, batch_size=16, keep_gold=False):
+    """
+    Re-label (text, entities) records with the teacher's predictions. With
+    `keep_gold`, gold spans are kept and teacher spans only fill the gaps.
+    """
+    pending = deque()
+
+    def texts():
+        for record in records:
+            pending.append(record)
+            yield record[0]
+
+    for doc in teacher.pipe(texts(), batch_size=batch_size):
+        text, gold = pending.popleft()
+        predicted = [(ent.start_char, ent.end_char, ent.label_) for ent in doc.ents]
+        if keep_gold and gold:
+            predicted = sorted(list(gold) + [ent for ent in predicted if not _overlaps_any(ent, gold)])
+        yield text, predicted
+
+
+def _overlaps_any(ent, spans):
+    return any(ent[0] < end and start < ent[1] for start, end, _ in spans)
+
+
+def label_with_teacher(teacher_path, train_path, out_path, unlabeled=(), batch_size=16, keep_gold=False,
+                       n_process=1):
+    """
+    Write a silver .spacy corpus: the texts of `train_path` (plus any `unlabeled`
+    resume files or directories) annotated by the teacher pipeline.
+    """
+    teacher = spacy.load(teacher_path)
+    records = list(read_records(train_path, "docbin"))
+    records.extend((text, []) for _, text in iter_inputs(unlabeled))
+    logging.info(f"Labelling {len(records)} documents with {teacher_path}")
+    silver = list(teacher_records(teacher, records, batch_size, keep_gold))
+    n_gold = sum(len(entities) for _, entities in records)
+    n_silver = sum(len(entities) for _, entities in silver)
+    logging.info(f"Teacher produced {n_silver} entities ({n_gold} gold entities in the source corpus)")
+    write_docbin(silver, out_path, n_process=n_process)
+    return out_path
+
+
+def _peak_rss_mb():
+    """
+    Peak resident memory of this process in MB, or None when it cannot be read.
+    Linux reads VmHWM (unlike getrusage's ru_maxrss, it is not inherited across
+    exec); elsewhere psutil gives the peak working set on Windows and the current
+    RSS otherwise.
+    """
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return round(getattr(info, "peak_wset", info.rss) / 2 ** 20, 1)
+
+
+def _measure_memory(model_path, texts, batch_size, queue, modules=()):
+    for module in modules:
+        importlib.import_module(module)
+    baseline = _peak_rss_mb()
+    nlp = spacy.load(model_path)
+    loaded = _peak_rss_mb()
+    for _ in nlp.pipe(texts, batch_size=batch_size):
+        pass
+    peak = _peak_rss_mb()
+    queue.put({"baseline_mb": baseline, "after_load_mb": loaded, "peak_mb": peak,
+               "model_mb": round(peak - baseline, 1) if peak is not None else None})
+
+
+def memory_profile(model_path, texts, batch_size=32, modules=()):
+    """
+    Peak RSS of loading `model_path` and parsing `texts`, measured in a fresh
+    spawned process so each model is measured on its own. `model_mb` is the
+    growth over the process baseline (interpreter and imports). `modules` are
+    imported in the child first, e.g. to register custom component factories.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure_memory, args=(str(model_path), texts, batch_size, queue, tuple(modules)))
+    process.start()
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1)
+        except Empty:
+            if not process.is_alive():
+                logging.warning(f"Memory measurement of {model_path} failed (exit code {process.exitcode})")
+                result = {"baseline_mb": None, "after_load_mb": None, "peak_mb": None, "model_mb": None}
+    process.join()
+    return result
+
+
+def dir_size_mb(path):
+    """Size on disk of everything under `path`, in MB."""
+    return round(sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file()) / 2 ** 20, 1)
+
+
+def compare_models(teacher_path, student_path, dev_path, out_path=None, batch_size=32, memory_docs=200):
+    """
+    Teacher vs student report: per-label F1, docs/sec, latency and memory, with
+    the student's F1 delta and speed-up relative to the teacher.
+    """
+    teacher, student = evaluate_models([teacher_path, student_path], dev_path, batch_size=batch_size)
+    texts = [text for text, _ in read_records(dev_path, "docbin")][:memory_docs]
+    for report, path in ((teacher, teacher_path), (student, student_path)):
+        report["memory"] = dict(memory_profile(path, texts, batch_size), disk_mb=dir_size_mb(path))
+    labels = sorted(set(teacher["per_label"]) | set(student["per_label"]))
+    comparison = {
+        "f1": {
+            label: {
+                "teacher": teacher["per_label"].get(label, {}).get("f", 0.0),
+                "student": student["per_label"].get(label, {}).get("f", 0.0),
+                "delta": round(student["per_label"].get(label, {}).get("f", 0.0)
+                               - teacher["per_label"].get(label, {}).get("f", 0.0), 4),
+            }
+            for label in labels
+        },
+        "ents_f_delta": round(student["ents"]["f"] - teacher["ents"]["f"], 4),
+        "speedup": (round(student["throughput"]["docs_per_sec"] / teacher["throughput"]["docs_per_sec"], 2)
+                    if teacher["throughput"]["docs_per_sec"] else None),
+        "model_memory_ratio": (round(student["memory"]["model_mb"] / teacher["memory"]["model_mb"], 3)
+                               if student["memory"]["model_mb"] and teacher["memory"]["model_mb"] else None),
+    }
+    report = {"teacher": teacher, "student": student, "comparison": comparison}
+    if out_path is not None:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    logging.info(f"Student vs teacher: ents_f {comparison['ents_f_delta']:+.4f}, "
+                 f"{comparison['speedup']}x docs/s, memory ratio {comparison['model_memory_ratio']}")
+    return report
+
+
+def distill(teacher_path=TEACHER_PATH, config_path=STUDENT_CONFIG_PATH, train_path=TRAIN_PATH, dev_path=DEV_PATH,
+            output_dir=OUTPUT_DIR, unlabeled=(), keep_gold=False, overrides=None, relabel=False, resume=True):
+    """
+    Label the training corpus with the teacher, train the student config on the
+    silver labels (gold dev set for model selection) and write the comparison report.
+    The silver corpus is reused across runs unless `relabel`; `resume` continues
+    an interrupted student run (see training.train).
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    silver_path = output_dir / SILVER_NAME
+    if relabel or not silver_path.exists():
+        label_with_teacher(teacher_path, train_path, silver_path, unlabeled, keep_gold=keep_gold)
+    run_training(config_path, output_dir / "training", silver_path, dev_path, overrides, resume=resume,
+                 debug=False)
+    return compare_models(teacher_path, output_dir / "training" / "model-best", dev_path, output_dir / REPORT_NAME)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Distil the transformer NER into a CPU-fast student.")
+    parser.add_argument("--teacher", type=Path, default=TEACHER_PATH)
+    parser.add_argument("--config", type=Path, default=STUDENT_CONFIG_PATH, help="student training config")
+    parser.add_argument("--train", type=Path, default=TRAIN_PATH, help="corpus to label with the teacher")
+    parser.add_argument("--dev", type=Path, default=DEV_PATH)
+    parser.add_argument("--output", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--unlabeled", nargs="*", type=Path, default=[], help="extra resume files or directories")
+    parser.add_argument("--keep-gold", action="store_true", help="keep gold spans, teacher spans fill the gaps")
+    parser.add_argument("--relabel", action="store_true", help="relabel even if a silver corpus exists")
+    parser.add_argument("--no-resume", action="store_true", help="retrain the student from scratch")
+    parser.add_argument("--compare-only", action="store_true", help="only write the teacher/student report")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = _parse_args()
+    if args.compare_only:
+        compare_models(args.teacher, args.output / "training" / "model-best", args.dev, args.output / REPORT_NAME)
+    else:
+        distill(args.teacher, args.config, args.train, args.dev, args.output, args.unlabeled, args.keep_gold,
+                relabel=args.relabel, resume=not args.no_resume)
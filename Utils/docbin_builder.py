@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import spacy
+from spacy.tokens import DocBin
+from tqdm import tqdm
+
+from overlaps import filter_non_overlapping_spans
+from pool_utils import chunked, imap_bounded, worker_pool, worker_state
+
+MANIFEST_NAME = "manifest.json"
+
+def make_training_doc(nlp, text, entities):
+    """
+    Tokenize `text` and attach the non-overlapping entity spans that align
+    with token boundaries.
+    """
+    doc = nlp.make_doc(text)
+    spans = []
+    for start, end, label in entities:
+        span = doc.char_span(start, end, label=label, alignment_mode="strict")
+        if span is not None:
+            spans.append(span)
+    doc.ents = filter_non_overlapping_spans(spans)
+    return doc
+
+
+def clear_shards(out_dir, prefix):
+    """
+    Delete the `{prefix}-*.spacy` shards of an earlier run, which spacy.Corpus
+    would otherwise read along with the new ones.
+    """
+    stale = list(Path(out_dir).glob(f"{prefix}-*.spacy"))
+    for path in stale:
+        path.unlink()
+    if stale:
+        logging.info(f"Removed {len(stale)} old {prefix} shards from {out_dir}")
+
+
+class DocBinShardWriter:
+    """
+    Accumulate docs into a DocBin and flush it to `out_dir` every `shard_size`
+    docs, so memory stays bounded by the shard size rather than the corpus.
+    Shards with the same prefix left in `out_dir` by an earlier run are deleted.
+    """
+
+    def __init__(self, out_dir, prefix, shard_size=1000):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        clear_shards(self.out_dir, prefix)
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.paths = []
+        self.n_docs = 0
+        self._doc_bin = DocBin()
+
+    def add(self, doc):
+        self._doc_bin.add(doc)
+        self.n_docs += 1
+        if len(self._doc_bin) >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        if len(self._doc_bin) == 0:
+            return
+        path = self.out_dir / f"{self.prefix}-{len(self.paths):05d}.spacy"
+        self._doc_bin.to_disk(path)
+        self.paths.append(path)
+        self._doc_bin = DocBin()
+
+    def close(self):
+        self.flush()
+        return self.paths
+
+
+def _entity_list(annotations):
+    return annotations["entities"] if isinstance(annotations, dict) else annotations
+
+
+def _convert_shard(task):
+    """
+    Worker entry point: convert one chunk of (text, entities) records and
+    serialize it as its own DocBin shard.
+    """
+    index, records, out_dir, prefix = task
+    doc_bin = DocBin()
+    n_ents = 0
+    for text, annotations in records:
+        doc = make_training_doc(worker_state["nlp"], text, _entity_list(annotations))
+        n_ents += len(doc.ents)
+        doc_bin.add(doc)
+    path = Path(out_dir) / f"{prefix}-{index:05d}.spacy"
+    doc_bin.to_disk(path)
+    return {"path": path.name, "docs": len(doc_bin), "entities": n_ents}
+
+
+def build_docbin_shards(records, out_dir, prefix="shard", n_process=None, shard_size=1000, lang="en"):
+    """
+    Convert (text, entities) records or a SpanCorpus into DocBin shards across a process pool.
+    Each worker serializes its own shard; a manifest listing the shards is written next
+    to them. The directory can be passed straight to spacy.Corpus (paths.train / paths.dev)
+    or collapsed into a single file with merge_docbin_shards; shards with the same
+    prefix from an earlier run are deleted first so neither picks them up.
+    Only a bounded number of chunks is in flight at once, so `records` may be a generator.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    clear_shards(out_dir, prefix)
+    n_process = n_process or os.cpu_count() or 1
+    # A SpanCorpus is shipped to the workers as compact column slices
+    tasks = ((i, chunk, str(out_dir), prefix) for i, chunk in enumerate(chunked(records, shard_size)))
+    with worker_pool(n_process, lang=lang) as executor:
+        shards = list(imap_bounded(executor, _convert_shard, tasks, 2 * n_process))
+    manifest = {
+        "lang": lang,
+        "docs": sum(shard["docs"] for shard in shards),
+        "entities": sum(shard["entities"] for shard in shards),
+        "shards": shards,
+    }
+    with open(out_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    logging.info(f"Wrote {manifest['docs']} docs into {len(shards)} shards under {out_dir}")
+    return manifest
+
+
+def load_manifest(shard_dir):
+    with open(Path(shard_dir) / MANIFEST_NAME, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def merge_docbin_shards(shard_dir, out_path):
+    """
+    Merge the shards listed in a manifest into a single .spacy file, in shard order.
+    """
+    shard_dir = Path(shard_dir)
+    merged = DocBin()
+    for shard in load_manifest(shard_dir)["shards"]:
+        merged.merge(DocBin().from_disk(shard_dir / shard["path"]))
+    merged.to_disk(out_path)
+    return out_path
+
+
+def write_docbin(records, out_path, n_process=1, shard_size=1000, lang="en"):
+    """
+    Write records to a single .spacy file. With n_process > 1 the conversion is
+    spread over a process pool and the resulting shards are merged.
+    """
+    out_path = Path(out_path)
+    if n_process == 1:
+        nlp = spacy.blank(lang)
+        doc_bin = DocBin()
+        for text, annotations in tqdm(records, desc=f"Processing {out_path}"):
+            doc_bin.add(make_training_doc(nlp, text, _entity_list(annotations)))
+        doc_bin.to_disk(out_path)
+        return out_path
+    shard_dir = out_path.with_name(out_path.stem + "_shards")
+    build_docbin_shards(records, shard_dir, prefix=out_path.stem, n_process=n_process,
+                        shard_size=shard_size, lang=lang)
+    merge_docbin_shards(shard_dir, out_path)
+    # The shards are only an intermediate step here
+    shutil.rmtree(shard_dir)
+    return out_path
@@ -1,33 +1,26 @@
-import subprocess
 from pathlib import Path
 import logging
 
+from evaluation import evaluate_models
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Paths
 model_path = Path(r"C:\ML\CV-Parsing\transformer\model-best")  #  trained model
 dev_data_path = Path(r"C:\ML\CV-Parsing\Data\dev.spacy")           #  dev set
-metrics_output = Path(r"C:\ML\CV-Parsing\metrics.json")            #  output file
+metrics_output = Path(r"C:\ML\CV-Parsing\metrics.json")            #  output file (a list of one report)
 
-# Run spaCy evaluation
+# Score the model on quality (per-label P/R/F) and speed (latency, per-component timings)
 logger.info("Evaluating spaCy model...")
 
-result = subprocess.run(
-    [
-        "python", "-m", "spacy", "evaluate",
-        str(model_path),
-        str(dev_data_path),
-        "--output", str(metrics_output)
-    ],
-    capture_output=True,
-    text=True
-)
+report = evaluate_models([model_path], dev_data_path, metrics_output)[0]
 
-if result.returncode == 0:
-    logger.info("Evaluation completed successfully!")
-    logger.info(result.stdout)   
-else:
-    logger.error("Evaluation failed!")
-    logger.error(result.stderr)
-logger.info("Evaluation process finished.")
\ No newline at end of file
+logger.info("Evaluation completed successfully!")
+logger.info(f"ents_p {report['ents']['p']:.4f}, ents_r {report['ents']['r']:.4f}, ents_f {report['ents']['f']:.4f}")
+for label, scores in report["per_label"].items():
+    logger.info(f"{label}: p {scores['p']:.4f}, r {scores['r']:.4f}, f {scores['f']:.4f}")
+logger.info(f"{report['throughput']['docs_per_sec']} docs/s, latency (ms): {report['latency_ms']}")
+for component, timing in report["components_ms"].items():
+    logger.info(f"{component}: {timing['per_doc']} ms/doc ({timing['share']:.0%})")
+logger.info(f"Metrics written to {metrics_output}")
@@ -0,0 +1,199 @@
+import argparse
+import json
+import logging
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import spacy
+
+from readers import read_records
+
+DEV_PATH = Path(r"C:\ML\CV-Parsing\Data\dev.spacy")
+# Labels the augmentation targets, reported on their own
+TRACKED_LABELS = ["Designation", "Companies worked at", "Degree"]
+LATENCY_PERCENTILES = [50, 90, 95, 99]
+
+
+class SpanTable:
+    """
+    (doc, start, end, label) character spans of a corpus as parallel int64 arrays,
+    with the labels interned in `labels`.
+    """
+
+    def __init__(self, docs, starts, ends, label_ids, labels):
+        self.docs = docs
+        self.starts = starts
+        self.ends = ends
+        self.label_ids = label_ids
+        self.labels = labels
+
+    @classmethod
+    def from_spans(cls, doc_spans, labels=None):
+        """
+        `doc_spans` holds one list of (start, end, label) per document. New labels
+        are appended to `labels` in place, so tables built on the same list share ids.
+        """
+        labels = [] if labels is None else labels
+        index = {label: i for i, label in enumerate(labels)}
+        rows = []
+        for doc, spans in enumerate(doc_spans):
+            for start, end, label in spans:
+                if label not in index:
+                    index[label] = len(labels)
+                    labels.append(label)
+                rows.append((doc, start, end, index[label]))
+        rows = np.array(rows, dtype=np.int64).reshape(-1, 4)
+        return cls(rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3], labels)
+
+    def keys(self, max_offset):
+        """One int64 key per span, equal for spans with the same doc, offsets and label."""
+        return ((self.docs * (max_offset + 1) + self.starts) * (max_offset + 1) + self.ends) * len(self.labels) \
+            + self.label_ids
+
+
+def match_spans(gold, predicted):
+    """
+    Exact-match span scores of `predicted` against `gold` (SpanTables sharing
+    their label list), vectorised with np.isin over packed span keys. Returns
+    per-label (tp, n_pred, n_gold) count arrays.
+    """
+    n_labels = len(gold.labels)
+    max_offset = int(max(gold.ends.max(initial=0), predicted.ends.max(initial=0)))
+    n_docs = int(max(gold.docs.max(initial=0), predicted.docs.max(initial=0))) + 1
+    if n_docs * (max_offset + 1) ** 2 * max(n_labels, 1) >= 2 ** 63:
+        raise ValueError("Corpus too large to pack span keys into int64")
+    matched = np.isin(predicted.keys(max_offset), gold.keys(max_offset))
+    tp = np.bincount(predicted.label_ids[matched], minlength=n_labels)
+    n_pred = np.bincount(predicted.label_ids, minlength=n_labels)
+    n_gold = np.bincount(gold.label_ids, minlength=n_labels)
+    return tp, n_pred, n_gold
+
+
+def prf(tp, n_pred, n_gold):
+    p = tp / n_pred if n_pred else 0.0
+    r = tp / n_gold if n_gold else 0.0
+    f = 2 * p * r / (p + r) if p + r else 0.0
+    return {"p": round(float(p), 4), "r": round(float(r), 4), "f": round(float(f), 4)}
+
+
+def span_scores(gold_spans, pred_spans):
+    """Micro P/R/F over all labels plus per-label P/R/F with their counts."""
+    labels = []
+    gold = SpanTable.from_spans(gold_spans, labels)
+    predicted = SpanTable.from_spans(pred_spans, labels)
+    tp, n_pred, n_gold = match_spans(gold, predicted)
+    per_label = {
+        label: dict(prf(tp[i], n_pred[i], n_gold[i]), tp=int(tp[i]), pred=int(n_pred[i]), gold=int(n_gold[i]))
+        for i, label in enumerate(labels)
+    }
+    return {"ents": prf(tp.sum(), n_pred.sum(), n_gold.sum()), "per_label": per_label}
+
+
+def pipe_timed(nlp, texts, batch_size=32):
+    """
+    Run the pipeline over `texts` like nlp.pipe, timing the tokenizer and every
+    component separately. Returns (docs, seconds per component).
+    """
+    timings = defaultdict(float)
+    docs = []
+    for lo in range(0, len(texts), batch_size):
+        start = time.perf_counter()
+        batch = [nlp.make_doc(text) for text in texts[lo:lo + batch_size]]
+        timings["tokenizer"] += time.perf_counter() - start
+        for name, proc in nlp.pipeline:
+            start = time.perf_counter()
+            if hasattr(proc, "pipe"):
+                batch = list(proc.pipe(batch, batch_size=batch_size))
+            else:
+                batch = [proc(doc) for doc in batch]
+            timings[name] += time.perf_counter() - start
+        docs.extend(batch)
+    return docs, dict(timings)
+
+
+def latency_profile(nlp, texts, n_docs=200):
+    """Per-document latency percentiles (ms) of nlp(text) over an evenly spaced sample of `texts`."""
+    if not texts:
+        return {}
+    sample = texts[::max(1, len(texts) // n_docs)][:n_docs]
+    nlp(sample[0])  # warm-up
+    latencies = []
+    for text in sample:
+        start = time.perf_counter()
+        nlp(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies = np.array(latencies)
+    profile = {f"p{q}": round(float(np.percentile(latencies, q)), 2) for q in LATENCY_PERCENTILES}
+    profile["mean"] = round(float(latencies.mean()), 2)
+    profile["docs"] = len(sample)
+    return profile
+
+
+def load_gold(dev_path):
+    """Texts and gold (start, end, label) spans of a .spacy file, read once for every candidate."""
+    records = list(read_records(dev_path, "docbin"))
+    return [text for text, _ in records], [entities for _, entities in records]
+
+
+def evaluate_candidate(nlp, texts, gold_spans, batch_size=32, latency_docs=200, tracked=TRACKED_LABELS):
+    """Quality and speed report of one pipeline (a Language or a path) on preloaded gold data."""
+    if isinstance(nlp, spacy.language.Language):
+        name = nlp.meta.get("name", "pipeline")
+    else:
+        name = str(nlp)
+        nlp = spacy.load(nlp)
+    start = time.perf_counter()
+    docs, timings = pipe_timed(nlp, texts, batch_size)
+    elapsed = time.perf_counter() - start
+    pred_spans = [[(ent.start_char, ent.end_char, ent.label_) for ent in doc.ents] for doc in docs]
+    report = {"model": name, "docs": len(docs), "tokens": sum(len(doc) for doc in docs)}
+    report.update(span_scores(gold_spans, pred_spans))
+    report["tracked"] = {label: report["per_label"].get(label, prf(0, 0, 0)) for label in tracked}
+    report["throughput"] = {
+        "docs_per_sec": round(len(docs) / elapsed, 2),
+        "words_per_sec": round(report["tokens"] / elapsed, 1),
+    }
+    report["components_ms"] = {
+        component: {"total": round(seconds * 1000, 1), "per_doc": round(seconds * 1000 / max(len(docs), 1), 3),
+                    "share": round(seconds / elapsed, 4)}
+        for component, seconds in timings.items()
+    }
+    report["latency_ms"] = latency_profile(nlp, texts, latency_docs)
+    return report
+
+
+def evaluate_models(models, dev_path=DEV_PATH, out_path=None, batch_size=32, latency_docs=200):
+    """
+    Score every candidate on the same dev set, loaded once. When `out_path` is
+    given the reports are written there as a JSON list, one per model, in order.
+    """
+    texts, gold_spans = load_gold(dev_path)
+    reports = []
+    for model in models:
+        report = evaluate_candidate(model, texts, gold_spans, batch_size, latency_docs)
+        tracked = ", ".join(f"{label} {scores['f']:.3f}" for label, scores in report["tracked"].items())
+        logging.info(f"{report['model']}: ents_f {report['ents']['f']:.4f} ({tracked}), "
+                     f"{report['throughput']['docs_per_sec']} docs/s, p95 {report['latency_ms'].get('p95')} ms")
+        reports.append(report)
+    if out_path is not None:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+    return reports
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Score NER pipelines on quality and speed.")
+    parser.add_argument("models", nargs="+", type=Path, help="pipeline directories to compare")
+    parser.add_argument("--dev", type=Path, default=DEV_PATH)
+    parser.add_argument("--out", type=Path, default=None, help="write the reports here as a JSON list")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--latency-docs", type=int, default=200, help="documents timed one at a time")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = _parse_args()
+    evaluate_models(args.models, args.dev, args.out, args.batch_size, args.latency_docs)
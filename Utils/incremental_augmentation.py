@@ -0,0 +1,254 @@
+import hashlib
+import json
+import logging
+import os
+from collections import Counter
+from pathlib import Path
+
+import spacy
+from spacy.tokens import DocBin
+from tqdm import tqdm
+
+import augmentation
+import augmentation_scheduler
+import docbin_builder
+import entity_variations
+import tools
+from augmentation import has_target_entity
+from augmentation_scheduler import fingerprint, make_replica, seeded_variation_pools, synthetic_records
+from docbin_builder import make_training_doc
+from pipeline_cache import code_version
+from pool_utils import chunked, imap_bounded, worker_pool, worker_state
+from readers import Record, normalize_offsets
+from tools import clean_entities
+
+INDEX_VERSION = 1
+INDEX_NAME = "index.json"
+# Order of the per-document blocks in the corpus, as written by schedule_augmentation
+STRATEGY_ORDER = ("source", "swap", "boundary")
+
+def augmentation_context(variations, master_seed, lang="en"):
+    """
+    Hash of everything besides the source document that a replica depends on:
+    the variation pools, the master seed, the language and the augmentation code.
+    """
+    digest = hashlib.sha256()
+    pools = {label: pool.to_dict() if hasattr(pool, "to_dict") else list(pool)
+             for label, pool in variations.items()}
+    digest.update(json.dumps([pools, master_seed, lang], ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    digest.update(code_version(augmentation, augmentation_scheduler, docbin_builder, entity_variations, tools).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AugmentationIndex:
+    """
+    On-disk map from a source document's fingerprint to the DocBin shard segments
+    holding its cleaned source doc and its replicas, per strategy. Replica i of a
+    document only depends on the document, the strategy, i and the context (see
+    augmentation_context), so the first n stored replicas are reused whenever a
+    plan asks for n or fewer, and only the missing ones are generated. When the
+    context changes, every stored shard is dropped.
+    """
+
+    def __init__(self, root, context):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.context = context
+        self.docs = {}
+        self.synthetic = None
+        self.next_shard = 0
+        path = self.root / INDEX_NAME
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("context") == context:
+                self.docs = data["docs"]
+                self.synthetic = data["synthetic"]
+                self.next_shard = data["next_shard"]
+            else:
+                logging.info(f"Augmentation context changed, discarding the index under {self.root}")
+        self.collect_garbage()
+
+    def stored(self, key, strategy):
+        """Number of replicas stored for a document and strategy."""
+        return sum(count for _, _, count in self.docs.get(key, {}).get(strategy, []))
+
+    def add_segment(self, key, strategy, shard, start, count):
+        self.docs.setdefault(key, {}).setdefault(strategy, []).append([shard, start, count])
+
+    def locate(self, key, strategy, n):
+        """(shard, position) of the first `n` stored replicas of a document."""
+        positions = []
+        for shard, start, count in self.docs[key][strategy]:
+            take = min(count, n - len(positions))
+            positions.extend((shard, start + i) for i in range(take))
+            if len(positions) == n:
+                break
+        return positions
+
+    def prune(self, keys):
+        """Forget documents that are no longer in the corpus; returns how many were dropped."""
+        dropped = [key for key in self.docs if key not in keys]
+        for key in dropped:
+            del self.docs[key]
+        return len(dropped)
+
+    def new_shard(self):
+        name = f"shard-{self.next_shard:06d}.spacy"
+        self.next_shard += 1
+        return name
+
+    def collect_garbage(self):
+        """Delete shard files that no segment refers to anymore."""
+        live = {shard for strategies in self.docs.values() for segments in strategies.values()
+                for shard, _, _ in segments}
+        if self.synthetic is not None:
+            live.add(self.synthetic["shard"])
+        removed = 0
+        for path in self.root.glob("shard-*.spacy"):
+            if path.name not in live:
+                path.unlink()
+                removed += 1
+        return removed
+
+    def save(self):
+        tmp = self.root / (INDEX_NAME + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "context": self.context, "docs": self.docs,
+                       "synthetic": self.synthetic, "next_shard": self.next_shard}, f)
+        os.replace(tmp, self.root / INDEX_NAME)
+
+
+def _build_chunk(task):
+    """
+    Worker entry point: build the requested replicas of one chunk of documents and
+    serialize them as one DocBin. Returns the bytes and the (key, strategy, start,
+    count) segment of every document within it.
+    """
+    master_seed, items = task
+    doc_bin = DocBin()
+    segments = []
+    for key, strategy, text, entities, first, last in items:
+        if strategy == "source":
+            records = [Record(text, clean_entities(text, entities))]
+        else:
+            records = [make_replica(strategy, text, entities, worker_state["variations"], master_seed, key, replica)
+                       for replica in range(first, last)]
+        segments.append((key, strategy, len(doc_bin), len(records)))
+        for aug_text, aug_entities in records:
+            doc_bin.add(make_training_doc(worker_state["nlp"], aug_text, normalize_offsets(aug_text, aug_entities)))
+    return doc_bin.to_bytes(), segments
+
+
+def augment_incremental(
+    data,
+    index_dir,
+    out_path,
+    master_seed=0,
+    n_process=None,
+    swap_factor=30,
+    boundary_factor=6,
+    replica_plan=None,
+    boundary_plan=None,
+    context_count=None,
+    skills_count=100,
+    lookalike_count=50,
+    chunk_size=64,
+    include_source=True,
+    lang="en",
+    gazetteer=None,
+    variations=None,
+):
+    """
+    Incremental counterpart of schedule_augmentation + write_docbin. Documents are
+    fingerprinted and their DocBin-converted source and replicas are kept under
+    `index_dir` (see AugmentationIndex), so a run only generates replicas for
+    added or modified documents, or for documents whose plan grew; replicas of
+    deleted documents are dropped. The .spacy file written to `out_path` holds the
+    same docs in the same order as a full rebuild with the same `variations`
+    (keep the pools fixed between runs, since changing them invalidates the index).
+    Without `variations` the pools are built as in schedule_augmentation.
+    """
+    n_process = n_process or os.cpu_count() or 1
+    if variations is None:
+        variations = seeded_variation_pools(data, master_seed, gazetteer)
+    if context_count is None:
+        context_count = swap_factor * 4
+    if replica_plan is None:
+        replica_plan = [swap_factor if has_target_entity(entities) else 0 for _, entities in data]
+    if boundary_plan is None:
+        boundary_plan = [boundary_factor] * len(data)
+    keys = [fingerprint(text, entities) for text, entities in data]
+    plans = {
+        "source": [1 if include_source else 0] * len(data),
+        "swap": replica_plan,
+        "boundary": boundary_plan,
+    }
+
+    index = AugmentationIndex(index_dir, augmentation_context(variations, master_seed, lang))
+    dropped = index.prune(set(keys))
+
+    # Whatever the plan asks for beyond what is stored, once per distinct document
+    missing, seen = [], set()
+    for strategy in STRATEGY_ORDER:
+        for (text, entities), key, n in zip(data, keys, plans[strategy]):
+            stored = index.stored(key, strategy)
+            if n > stored and (key, strategy) not in seen:
+                seen.add((key, strategy))
+                missing.append((key, strategy, text, entities, stored, n))
+
+    counts = Counter()
+    with worker_pool(n_process, variations, lang) as executor:
+        tasks = ((master_seed, chunk) for chunk in chunked(missing, chunk_size))
+        results = imap_bounded(executor, _build_chunk, tasks, 2 * n_process)
+        for doc_bin_bytes, segments in tqdm(results, desc="Augmenting (incremental)"):
+            shard = index.new_shard()
+            with open(index.root / shard, "wb") as f:
+                f.write(doc_bin_bytes)
+            for key, strategy, start, count in segments:
+                index.add_segment(key, strategy, shard, start, count)
+                counts[strategy] += count
+
+    synthetic_key = [context_count, skills_count, lookalike_count]
+    if index.synthetic is None or index.synthetic["params"] != synthetic_key:
+        nlp = spacy.blank(lang)
+        doc_bin = DocBin()
+        for text, entities in synthetic_records(variations, master_seed, context_count, skills_count,
+                                                lookalike_count):
+            doc_bin.add(make_training_doc(nlp, text, normalize_offsets(text, entities)))
+        shard = index.new_shard()
+        doc_bin.to_disk(index.root / shard)
+        index.synthetic = {"params": synthetic_key, "shard": shard, "count": len(doc_bin)}
+        counts["synthetic"] += len(doc_bin)
+
+    removed = index.collect_garbage()
+    index.save()
+    logging.info(f"Incremental augmentation: generated {dict(counts)}, dropped {dropped} deleted "
+                 f"documents and {removed} shards")
+    return assemble_corpus(index, keys, plans, out_path, lang)
+
+
+def assemble_corpus(index, keys, plans, out_path, lang="en"):
+    """
+    Write the docs referenced by the index to one .spacy file in full-rebuild order:
+    sources, swap replicas, boundary replicas, then the synthetic examples.
+    """
+    vocab = spacy.blank(lang).vocab
+    shard_docs = {}
+
+    def docs_of(shard):
+        if shard not in shard_docs:
+            shard_docs[shard] = list(DocBin().from_disk(index.root / shard).get_docs(vocab))
+        return shard_docs[shard]
+
+    out = DocBin()
+    for strategy in STRATEGY_ORDER:
+        for key, n in zip(keys, plans[strategy]):
+            if n:
+                for shard, position in index.locate(key, strategy, n):
+                    out.add(docs_of(shard)[position])
+    for doc in docs_of(index.synthetic["shard"]):
+        out.add(doc)
+    out.to_disk(out_path)
+    logging.info(f"Assembled {len(out)} docs from {len(shard_docs)} shards into {out_path}")
+    return out_path
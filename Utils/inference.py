@@ -0,0 +1,263 @@
+import argparse
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import spacy
+from tqdm import tqdm
+
+import quantization  # noqa: F401  registers the quantized_transformer factory
+from chunking import pipe_chunked
+from contact_rules import add_contact_rules, load_contact_model
+from skill_gazetteer import add_skill_gazetteer
+
+MODEL_PATH = Path(r"C:\ML\CV-Parsing\transformer\model-best")
+
+
+def load_model(path=MODEL_PATH, exclude=(), contacts=None, skill_gazetteer=None, skill_gazetteer_ents=False):
+    """
+    Load the trained pipeline. Components listed in `exclude` are not loaded at all.
+    contacts="rules" adds the regex contact component ahead of `ner`;
+    contacts="only" is the cheap mode: the contact rules alone, without loading
+    the transformer (the model's meta.json is only read for its language).
+    `skill_gazetteer` is the path of a SkillGazetteer whose matches are added to
+    doc.spans ahead of `ner`, and preset as Skills entities with `skill_gazetteer_ents`.
+    """
+    if contacts == "only":
+        return load_contact_model(spacy.util.load_meta(Path(path) / "meta.json")["lang"])
+    nlp = spacy.load(path, exclude=list(exclude))
+    if contacts == "rules":
+        add_contact_rules(nlp)
+    if skill_gazetteer:
+        add_skill_gazetteer(nlp, skill_gazetteer, set_ents=skill_gazetteer_ents)
+    return nlp
+
+
+def read_text_file(path):
+    return Path(path).read_text(encoding="utf-8")
+
+
+# Loaders for resume files, keyed by suffix
+INPUT_LOADERS = {
+    ".txt": read_text_file,
+}
+
+
+def iter_inputs(sources):
+    """
+    Yield (doc_id, text) pairs from an iterable of raw texts, (doc_id, text) pairs,
+    or Paths to resume files / directories of resume files. Raw texts are numbered
+    by their position; files use their path as id.
+    """
+    for i, source in enumerate(sources):
+        if isinstance(source, tuple):
+            yield source
+        elif isinstance(source, Path):
+            paths = sorted(p for p in source.iterdir() if p.suffix.lower() in INPUT_LOADERS) \
+                if source.is_dir() else [source]
+            for path in paths:
+                yield str(path), INPUT_LOADERS[path.suffix.lower()](path)
+        else:
+            yield str(i), source
+
+
+def entities_to_record(doc_id, text, entities):
+    """
+    Entity record of one parsed resume: character offsets, label and surface text.
+    """
+    return {
+        "id": doc_id,
+        "entities": [
+            {"start": start, "end": end, "label": label, "text": text[start:end]}
+            for start, end, label in entities
+        ],
+    }
+
+
+def doc_to_record(doc_id, doc):
+    return entities_to_record(doc_id, doc.text, [(ent.start_char, ent.end_char, ent.label_) for ent in doc.ents])
+
+
+def pipe_entities(nlp, items, batch_size=32, n_process=1, max_chars=None, overlap=200):
+    """
+    Yield (text, context, entities) for (text, context) items. With `max_chars`,
+    long documents are split into bounded chunks and stitched back (see
+    chunking.pipe_chunked); otherwise each document is one Doc.
+    """
+    if max_chars:
+        yield from pipe_chunked(nlp, items, max_chars, overlap, batch_size, n_process)
+        return
+    for doc, context in nlp.pipe(items, as_tuples=True, batch_size=batch_size, n_process=n_process):
+        yield doc.text, context, [(ent.start_char, ent.end_char, ent.label_) for ent in doc.ents]
+
+
+def extract_entities(nlp, sources, batch_size=32, n_process=1, max_chars=None, overlap=200):
+    """
+    Run resumes through nlp.pipe and yield one entity record per document, in input order.
+    `sources` is consumed lazily (see iter_inputs), so it can be a generator over
+    hundreds of thousands of files.
+    """
+    pairs = ((text, doc_id) for doc_id, text in iter_inputs(sources))
+    for text, doc_id, entities in pipe_entities(nlp, pairs, batch_size, n_process, max_chars, overlap):
+        yield entities_to_record(doc_id, text, entities)
+
+
+def write_jsonl(records, out_path):
+    n_docs = 0
+    with open(out_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            n_docs += 1
+    return n_docs
+
+
+def write_arrow(records, out_path, batch_rows=1024):
+    """
+    Stream records into an Arrow IPC stream file, `batch_rows` documents per record batch.
+    Requires pyarrow.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("Arrow output requires pyarrow (pip install pyarrow)") from e
+
+    # page / boxes are only filled for PDF inputs (see pdf_extraction.pdf_record)
+    entity = pa.struct([("start", pa.int32()), ("end", pa.int32()),
+                        ("label", pa.string()), ("text", pa.string()),
+                        ("page", pa.int32()), ("boxes", pa.list_(pa.list_(pa.float32())))])
+    schema = pa.schema([("id", pa.string()), ("entities", pa.list_(entity))])
+    n_docs = 0
+    with pa.OSFile(str(out_path), "wb") as sink, pa.ipc.new_stream(sink, schema) as writer:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_rows:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                n_docs += len(batch)
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            n_docs += len(batch)
+    return n_docs
+
+
+WRITERS = {
+    "jsonl": write_jsonl,
+    "arrow": write_arrow,
+}
+
+
+def write_records(records, out_path, fmt="jsonl"):
+    """
+    Stream entity records to `out_path` in `fmt` ("jsonl" or "arrow") and log the throughput.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown output format '{fmt}', expected one of {sorted(WRITERS)}")
+    start = time.perf_counter()
+    n_docs = WRITERS[fmt](tqdm(records, desc="Parsing resumes"), out_path)
+    elapsed = time.perf_counter() - start
+    logging.info(f"Parsed {n_docs} resumes in {elapsed:.1f}s ({n_docs / max(elapsed, 1e-9):.1f} docs/s) -> {out_path}")
+    return n_docs
+
+
+def run_inference(nlp, sources, out_path, fmt="jsonl", batch_size=32, n_process=1, max_chars=None):
+    """
+    Parse `sources` and stream the entity records to `out_path`.
+    """
+    return write_records(extract_entities(nlp, sources, batch_size, n_process, max_chars), out_path, fmt)
+
+
+def benchmark(nlp, texts, batch_sizes=(8, 32, 128), n_processes=(1, 2, 4), target_docs=None):
+    """
+    Measure nlp.pipe throughput on `texts` for every (batch_size, n_process) pair.
+    The first configuration is preceded by a short warm-up so model loading and
+    allocation are not counted. With `target_docs`, also estimates how long a
+    batch of that many resumes would take on this machine.
+    Returns one dict per configuration, fastest first.
+    """
+    texts = list(texts)
+    n_chars = sum(len(text) for text in texts)
+    for _ in nlp.pipe(texts[: min(len(texts), 8)]):
+        pass
+    results = []
+    for n_process in n_processes:
+        for batch_size in batch_sizes:
+            start = time.perf_counter()
+            n_ents = sum(len(doc.ents) for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process))
+            elapsed = time.perf_counter() - start
+            result = {
+                "batch_size": batch_size,
+                "n_process": n_process,
+                "seconds": round(elapsed, 3),
+                "docs_per_sec": round(len(texts) / elapsed, 2),
+                "chars_per_sec": round(n_chars / elapsed, 1),
+                "entities": n_ents,
+            }
+            if target_docs:
+                result["target_hours"] = round(target_docs / result["docs_per_sec"] / 3600, 2)
+            logging.info(f"batch_size={batch_size:<4} n_process={n_process:<3} "
+                         f"{result['docs_per_sec']:>9.2f} docs/s {result['chars_per_sec']:>12.1f} chars/s")
+            results.append(result)
+    results.sort(key=lambda r: r["docs_per_sec"], reverse=True)
+    return results
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Batch entity extraction over resume files.")
+    parser.add_argument("inputs", nargs="+", type=Path, help="resume files or directories of resumes")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    parser.add_argument("--out", type=Path, default=Path("entities.jsonl"))
+    parser.add_argument("--format", choices=sorted(WRITERS), default="jsonl")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--n-process", type=int, default=1)
+    parser.add_argument("--max-chars", type=int, default=None,
+                        help="split documents longer than this into chunks at section/sentence boundaries")
+    parser.add_argument("--contacts", choices=["rules", "only"], default=None,
+                        help="'rules': tag emails/phones with regexes before ner; 'only': contact fields only, no transformer")
+    parser.add_argument("--skill-gazetteer", type=Path, default=None,
+                        help="pre-annotate skills from this gazetteer (see skill_gazetteer.py) ahead of ner")
+    parser.add_argument("--skill-gazetteer-ents", action="store_true",
+                        help="with --skill-gazetteer, preset the matches as Skills entities that ner keeps")
+    parser.add_argument("--pdf", action="store_true",
+                        help="inputs are PDFs (or directories of PDFs), extracted in a process pool")
+    parser.add_argument("--extract-process", type=int, default=None,
+                        help="with --pdf, number of extraction workers (default: all cores)")
+    parser.add_argument("--cache", type=Path, default=None,
+                        help="SQLite result cache; documents already parsed by this model are not re-run")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="measure throughput over batch sizes and worker counts instead of writing results")
+    parser.add_argument("--target-docs", type=int, default=None,
+                        help="with --benchmark, estimate the run time of a batch this large")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = _parse_args()
+    nlp = load_model(args.model, contacts=args.contacts, skill_gazetteer=args.skill_gazetteer,
+                     skill_gazetteer_ents=args.skill_gazetteer_ents)
+    if args.benchmark:
+        texts = [text for _, text in iter_inputs(args.inputs)]
+        cpus = os.cpu_count() or 1
+        n_processes = sorted({1, 2, max(1, cpus // 2), cpus})
+        for result in benchmark(nlp, texts, n_processes=n_processes, target_docs=args.target_docs):
+            print(json.dumps(result))
+    elif args.cache or args.pdf:
+        from contextlib import nullcontext
+        from pdf_extraction import extract_pdf_entities
+        from result_cache import cached_extract_entities, open_result_cache
+
+        with open_result_cache(args.cache, nlp.meta, args.max_chars, contacts=args.contacts,
+                               skill_gazetteer=args.skill_gazetteer,
+                               skill_gazetteer_ents=args.skill_gazetteer_ents) if args.cache else nullcontext() as cache:
+            if args.pdf:
+                records = extract_pdf_entities(nlp, args.inputs, args.batch_size, args.n_process,
+                                               args.extract_process, args.max_chars, cache)
+            else:
+                records = cached_extract_entities(nlp, args.inputs, cache, args.batch_size,
+                                                  args.n_process, args.max_chars)
+            write_records(records, args.out, args.format)
+    else:
+        run_inference(nlp, args.inputs, args.out, args.format, args.batch_size, args.n_process, args.max_chars)
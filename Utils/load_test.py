@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+
+from inference import iter_inputs
+
+SAMPLE_TEXT = (
+    "Harini Komaravelli Test Analyst at Oracle, Hyderabad - Email me on Indeed: "
+    "indeed.com/r/Harini-Komaravelli/2659eee82e435d1b 6 Yrs. of IT Experience in Manual and "
+    "Automation testing. WORK EXPERIENCE QA Analyst Oracle - Hyderabad, Telangana - "
+    "November 2011 to February 2016 EDUCATION MCA Osmania University SKILLS Functional "
+    "Testing, Blue Prism, Qtp"
+)
+
+
+async def post(reader, writer, host, path, body, content_type):
+    """Send one request on a keep-alive connection and return the decoded JSON response."""
+    writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: {content_type}\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+    await reader.readline()  # status line
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return json.loads(await reader.readexactly(length))
+
+
+async def run_load(host, port, payloads, n_requests, concurrency):
+    """
+    Fire `n_requests` requests from `concurrency` keep-alive clients, cycling over
+    `payloads` as (path, body, content type), and collect client-side latencies.
+    """
+    latencies, batch_sizes = [], []
+    counter = iter(range(n_requests))
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in counter:
+                path, body, content_type = payloads[i % len(payloads)]
+                start = time.perf_counter()
+                response = await post(reader, writer, host, path, body, content_type)
+                latencies.append(time.perf_counter() - start)
+                if "batch_size" in response:
+                    batch_sizes.append(response["batch_size"])
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "mean_batch_size": round(float(np.mean(batch_sizes)), 2) if batch_sizes else None,
+    }
+
+
+def build_payloads(inputs, pdf=False):
+    if pdf:
+        pdfs = [p for source in inputs for p in ([source] if source.is_file() else sorted(source.glob("*.pdf")))]
+        return [("/parse/pdf", p.read_bytes(), "application/pdf") for p in pdfs]
+    texts = [text for _, text in iter_inputs(inputs)] if inputs else [SAMPLE_TEXT]
+    return [("/parse", json.dumps({"text": text}).encode("utf-8"), "application/json") for text in texts]
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Load-test the resume parsing server.")
+    parser.add_argument("inputs", nargs="*", type=Path, help="resume files or directories (default: a sample CV)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--pdf", action="store_true", help="upload the inputs as PDFs")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = _parse_args()
+    payloads = build_payloads(args.inputs, args.pdf)
+    for concurrency in args.concurrency:
+        print(json.dumps(asyncio.run(run_load(args.host, args.port, payloads, args.requests, concurrency))))
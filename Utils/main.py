@@ -1,23 +1,233 @@
 # utils/main.py
 # This script runs the NER data pipeline: load, augment, visualize, and export.
+# Every stage is cached on its inputs, parameters and code, so unchanged stages
+# are skipped and their artifacts reused.
 import logging
+import shutil
 from pathlib import Path
-from Data_loader import load_and_export_ner_data
-from augmentation import augment_and_balance_data
-from visualization import visualize_data   
+
+import augmentation
+import augmentation_scheduler
+import Data_loader
+import docbin_builder
+import entity_variations
+import overlaps
+import readers
+import rebalancing
+import skill_gazetteer
+import skills
+import tools
+import variation_pool
+from augmentation_scheduler import derive_seed, schedule_augmentation, write_jsonl_record
+from Data_loader import load_ner_records
+from docbin_builder import write_docbin
+from entity_variations import SUBSTITUTION_RATES, expand_skills_vocabulary
+from incremental_augmentation import augment_incremental
+from pipeline_cache import StageCache, code_version, export_artifact
+from readers import read_records
+from rebalancing import plan_augmentation_budget
+from faker import Faker
+from skill_gazetteer import SkillGazetteer, build_gazetteer
+from variation_pool import build_variation_pools, load_variation_pools, save_variation_pools
+from visualization import visualize_data
+
+DATA_DIR = Path(r"C:\ML\CV-Parsing\Data")
+NER_DATASET_PATH = DATA_DIR / "Entity Recognition in Resumes.json"
+TRAIN_DATA_PATH = DATA_DIR / "training" / "train_data.json"
+CACHE_DIR = DATA_DIR / ".pipeline_cache"
+
+LOAD_PARAMS = {
+    "exclude_entities": ["UNKNOWN", "Graduation Year", "Years of Experience"],
+    "split_skill_entities": True,
+    "train_ratio": 0.8,
+    "seed": 0,
+}
+AUGMENT_PARAMS = {
+    # One budget of budget x the corpus size covers every augmented record: the synthetic
+    # context / skills / look-alike examples first (each ratio x the corpus size; a look-alike
+    # is an email and a college record), then swap replicas for the documents that lift rare
+    # labels towards target_ratio x the most frequent label (at most max_per_doc per document),
+    # then one boundary replica for up to boundary_ratio x the corpus size documents
+    "target_ratio": 0.5,
+    "budget": 3.0,
+    "max_per_doc": 30,
+    "boundary_ratio": 0.5,
+    "context_ratio": 0.5,
+    "skills_ratio": 0.4,
+    "lookalike_ratio": 0.2,
+    "seed": 0,
+}
+VARIATION_PARAMS = {
+    "seed": 0,
+    "weighting": "rarity",  # favour variations the corpus rarely contains (None: uniform)
+    "label_rarity": True,  # swap entities of rare labels more often
+}
+N_PROCESS = None  # all cores
+# Keep the augmented docs of unchanged documents across runs and only augment new or
+# modified ones (see incremental_augmentation.py). The variation pools are pinned in the
+# index directory on the first run; delete the directory to rebuild everything.
+INCREMENTAL_AUGMENT = False
+AUGMENT_INDEX_DIR = DATA_DIR / "augment_index"
+
+
+def write_records(records, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            write_jsonl_record(f, record)
+
+
+def build_load(out_dir):
+    train_data, val_data = load_ner_records(NER_DATASET_PATH, TRAIN_DATA_PATH, **LOAD_PARAMS)
+    write_records(train_data, out_dir / "train.jsonl")
+    write_records(val_data, out_dir / "dev.jsonl")
+
+
+def build_skill_gazetteer(train_jsonl):
+    def build(out_dir):
+        # Corpus skills plus the curated vocabulary used for augmentation
+        gazetteer = build_gazetteer(read_records(train_jsonl, "augmented_jsonl"),
+                                    extra_terms=expand_skills_vocabulary([]))
+        gazetteer.to_disk(out_dir / "skill_gazetteer.json")
+    return build
+
+
+def build_variations_stage(train_jsonl, gazetteer_path):
+    def build(out_dir):
+        fake = Faker()
+        fake.seed_instance(derive_seed(VARIATION_PARAMS["seed"], "variations"))
+        pools = build_variation_pools(list(read_records(train_jsonl, "augmented_jsonl")), fake,
+                                      SkillGazetteer.from_disk(gazetteer_path), VARIATION_PARAMS["weighting"],
+                                      VARIATION_PARAMS["label_rarity"])
+        save_variation_pools(pools, out_dir / "variation_pools.json")
+    return build
+
+
+def synthetic_counts(n_docs):
+    """Synthetic context / skills / look-alike counts for a corpus of `n_docs` documents."""
+    return {
+        f"{kind}_count": int(AUGMENT_PARAMS[f"{kind}_ratio"] * n_docs)
+        for kind in ("context", "skills", "lookalike")
+    }
+
+
+def plan_augmentation(train_data):
+    """Swap and boundary replica plans for `train_data` under the AUGMENT_PARAMS budget."""
+    counts = synthetic_counts(len(train_data))
+    plans, _ = plan_augmentation_budget(
+        train_data,
+        SUBSTITUTION_RATES,
+        budget=AUGMENT_PARAMS["budget"],
+        target_ratio=AUGMENT_PARAMS["target_ratio"],
+        max_per_doc=AUGMENT_PARAMS["max_per_doc"],
+        boundary_ratio=AUGMENT_PARAMS["boundary_ratio"],
+        n_synthetic=counts["context_count"] + counts["skills_count"] + 2 * counts["lookalike_count"],
+    )
+    return plans
+
+
+def build_augment(train_jsonl, variations_path):
+    def build(out_dir):
+        train_data = list(read_records(train_jsonl, "augmented_jsonl"))
+        plans = plan_augmentation(train_data)
+        schedule_augmentation(
+            train_data,
+            out_dir / "augmented.jsonl",
+            master_seed=AUGMENT_PARAMS["seed"],
+            n_process=N_PROCESS,
+            replica_plan=plans["swap"],
+            boundary_plan=plans["boundary"],
+            variations=load_variation_pools(variations_path),
+            **synthetic_counts(len(train_data)),
+        )
+    return build
+
+
+def run_incremental_augment(train_jsonl, variations_path, out_path):
+    """Update the augmentation index with the current training set and assemble the corpus."""
+    pools_path = AUGMENT_INDEX_DIR / "variation_pools.json"
+    if not pools_path.exists():
+        AUGMENT_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(variations_path, pools_path)
+    train_data = list(read_records(train_jsonl, "augmented_jsonl"))
+    plans = plan_augmentation(train_data)
+    augment_incremental(
+        train_data,
+        AUGMENT_INDEX_DIR,
+        out_path,
+        master_seed=AUGMENT_PARAMS["seed"],
+        n_process=N_PROCESS,
+        replica_plan=plans["swap"],
+        boundary_plan=plans["boundary"],
+        variations=load_variation_pools(pools_path),
+        **synthetic_counts(len(train_data)),
+    )
+    return out_path
+
+
+def build_docbin(jsonl_path, name):
+    def build(out_dir):
+        write_docbin(read_records(jsonl_path, "augmented_jsonl"), out_dir / name, n_process=N_PROCESS)
+    return build
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
+    cache = StageCache(CACHE_DIR, max_bytes=50e9, max_age=30 * 24 * 3600)
+    export_code = code_version(docbin_builder, overlaps)
 
     logger.info("Loading and exporting NER data...")
-    train_data, val_data = load_and_export_ner_data()
+    load_dir = cache.run(
+        "load", build_load,
+        inputs=[NER_DATASET_PATH, TRAIN_DATA_PATH],
+        params=LOAD_PARAMS,
+        code=code_version(Data_loader, readers, skills, tools),
+    )
+    dev_dir = cache.run(
+        "export_dev", build_docbin(load_dir / "dev.jsonl", "dev.spacy"),
+        inputs=[load_dir / "dev.jsonl"], code=export_code,
+    )
+    export_artifact(dev_dir, "dev.spacy", DATA_DIR / "dev.spacy")
+
+    gazetteer_dir = cache.run(
+        "skill_gazetteer", build_skill_gazetteer(load_dir / "train.jsonl"),
+        inputs=[load_dir / "train.jsonl"],
+        code=code_version(skill_gazetteer, skills, entity_variations),
+    )
+    export_artifact(gazetteer_dir, "skill_gazetteer.json", DATA_DIR / "skill_gazetteer.json")
 
     logger.info("Augmenting and balancing training data...")
-    augmented_train_data = augment_and_balance_data(train_data)
+    gazetteer_path = gazetteer_dir / "skill_gazetteer.json"
+    # Replacement pools are built once and reused until the corpus or the generators change
+    variations_dir = cache.run(
+        "variations", build_variations_stage(load_dir / "train.jsonl", gazetteer_path),
+        inputs=[load_dir / "train.jsonl", gazetteer_path],
+        params=VARIATION_PARAMS,
+        code=code_version(entity_variations, skill_gazetteer, variation_pool),
+    )
+    variations_path = variations_dir / "variation_pools.json"
+    if INCREMENTAL_AUGMENT:
+        train_path = run_incremental_augment(load_dir / "train.jsonl", variations_path,
+                                             DATA_DIR / "augmented_training_data.spacy")
+        visualized = (train_path, "docbin")
+    else:
+        augment_dir = cache.run(
+            "augment", build_augment(load_dir / "train.jsonl", variations_path),
+            inputs=[load_dir / "train.jsonl", variations_path],
+            params=AUGMENT_PARAMS,
+            code=code_version(augmentation, augmentation_scheduler, entity_variations, rebalancing, variation_pool,
+                              tools),
+        )
+        train_dir = cache.run(
+            "export_train", build_docbin(augment_dir / "augmented.jsonl", "augmented_training_data.spacy"),
+            inputs=[augment_dir / "augmented.jsonl"], code=export_code,
+        )
+        export_artifact(train_dir, "augmented_training_data.spacy", DATA_DIR / "augmented_training_data.spacy")
+        visualized = (augment_dir / "augmented.jsonl", "augmented_jsonl")
+    logger.info(f"Stage cache: {cache.hits} hits, {cache.misses} misses")
+    cache.evict()
 
     logger.info("Visualizing data distributions...")
-    visualize_data()
+    visualize_data(*visualized)
 
-    logger.info("Pipeline completed successfully.")
\ No newline at end of file
+    logger.info("Pipeline completed successfully.")
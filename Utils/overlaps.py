@@ -0,0 +1,68 @@
+import numpy as np
+
+
+def filter_non_overlapping_spans(spans):
+    """
+    Given a list of spaCy Span objects, return only non-overlapping spans.
+    Spans are visited by earliest start, longest first; a span is kept when it
+    starts at or after the end of the last kept span (an end-pointer sweep), which
+    is linear after the sort regardless of span length.
+    """
+    filtered = []
+    covered_end = None
+    for span in sorted(spans, key=lambda s: (s.start, -s.end)):
+        if span.end <= span.start:
+            # Empty spans cover nothing, so they never conflict
+            filtered.append(span)
+        elif covered_end is None or span.start >= covered_end:
+            filtered.append(span)
+            covered_end = span.end
+    return filtered
+
+
+def filter_non_overlapping_offsets(entities):
+    """
+    Same resolution as filter_non_overlapping_spans for (start, end, label)
+    character offsets, returned in sorted order.
+    """
+    filtered = []
+    covered_end = None
+    for ent in sorted(entities, key=lambda e: (e[0], -e[1])):
+        start, end = ent[0], ent[1]
+        if end <= start:
+            filtered.append(ent)
+        elif covered_end is None or start >= covered_end:
+            filtered.append(ent)
+            covered_end = end
+    return filtered
+
+
+def resolve_overlaps(starts, ends, offsets=None):
+    """
+    Batch overlap resolution for a whole corpus in one call.
+    `starts` / `ends` are flat span arrays and `offsets` the per-document span
+    offsets (as in SpanCorpus); without offsets all spans belong to one document.
+    Returns a boolean mask, aligned with the input, of the spans to keep.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if offsets is None:
+        docs = np.zeros(len(starts), dtype=np.int64)
+    else:
+        docs = np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+    # Document, then earliest start, then longest first; lexsort is stable like sorted()
+    order = np.lexsort((-ends, starts, docs))
+    keep = np.zeros(len(starts), dtype=bool)
+    current_doc = None
+    covered_end = None
+    for i, doc, start, end in zip(order.tolist(), docs[order].tolist(),
+                                  starts[order].tolist(), ends[order].tolist()):
+        if doc != current_doc:
+            current_doc = doc
+            covered_end = None
+        if end <= start:
+            keep[i] = True
+        elif covered_end is None or start >= covered_end:
+            keep[i] = True
+            covered_end = end
+    return keep
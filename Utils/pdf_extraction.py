@@ -0,0 +1,158 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pymupdf
+
+from inference import entities_to_record, pipe_entities
+from result_cache import cached_pipe_entities
+
+
+class PdfText(NamedTuple):
+    """
+    Whitespace-normalized text of a PDF with word-level offset maps.
+    Word i covers text[word_starts[i]:word_ends[i]] and sits on page word_pages[i]
+    inside word_boxes[i] = (x0, y0, x1, y1); page p starts at text[page_starts[p]].
+    """
+    path: str
+    text: str
+    page_starts: np.ndarray
+    word_starts: np.ndarray
+    word_ends: np.ndarray
+    word_pages: np.ndarray
+    word_boxes: np.ndarray
+
+
+def extract_pdf(path, data=None, sort=False):
+    """
+    Extract the text of a PDF as its words joined by single spaces (the same text
+    as ' '.join(page_text.split()), in content-stream order), built with one join,
+    along with the page and bounding box of every word. With `data`, the PDF is
+    read from those bytes and `path` is only used as its name. `sort` reorders the
+    words top-to-bottom, left-to-right instead, which changes the reading order
+    of multi-column CVs from the one the model was trained on.
+    """
+    words, pages, boxes = [], [], []
+    with (pymupdf.open(stream=data, filetype="pdf") if data is not None else pymupdf.open(path)) as pdf:
+        n_pages = len(pdf)
+        for page in pdf:
+            for x0, y0, x1, y1, word, *_ in page.get_text("words", sort=sort):
+                words.append(word)
+                pages.append(page.number)
+                boxes.append((x0, y0, x1, y1))
+    lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+    word_starts = np.zeros(len(words), dtype=np.int64)
+    np.cumsum(lengths[:-1] + 1, out=word_starts[1:])
+    word_ends = word_starts + lengths
+    word_pages = np.asarray(pages, dtype=np.int32)
+    # Pages without words start where the next word does
+    first_word = np.searchsorted(word_pages, np.arange(n_pages))
+    text = " ".join(words)
+    page_starts = np.append(word_starts, len(text))[first_word]
+    return PdfText(
+        path=str(path),
+        text=text,
+        page_starts=page_starts,
+        word_starts=word_starts,
+        word_ends=word_ends,
+        word_pages=word_pages,
+        word_boxes=np.asarray(boxes, dtype=np.float32).reshape(-1, 4),
+    )
+
+
+def locate_span(pdf_text, start, end):
+    """
+    Page coordinates of the character span [start, end) of pdf_text.text, as one
+    (page, x0, y0, x1, y1) box per page the span touches.
+    """
+    lo = np.searchsorted(pdf_text.word_ends, start, side="right")
+    hi = np.searchsorted(pdf_text.word_starts, end, side="left")
+    boxes = []
+    for page in np.unique(pdf_text.word_pages[lo:hi]):
+        on_page = pdf_text.word_boxes[lo:hi][pdf_text.word_pages[lo:hi] == page]
+        x0, y0 = on_page[:, :2].min(axis=0)
+        x1, y1 = on_page[:, 2:].max(axis=0)
+        boxes.append((int(page), float(x0), float(y0), float(x1), float(y1)))
+    return boxes
+
+
+def page_of(pdf_text, offset):
+    """Page number of a character offset."""
+    return int(np.searchsorted(pdf_text.page_starts, offset, side="right") - 1)
+
+
+def _extract_safe(path):
+    try:
+        return extract_pdf(path)
+    except Exception as e:  # a corrupt file must not stop a batch of thousands
+        logging.warning(f"Could not extract {path}: {e}")
+        return None
+
+
+def iter_pdf_paths(sources):
+    """Expand files and directories into the PDF paths they contain."""
+    for source in map(Path, sources):
+        if source.is_dir():
+            yield from sorted(p for p in source.rglob("*") if p.suffix.lower() == ".pdf")
+        else:
+            yield source
+
+
+def extract_pdfs(paths, n_process=None):
+    """
+    Extract PDFs across a process pool and yield a PdfText per readable file, in
+    input order. Only a bounded number of files is in flight at once, so `paths`
+    may be a generator and results can be consumed while extraction continues.
+    """
+    n_process = n_process or os.cpu_count() or 1
+    if n_process == 1:
+        for path in paths:
+            result = _extract_safe(path)
+            if result is not None:
+                yield result
+        return
+    with ProcessPoolExecutor(max_workers=n_process) as executor:
+        pending = []
+        for path in paths:
+            pending.append(executor.submit(_extract_safe, path))
+            if len(pending) >= 4 * n_process:
+                result = pending.pop(0).result()
+                if result is not None:
+                    yield result
+        for future in pending:
+            result = future.result()
+            if result is not None:
+                yield result
+
+
+def pdf_record(pdf_text, entities):
+    """
+    Entity record of a parsed PDF, with each entity traced back to page coordinates.
+    """
+    record = entities_to_record(pdf_text.path, pdf_text.text, entities)
+    for ent in record["entities"]:
+        boxes = locate_span(pdf_text, ent["start"], ent["end"])
+        ent["page"] = boxes[0][0] if boxes else page_of(pdf_text, ent["start"])
+        ent["boxes"] = [list(box) for box in boxes]
+    return record
+
+
+def extract_pdf_entities(nlp, sources, batch_size=32, n_process=1, extract_process=None, max_chars=None,
+                         cache=None):
+    """
+    Stream PDFs from the extraction pool straight into nlp.pipe and yield entity
+    records with page locations. `extract_process` sizes the extraction pool,
+    `n_process` the spaCy workers; `max_chars` enables chunked inference for long CVs.
+    With a ResultCache, already-seen documents skip the pipeline.
+    """
+    pdf_texts = extract_pdfs(iter_pdf_paths(sources), extract_process)
+    pairs = ((pdf_text.text, pdf_text) for pdf_text in pdf_texts)
+    if cache is not None:
+        results = cached_pipe_entities(nlp, pairs, cache, batch_size, n_process, max_chars)
+    else:
+        results = pipe_entities(nlp, pairs, batch_size, n_process, max_chars)
+    for _, pdf_text, entities in results:
+        yield pdf_record(pdf_text, entities)
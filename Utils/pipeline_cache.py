@@ -0,0 +1,193 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+META_NAME = "meta.json"
+FILE_HASHES_NAME = "file_hashes.json"
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version(*modules):
+    """
+    Hash of the source of the given modules, so a stage is invalidated when the
+    code that produces it changes.
+    """
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(module.__name__.encode("utf-8"))
+        digest.update(inspect.getsource(module).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _dir_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+class StageCache:
+    """
+    Content-addressed cache for data-preparation stages.
+    A stage is keyed on the contents of its input files, its parameters and the
+    source of the code that builds it; when nothing changed the artifacts of the
+    previous run are reused instead of being rebuilt. Each entry is a directory
+    under `root` with a meta.json whose mtime records the last use. Entries older
+    than `max_age` seconds are dropped first, then the least recently used ones
+    until the cache fits in `max_bytes`.
+    """
+
+    def __init__(self, root, max_bytes=None, max_age=None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._file_hashes = self._load_file_hashes()
+
+    def _load_file_hashes(self):
+        path = self.root / FILE_HASHES_NAME
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _save_file_hashes(self):
+        tmp = self.root / (FILE_HASHES_NAME + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._file_hashes, f)
+        os.replace(tmp, self.root / FILE_HASHES_NAME)
+
+    def file_digest(self, path):
+        """
+        Content hash of an input file. Hashes of multi-GB inputs are memoized on
+        (path, size, mtime) so unchanged files are not re-read on every run.
+        """
+        path = Path(path).resolve()
+        stat = path.stat()
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        cached = self._file_hashes.get(str(path))
+        if cached and cached["stamp"] == stamp:
+            return cached["sha256"]
+        digest = hash_file(path)
+        self._file_hashes[str(path)] = {"stamp": stamp, "sha256": digest}
+        self._save_file_hashes()
+        return digest
+
+    def key(self, stage, inputs=(), params=None, code=""):
+        """Cache key of a stage run."""
+        payload = {
+            "stage": stage,
+            "inputs": [self.file_digest(path) for path in inputs],
+            "params": params or {},
+            "code": code,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def entry_dir(self, stage, key):
+        return self.root / f"{stage}-{key[:16]}"
+
+    def lookup(self, stage, key):
+        """Artifact directory of a completed entry, or None. Marks the entry as used."""
+        entry = self.entry_dir(stage, key)
+        meta = entry / META_NAME
+        if not meta.exists():
+            return None
+        os.utime(meta)
+        return entry
+
+    def run(self, stage, build, inputs=(), params=None, code=""):
+        """
+        Return the artifact directory of `stage`, calling build(out_dir) only on a miss.
+        The entry is built in a temporary directory and renamed into place once
+        complete, so an interrupted run never leaves a half-written entry behind.
+        """
+        key = self.key(stage, inputs, params, code)
+        entry = self.lookup(stage, key)
+        if entry is not None:
+            self.hits += 1
+            logging.info(f"[cache] {stage}: reusing {entry}")
+            return entry
+        self.misses += 1
+        logging.info(f"[cache] {stage}: building")
+        entry = self.entry_dir(stage, key)
+        tmp = entry.with_name(entry.name + f".tmp-{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        start = time.time()
+        build(tmp)
+        meta = {
+            "stage": stage,
+            "key": key,
+            "params": params or {},
+            "inputs": [str(path) for path in inputs],
+            "build_seconds": round(time.time() - start, 2),
+            "size": _dir_size(tmp),
+        }
+        with open(tmp / META_NAME, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, default=str)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+        return entry
+
+    def entries(self):
+        """(last_used, size, path) of every complete entry."""
+        found = []
+        for meta in self.root.glob(f"*/{META_NAME}"):
+            with open(meta, "r", encoding="utf-8") as f:
+                size = json.load(f).get("size", 0)
+            found.append((meta.stat().st_mtime, size, meta.parent))
+        return found
+
+    def evict(self):
+        """
+        Drop entries unused for longer than max_age, then least recently used
+        entries until the total size is within max_bytes. Returns the removed paths.
+        """
+        removed = []
+        entries = sorted(self.entries())
+        now = time.time()
+        if self.max_age is not None:
+            for entry in [e for e in entries if now - e[0] > self.max_age]:
+                removed.append(entry[2])
+                entries.remove(entry)
+        if self.max_bytes is not None:
+            total = sum(size for _, size, _ in entries)
+            while entries and total > self.max_bytes:
+                _, size, path = entries.pop(0)
+                removed.append(path)
+                total -= size
+        for path in removed:
+            shutil.rmtree(path, ignore_errors=True)
+            logging.info(f"[cache] evicted {path}")
+        return removed
+
+
+def export_artifact(entry, name, dest):
+    """
+    Copy artifact `name` of a cache entry to `dest`. The copy is skipped when
+    `dest` already matches it (same size and mtime, which copy2 preserves), so
+    multi-GB outputs are not rewritten on every run.
+    """
+    src = Path(entry) / name
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    src_stat = src.stat()
+    if dest.exists():
+        dest_stat = dest.stat()
+        if dest_stat.st_size == src_stat.st_size and dest_stat.st_mtime_ns == src_stat.st_mtime_ns:
+            return dest
+    shutil.copy2(src, dest)
+    return dest
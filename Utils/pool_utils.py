@@ -0,0 +1,59 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+
+import spacy
+
+from span_store import SpanCorpus
+
+# Per-process state set by init_worker: the variation pools and a blank pipeline
+worker_state = {"variations": None, "nlp": None}
+
+
+def init_worker(variations=None, lang=None):
+    """Pool initializer: keep `variations` and a blank `lang` pipeline for the tasks of this process."""
+    worker_state["variations"] = variations
+    worker_state["nlp"] = spacy.blank(lang) if lang else None
+
+
+def worker_pool(n_process, variations=None, lang=None):
+    """
+    A ProcessPoolExecutor whose workers run init_worker. With n_process == 1 this
+    process is initialized instead and a null context is returned, so
+    imap_bounded(None, ...) runs the tasks inline.
+    """
+    if n_process == 1:
+        init_worker(variations, lang)
+        return nullcontext()
+    return ProcessPoolExecutor(max_workers=n_process, initializer=init_worker, initargs=(variations, lang))
+
+
+def imap_bounded(executor, func, tasks, max_pending):
+    """
+    Ordered map over `tasks` keeping at most `max_pending` futures in flight, or a
+    plain map in this process when `executor` is None.
+    """
+    if executor is None:
+        yield from map(func, tasks)
+        return
+    pending = []
+    for task in tasks:
+        pending.append(executor.submit(func, task))
+        if len(pending) >= max_pending:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+
+def chunked(items, size):
+    """Lists of up to `size` items; a SpanCorpus is cut into compact column slices instead."""
+    if isinstance(items, SpanCorpus):
+        for lo in range(0, len(items), size):
+            yield items.slice(lo, min(lo + size, len(items)))
+        return
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
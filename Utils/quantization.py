@@ -0,0 +1,298 @@
+import argparse
+import json
+import logging
+import shutil
+import sys
+from pathlib import Path
+
+from spacy.language import Language
+from spacy.util import load_config, load_meta
+
+from evaluation import evaluate_models, load_gold
+
+MODEL_PATH = Path(r"C:\ML\CV-Parsing\transformer\model-best")
+OUTPUT_PATH = Path(r"C:\ML\CV-Parsing\transformer\model-int8")
+DEV_PATH = Path(r"C:\ML\CV-Parsing\Data\dev.spacy")
+REPORT_NAME = "quantization_report.json"
+ONNX_NAME = "model.int8.onnx"
+BACKENDS = ("torch", "onnx")
+# Largest drops (absolute F1) the regression check accepts
+MAX_F1_DROP = 0.01
+MAX_LABEL_F1_DROP = 0.03
+
+_component_class = None
+
+
+def _hf_shim(transformer):
+    """The HFShim holding the Hugging Face model of a spacy-transformers component."""
+    return transformer.model.layers[0].shims[0]
+
+
+def _set_hf_model(transformer, hf_model):
+    shim = _hf_shim(transformer)
+    shim._model = hf_model
+    shim._hfmodel.transformer = hf_model
+
+
+def quantize_torch(hf_model):
+    """Dynamic int8 quantization of every nn.Linear (attention and feed-forward weights)."""
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(hf_model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export_onnx(transformer, out_path, opset=14):
+    """
+    Export the component's Hugging Face model to ONNX (input_ids and attention_mask
+    in, last_hidden_state out, dynamic batch and length) and quantize its weights
+    to int8 with ONNX Runtime. Writes `out_path`.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    shim = _hf_shim(transformer)
+    hf_model = shim._hfmodel.transformer.eval()
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    sample = shim._hfmodel.tokenizer(["Senior Data Scientist at Example Corp"], return_tensors="pt")
+    fp32_path = Path(out_path).with_suffix(".fp32.onnx")
+    axes = {0: "batch", 1: "length"}
+    with torch.no_grad():
+        torch.onnx.export(LastHiddenState(hf_model), (sample["input_ids"], sample["attention_mask"]), str(fp32_path),
+                          input_names=["input_ids", "attention_mask"], output_names=["last_hidden_state"],
+                          dynamic_axes={"input_ids": axes, "attention_mask": axes, "last_hidden_state": axes},
+                          opset_version=opset)
+    quantize_dynamic(str(fp32_path), str(out_path), weight_type=QuantType.QInt8)
+    fp32_path.unlink()
+    return out_path
+
+
+def onnx_module(path, config, num_threads=0):
+    """
+    torch.nn.Module running an ONNX Runtime session in place of the Hugging Face
+    model, returning the same BaseModelOutput that spacy-transformers reads.
+    """
+    import onnxruntime
+    import torch
+    from transformers.modeling_outputs import BaseModelOutput
+
+    class OnnxTransformer(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            options = onnxruntime.SessionOptions()
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+            self.session = onnxruntime.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+            self.config = config
+
+        def forward(self, input_ids=None, attention_mask=None, **kwargs):
+            feeds = {"input_ids": input_ids.cpu().numpy(), "attention_mask": attention_mask.cpu().numpy()}
+            hidden = self.session.run(["last_hidden_state"], feeds)[0]
+            return BaseModelOutput(last_hidden_state=torch.from_numpy(hidden))
+
+    return OnnxTransformer()
+
+
+def quantized_transformer_class():
+    """
+    Subclass of the spacy-transformers Transformer that swaps in the quantized
+    model after loading its weights. Built on first use so this module imports
+    without torch or spacy-transformers installed.
+    """
+    global _component_class
+    if _component_class is not None:
+        return _component_class
+    from spacy_transformers import Transformer
+
+    class QuantizedTransformer(Transformer):
+        def __init__(self, vocab, model, set_extra_annotations, *, name, max_batch_items, backend, num_threads):
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown quantization backend {backend!r}, expected one of {BACKENDS}")
+            super().__init__(vocab, model, set_extra_annotations, name=name, max_batch_items=max_batch_items)
+            self.backend = backend
+            self.num_threads = num_threads
+            # Component directory the fp32 weights were loaded from
+            self.source_path = None
+
+        def from_disk(self, path, *, exclude=tuple()):
+            super().from_disk(path, exclude=exclude)
+            self.source_path = Path(path)
+            hf_model = _hf_shim(self)._hfmodel.transformer
+            if self.backend == "onnx":
+                _set_hf_model(self, onnx_module(Path(path) / ONNX_NAME, hf_model.config, self.num_threads))
+            else:
+                if self.num_threads:
+                    import torch
+
+                    # torch has one intra-op thread pool per process, so this also
+                    # applies to any other torch model running in this process
+                    logging.info(f"Setting torch's process-wide thread count to {self.num_threads}")
+                    torch.set_num_threads(self.num_threads)
+                _set_hf_model(self, quantize_torch(hf_model))
+            return self
+
+        def to_disk(self, path, *, exclude=tuple()):
+            """
+            Write the component like the fp32 Transformer (cfg and the fp32 model
+            weights it was loaded from, plus the int8 ONNX model), so a saved
+            pipeline loads and quantizes the same way again.
+            """
+            if self.source_path is None:
+                return super().to_disk(path, exclude=exclude)
+            path = Path(path)
+            super().to_disk(path, exclude=tuple(exclude) + ("model",))
+            names = ["model"] if "model" not in exclude else []
+            if self.backend == "onnx":
+                names.append(ONNX_NAME)
+            for name in names:
+                source, target = self.source_path / name, path / name
+                if source.resolve() == target.resolve():
+                    continue
+                if source.is_dir():
+                    shutil.copytree(source, target, dirs_exist_ok=True)
+                else:
+                    shutil.copyfile(source, target)
+
+    _component_class = QuantizedTransformer
+    return _component_class
+
+
+@Language.factory(
+    "quantized_transformer",
+    default_config={
+        "set_extra_annotations": {"@annotation_setters": "spacy-transformers.null_annotation_setter.v1"},
+        "max_batch_items": 4096,
+        "backend": "torch",
+        "num_threads": 0,
+    },
+)
+def make_quantized_transformer(nlp, name, model, set_extra_annotations, max_batch_items, backend, num_threads):
+    """
+    Drop-in for the `transformer` factory: the same model config and fp32 weights
+    on disk, quantized to int8 (torch) or replaced by an int8 ONNX Runtime
+    session (onnx) when the pipeline is loaded. Listeners such as `ner` connect as usual.
+    `num_threads` sizes the ONNX Runtime session; with the torch backend it is
+    passed to torch.set_num_threads, which is process-wide.
+    """
+    cls = quantized_transformer_class()
+    return cls(nlp.vocab, model, set_extra_annotations, name=name, max_batch_items=max_batch_items, backend=backend,
+               num_threads=num_threads)
+
+
+def export_quantized(model_path=MODEL_PATH, out_path=OUTPUT_PATH, backend="torch", num_threads=0,
+                     component="transformer"):
+    """
+    Write a copy of the pipeline whose `component` uses the quantized_transformer
+    factory. The onnx backend also exports the int8 ONNX model next to the
+    component's weights. The meta name gets a suffix, so result caches keyed on
+    it do not mix fp32 and int8 predictions. Load the copy with spacy.load once
+    this module is imported.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown quantization backend {backend!r}, expected one of {BACKENDS}")
+    model_path, out_path = Path(model_path), Path(out_path)
+    if out_path.resolve() == model_path.resolve():
+        raise ValueError("The quantized pipeline must be written to a new directory")
+    config = load_config(model_path / "config.cfg")
+    if config["components"].get(component, {}).get("factory") != "transformer":
+        raise ValueError(f"{component!r} in {model_path} is not a spacy-transformers component")
+    if out_path.exists():
+        shutil.rmtree(out_path)
+    shutil.copytree(model_path, out_path)
+
+    config["components"][component]["factory"] = "quantized_transformer"
+    config["components"][component]["backend"] = backend
+    config["components"][component]["num_threads"] = num_threads
+    config.to_disk(out_path / "config.cfg")
+
+    if backend == "onnx":
+        import spacy
+
+        nlp = spacy.load(model_path)
+        export_onnx(nlp.get_pipe(component), out_path / component / ONNX_NAME)
+
+    meta = load_meta(model_path / "meta.json")
+    meta["name"] = f"{meta.get('name', 'pipeline')}_{backend}_int8"
+    meta["quantization"] = {"component": component, "backend": backend, "dtype": "qint8", "source": str(model_path)}
+    with open(out_path / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    logging.info(f"Wrote {backend} int8 pipeline to {out_path}")
+    return out_path
+
+
+def check_regression(baseline_path, quantized_path, dev_path=DEV_PATH, out_path=None, batch_size=32,
+                     memory_docs=200, max_f1_drop=MAX_F1_DROP, max_label_f1_drop=MAX_LABEL_F1_DROP):
+    """
+    Score the fp32 and quantized pipelines on the same dev set (per-label F1,
+    docs/sec, latency percentiles) and measure their RAM in fresh processes.
+    `passed` is False when overall F1 drops by more than `max_f1_drop` or any
+    label's F1 by more than `max_label_f1_drop`.
+    """
+    # Imported here: distillation imports inference, which imports this module
+    from distillation import dir_size_mb, memory_profile
+
+    baseline, quantized = evaluate_models([baseline_path, quantized_path], dev_path, batch_size=batch_size)
+    texts = load_gold(dev_path)[0][:memory_docs]
+    for report, path in ((baseline, baseline_path), (quantized, quantized_path)):
+        # The child process imports this module so the quantized factory is registered
+        report["memory"] = dict(memory_profile(path, texts, batch_size, modules=["quantization"]),
+                                disk_mb=dir_size_mb(path))
+
+    f1_delta = {
+        label: round(quantized["per_label"].get(label, {}).get("f", 0.0) - scores["f"], 4)
+        for label, scores in baseline["per_label"].items()
+    }
+    regressions = {label: delta for label, delta in f1_delta.items() if delta < -max_label_f1_drop}
+    ents_f_delta = round(quantized["ents"]["f"] - baseline["ents"]["f"], 4)
+    memory = baseline["memory"]["model_mb"], quantized["memory"]["model_mb"]
+    comparison = {
+        "ents_f_delta": ents_f_delta,
+        "f1_delta": f1_delta,
+        "regressions": regressions,
+        "speedup": (round(quantized["throughput"]["docs_per_sec"] / baseline["throughput"]["docs_per_sec"], 2)
+                    if baseline["throughput"]["docs_per_sec"] else None),
+        "p95_latency_ratio": (round(quantized["latency_ms"]["p95"] / baseline["latency_ms"]["p95"], 3)
+                              if baseline["latency_ms"].get("p95") else None),
+        "model_memory_ratio": round(memory[1] / memory[0], 3) if memory[0] and memory[1] else None,
+        "passed": ents_f_delta >= -max_f1_drop and not regressions,
+    }
+    report = {"baseline": baseline, "quantized": quantized, "comparison": comparison}
+    if out_path is not None:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    logging.info(f"Quantized vs fp32: ents_f {ents_f_delta:+.4f}, {comparison['speedup']}x docs/s, "
+                 f"p95 latency x{comparison['p95_latency_ratio']}, memory x{comparison['model_memory_ratio']}")
+    if not comparison["passed"]:
+        logging.warning(f"Accuracy regression: ents_f {ents_f_delta:+.4f}, labels {regressions}")
+    return report
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Export an int8 transformer pipeline and check it against fp32.")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH, help="trained fp32 pipeline")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH, help="where to write the quantized pipeline")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--num-threads", type=int, default=0, help="inference threads (0: library default; process-wide for torch)")
+    parser.add_argument("--dev", type=Path, default=DEV_PATH)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-f1-drop", type=float, default=MAX_F1_DROP)
+    parser.add_argument("--max-label-f1-drop", type=float, default=MAX_LABEL_F1_DROP)
+    parser.add_argument("--check-only", action="store_true", help="skip the export, only rerun the check")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = _parse_args()
+    if not args.check_only:
+        export_quantized(args.model, args.output, args.backend, args.num_threads)
+    result = check_regression(args.model, args.output, args.dev, args.output / REPORT_NAME, args.batch_size,
+                              max_f1_drop=args.max_f1_drop, max_label_f1_drop=args.max_label_f1_drop)
+    sys.exit(0 if result["comparison"]["passed"] else 1)
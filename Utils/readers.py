@@ -0,0 +1,208 @@
+import json
+from typing import Callable, Dict, Iterator, List, NamedTuple, Tuple
+
+import spacy
+from spacy.tokens import DocBin
+
+from skills import normalize_skills
+
+
+class Record(NamedTuple):
+    """
+    A resume text with its entities as (start, end, label) character spans.
+    Unpacks as `text, entities`.
+    """
+    text: str
+    entities: List[Tuple[int, int, str]]
+
+
+READERS: Dict[str, Callable[..., Iterator[Record]]] = {}
+
+
+def register_reader(name):
+    """
+    Register a reader under `name` so read_records(path, name) can dispatch to it.
+    A reader takes a path plus keyword options and yields Record objects.
+    """
+    def decorator(func):
+        READERS[name] = func
+        return func
+    return decorator
+
+
+def read_records(path, fmt, **options):
+    """
+    Stream Records from `path` using the reader registered for `fmt`.
+    """
+    if fmt not in READERS:
+        raise ValueError(f"Unknown annotation format '{fmt}', expected one of {sorted(READERS)}")
+    return READERS[fmt](path, **options)
+
+
+def iter_json_array(path, chunk_size=1 << 20):
+    """
+    Incrementally decode the items of a top-level JSON array without
+    loading the whole file, reading `chunk_size` characters at a time.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        started = False
+        eof = False
+        while True:
+            # Skip whitespace and separators between items
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if not started and pos < len(buffer):
+                if buffer[pos] != "[":
+                    raise ValueError(f"{path} does not contain a JSON array")
+                started = True
+                pos += 1
+                continue
+            if started and pos < len(buffer) and buffer[pos] == "]":
+                return
+            if pos < len(buffer):
+                try:
+                    item, new_pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    item = None
+                # An item ending exactly at the buffer edge may be a truncated number
+                if item is not None and (new_pos < len(buffer) or eof):
+                    yield item
+                    pos = new_pos
+                    continue
+            if eof:
+                if not started:
+                    raise ValueError(f"{path} does not contain a JSON array")
+                raise ValueError(f"Unterminated JSON array in {path}")
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+def normalize_offsets(text, triples, exclude_entities=frozenset()):
+    """
+    Normalize [start, end, label] triples into in-bounds (start, end, label) tuples,
+    dropping excluded labels and empty or out-of-range spans.
+    """
+    text_len = len(text)
+    spans = []
+    for start, end, label in triples:
+        if label in exclude_entities:
+            continue
+        start, end = int(start), int(end)
+        if 0 <= start < end <= text_len:
+            spans.append((start, end, label))
+    return spans
+
+
+def _split_skill_span(text, start, end, label, spans):
+    skill_text = text[start:end]
+    # Use comma/semicolon to split skills
+    if "," in skill_text or ";" in skill_text:
+        normalized = normalize_skills(skill_text.replace(";", ","))
+        for skill in [s.strip() for s in normalized.split(",") if s.strip()]:
+            skill_start = text.find(skill, start, end)
+            if skill_start != -1:
+                spans.append((skill_start, skill_start + len(skill), label))
+    else:
+        spans.append((start, end, label))
+
+
+def normalize_dataturks(item, exclude_entities=frozenset(), split_skill_entities=False):
+    """
+    Normalize one Dataturks item ({"content": ..., "annotation": [...]}) into a Record.
+    """
+    text = item["content"]
+    text_len = len(text)
+    spans = []
+    for annotation in item["annotation"]:
+        label = annotation["label"]
+        if isinstance(label, list):
+            if not label:
+                continue  # skip if label list is empty
+            label = label[0]
+        if label in exclude_entities:
+            continue
+        split = split_skill_entities and label == "Skills"
+        for point in annotation["points"]:
+            if not isinstance(point, dict):
+                continue
+            try:
+                start, end = int(point["start"]), int(point["end"])
+            except (KeyError, ValueError, TypeError):
+                continue
+            # Skip invalid ranges
+            if not (0 <= start < end <= text_len):
+                continue
+            if split:
+                _split_skill_span(text, start, end, label, spans)
+            else:
+                spans.append((start, end, label))
+    return Record(text, spans)
+
+
+@register_reader("dataturks")
+def read_dataturks(path, exclude_entities=(), split_skill_entities=False):
+    """
+    Dataturks JSONL export ("Entity Recognition in Resumes.json"), one resume per line.
+    """
+    exclude_entities = frozenset(exclude_entities)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield normalize_dataturks(json.loads(line), exclude_entities, split_skill_entities)
+
+
+@register_reader("spacy_json")
+def read_spacy_json(path, exclude_entities=()):
+    """
+    JSON array of [text, {"entities": [[start, end, label], ...]}] pairs (train_data.json).
+    """
+    exclude_entities = frozenset(exclude_entities)
+    for text, annotations in iter_json_array(path):
+        yield Record(text, normalize_offsets(text, annotations["entities"], exclude_entities))
+
+
+@register_reader("augmented_json")
+def read_augmented_json(path, exclude_entities=()):
+    """
+    JSON array of {"text": ..., "entities": [[start, end, label], ...]} objects,
+    as written by augment_and_balance_data.
+    """
+    exclude_entities = frozenset(exclude_entities)
+    for item in iter_json_array(path):
+        text = item["text"]
+        yield Record(text, normalize_offsets(text, item["entities"], exclude_entities))
+
+
+@register_reader("augmented_jsonl")
+def read_augmented_jsonl(path, exclude_entities=()):
+    """
+    JSONL with one {"text": ..., "entities": [[start, end, label], ...]} object per line,
+    as streamed by the augmentation scheduler.
+    """
+    exclude_entities = frozenset(exclude_entities)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                text = item["text"]
+                yield Record(text, normalize_offsets(text, item["entities"], exclude_entities))
+
+
+@register_reader("docbin")
+def read_docbin(path, exclude_entities=(), lang="en"):
+    """
+    A .spacy DocBin (e.g. augmented_training_data.spacy), with the doc entities as spans.
+    """
+    exclude_entities = frozenset(exclude_entities)
+    vocab = spacy.blank(lang).vocab
+    for doc in DocBin().from_disk(path).get_docs(vocab):
+        yield Record(doc.text, [(ent.start_char, ent.end_char, ent.label_) for ent in doc.ents
+                                if ent.label_ not in exclude_entities])
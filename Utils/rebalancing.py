@@ -0,0 +1,164 @@
+import logging
+
+import numpy as np
+
+from span_store import SpanCorpus
+
+
+def label_count_matrix(data, labels):
+    """(n_docs, n_labels) matrix of entity counts per document for `labels`."""
+    index = {label: j for j, label in enumerate(labels)}
+    if isinstance(data, SpanCorpus):
+        # Map corpus label ids to columns; labels outside `labels` go to a dropped extra column
+        columns = np.array([index.get(label, len(labels)) for label in data.labels], dtype=np.int64)
+        docs = np.repeat(np.arange(len(data), dtype=np.int64), np.diff(data.offsets))
+        counts = np.zeros((len(data), len(labels) + 1), dtype=np.int64)
+        np.add.at(counts, (docs, columns[data.label_ids]), 1)
+        return counts[:, :-1]
+    counts = np.zeros((len(data), len(labels)), dtype=np.int64)
+    for i, (_, entities) in enumerate(data):
+        for _, _, label in entities:
+            j = index.get(label)
+            if j is not None:
+                counts[i, j] += 1
+    return counts
+
+
+def label_targets(totals, target_ratio=0.5, targets=None):
+    """
+    Target count per label: explicit `targets` where given, otherwise
+    `target_ratio` times the count of the most frequent balanced label.
+    """
+    targets = dict(targets or {})
+    ceiling = max(totals.values(), default=0)
+    return {label: targets.get(label, int(np.ceil(ceiling * target_ratio))) for label in totals}
+
+
+def plan_replicas(
+    data,
+    labels,
+    target_ratio=0.5,
+    targets=None,
+    max_replicas=None,
+    max_per_doc=30,
+):
+    """
+    Decide how many swap replicas each document gets so every label in `labels`
+    reaches its target count (see label_targets), instead of copying every
+    document with a target label a fixed number of times.
+
+    A swap replica keeps the labels of its source, so each replica of document d
+    adds d's label counts. Replicas are handed out one at a time to the label
+    furthest below its target (relative to the target), going round-robin
+    through the documents richest in that label and poorest in the others, so
+    labels that are already common are inflated as little as possible. Planning
+    stops once every deficit is covered, `max_replicas` replicas are planned in
+    total, or no document can take more than `max_per_doc`.
+
+    Returns (plan, report): plan[i] is the replica count of data[i] (usable as
+    schedule_augmentation's replica_plan) and report gives per-label
+    before / target / planned counts.
+    """
+    labels = list(labels)
+    counts = label_count_matrix(data, labels)
+    totals = dict(zip(labels, counts.sum(axis=0).tolist()))
+    target = label_targets(totals, target_ratio, targets)
+    target_arr = np.array([target[label] for label in labels], dtype=np.float64)
+    deficit = np.maximum(target_arr - counts.sum(axis=0), 0).astype(np.float64)
+    if max_replicas is None:
+        max_replicas = max_per_doc * len(counts)
+
+    # Per label, documents ordered by how concentrated they are on that label
+    doc_totals = counts.sum(axis=1)
+    orders = []
+    for j in range(len(labels)):
+        score = counts[:, j] / (1.0 + doc_totals - counts[:, j])
+        order = np.argsort(-score, kind="stable")
+        orders.append(order[counts[order, j] > 0])
+    cursors = [0] * len(labels)
+    exhausted = np.zeros(len(labels), dtype=bool)
+
+    plan = np.zeros(len(counts), dtype=np.int64)
+    n_planned = 0
+    while n_planned < max_replicas:
+        open_labels = (deficit > 0) & ~exhausted
+        if not open_labels.any():
+            break
+        relative = np.where(open_labels, deficit / np.maximum(target_arr, 1), -1.0)
+        j = int(np.argmax(relative))
+        order = orders[j]
+        # Next document for this label with spare capacity, cycling through the order
+        doc = None
+        for _ in range(len(order)):
+            candidate = order[cursors[j] % len(order)]
+            cursors[j] += 1
+            if plan[candidate] < max_per_doc:
+                doc = candidate
+                break
+        if doc is None:
+            exhausted[j] = True
+            continue
+        plan[doc] += 1
+        deficit = np.maximum(deficit - counts[doc], 0)
+        n_planned += 1
+
+    planned = counts.sum(axis=0) + plan @ counts
+    report = {
+        label: {"before": totals[label], "target": target[label], "planned": int(planned[j])}
+        for j, label in enumerate(labels)
+    }
+    logging.info(f"Planned {n_planned} swap replicas over {int((plan > 0).sum())} documents "
+                 f"(budget {max_replicas}): {report}")
+    return plan.tolist(), report
+
+
+
+def plan_boundary_replicas(data, n_replicas):
+    """
+    One boundary replica for each of `n_replicas` documents with entities, spread
+    evenly over the corpus. Returns plan[i], the boundary replica count of data[i].
+    """
+    if isinstance(data, SpanCorpus):
+        has_entities = np.diff(data.offsets) > 0
+    else:
+        has_entities = np.array([bool(entities) for _, entities in data], dtype=bool)
+    eligible = np.flatnonzero(has_entities)
+    plan = np.zeros(len(has_entities), dtype=np.int64)
+    n_replicas = min(int(n_replicas), len(eligible))
+    if n_replicas:
+        plan[eligible[np.linspace(0, len(eligible) - 1, n_replicas).round().astype(np.int64)]] = 1
+    return plan.tolist()
+
+
+def plan_augmentation_budget(
+    data,
+    labels,
+    budget=3.0,
+    target_ratio=0.5,
+    targets=None,
+    max_per_doc=30,
+    boundary_ratio=0.5,
+    n_synthetic=0,
+):
+    """
+    Split one replica budget of `budget` x len(data) records between every
+    augmentation strategy. The `n_synthetic` synthetic / look-alike records are
+    taken off first, swap replicas get what plan_replicas needs from the rest,
+    and boundary replicas (at most one per document, `boundary_ratio` x len(data)
+    in total) fill what is left, so a corpus that is already balanced only grows
+    by its boundary and synthetic records.
+
+    Returns (plans, report): plans maps "swap" and "boundary" to per-document
+    replica counts aligned with `data`.
+    """
+    total = int(budget * len(data))
+    if n_synthetic > total:
+        logging.warning(f"{n_synthetic} synthetic records exceed the augmentation budget of {total}")
+    remaining = max(total - n_synthetic, 0)
+    swap_plan, report = plan_replicas(data, labels, target_ratio, targets, max_replicas=remaining,
+                                      max_per_doc=max_per_doc)
+    remaining -= sum(swap_plan)
+    boundary_plan = plan_boundary_replicas(data, min(int(boundary_ratio * len(data)), remaining))
+    logging.info(f"Augmentation budget {total}: {sum(swap_plan)} swap, {sum(boundary_plan)} boundary, "
+                 f"{n_synthetic} synthetic records")
+    return {"swap": swap_plan, "boundary": boundary_plan}, report
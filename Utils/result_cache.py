@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from inference import entities_to_record, iter_inputs, pipe_entities
+
+_WORD = re.compile(r"\S+")
+
+
+def normalize_text(text):
+    """Collapse whitespace, so re-uploads that differ only in layout share an entry."""
+    return " ".join(text.split())
+
+
+def model_version(meta):
+    """Version string of a pipeline from its meta.json contents (nlp.meta)."""
+    return f"{meta.get('lang')}_{meta.get('name')}-{meta.get('version')}"
+
+
+def load_model_meta(model_path):
+    """Read a pipeline's meta.json without loading the pipeline."""
+    with open(Path(model_path) / "meta.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def map_to_original(text, norm_text, entities):
+    """
+    Map (start, end, label) offsets in normalize_text(text) back to offsets in `text`.
+    Both texts have the same words in the same order, so each offset keeps its
+    position inside its word and only the word starts move.
+    """
+    if text == norm_text or not entities:
+        return entities
+    orig_starts = np.fromiter((m.start() for m in _WORD.finditer(text)), dtype=np.int64)
+    lengths = np.fromiter((len(word) for word in norm_text.split(" ")), dtype=np.int64)
+    norm_starts = np.zeros(len(lengths), dtype=np.int64)
+    np.cumsum(lengths[:-1] + 1, out=norm_starts[1:])
+    starts = np.array([ent[0] for ent in entities], dtype=np.int64)
+    ends = np.array([ent[1] for ent in entities], dtype=np.int64)
+    i = np.searchsorted(norm_starts, starts, side="right") - 1
+    j = np.searchsorted(norm_starts, ends - 1, side="right") - 1
+    new_starts = orig_starts[i] + (starts - norm_starts[i])
+    new_ends = orig_starts[j] + (ends - norm_starts[j])
+    return [(int(s), int(e), ent[2]) for s, e, ent in zip(new_starts, new_ends, entities)]
+
+
+class ResultCache:
+    """
+    On-disk cache of extracted entities in a SQLite file. Entries are keyed on
+    the hash of the normalized text together with the model version and the
+    inference parameters, so a retrained model or a different chunking never
+    serves stale results. Least recently used entries are dropped once the
+    cache holds more than `max_entries`.
+    """
+
+    def __init__(self, path, version, params=None, max_entries=200_000, commit_every=256):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.version = version
+        self.params = params or {}
+        self.max_entries = max_entries
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self._dirty = 0
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, entities TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used)")
+
+    def key(self, norm_text):
+        payload = json.dumps([self.version, self.params], sort_keys=True).encode("utf-8")
+        digest = hashlib.sha256(payload)
+        digest.update(norm_text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Cached entities for `key` (offsets in the normalized text), or None."""
+        row = self._conn.execute("SELECT entities FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._touch()
+        return [tuple(ent) for ent in json.loads(row[0])]
+
+    def put(self, key, entities):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (key, entities, last_used) VALUES (?, ?, ?)",
+            (key, json.dumps([list(ent) for ent in entities], ensure_ascii=False), time.time()),
+        )
+        self._touch()
+
+    def _touch(self):
+        self._dirty += 1
+        if self._dirty >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._dirty = 0
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def evict(self):
+        """Drop least recently used entries beyond max_entries. Returns how many were removed."""
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self.commit()
+        return excess
+
+    def close(self):
+        self.commit()
+        self.evict()
+        logging.info(f"[result cache] {self.hits} hits, {self.misses} misses, {len(self)} entries")
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_result_cache(path, meta, max_chars=None, max_entries=200_000, contacts=None, skill_gazetteer=None,
+                      skill_gazetteer_ents=False):
+    """ResultCache for a pipeline (given its meta) and the inference parameters that change its output."""
+    params = {"max_chars": max_chars}
+    if contacts:
+        params["contacts"] = contacts
+    if skill_gazetteer:
+        # Keyed on the gazetteer's contents, so a rebuilt gazetteer invalidates old results
+        with open(skill_gazetteer, "rb") as f:
+            params["skill_gazetteer"] = hashlib.sha256(f.read()).hexdigest()
+        if skill_gazetteer_ents:
+            params["skill_gazetteer_ents"] = True
+    return ResultCache(path, model_version(meta), params, max_entries)
+
+
+def cached_pipe_entities(nlp, items, cache, batch_size=32, n_process=1, max_chars=None):
+    """
+    Cache-aware inference.pipe_entities: yield (text, context, entities) for
+    (text, context) items, in order. Only documents whose normalized text is not
+    cached go through the pipeline (run on the normalized text, so cached and
+    fresh results are identical); entity offsets are mapped back to each
+    caller's original text.
+    """
+    # Documents waiting for the pipeline to catch up, as (text, context, norm_text, entities or None)
+    pending = deque()
+
+    def misses():
+        for text, context in items:
+            norm_text = normalize_text(text)
+            key = cache.key(norm_text)
+            entities = cache.get(key)
+            pending.append((text, context, norm_text, entities))
+            if entities is None:
+                yield norm_text, key
+
+    def flush_hits():
+        while pending and pending[0][3] is not None:
+            text, context, norm_text, entities = pending.popleft()
+            yield text, context, map_to_original(text, norm_text, entities)
+
+    for _, key, entities in pipe_entities(nlp, misses(), batch_size, n_process, max_chars):
+        yield from flush_hits()
+        text, context, norm_text, _ = pending.popleft()
+        cache.put(key, entities)
+        yield text, context, map_to_original(text, norm_text, entities)
+    yield from flush_hits()
+
+
+def cached_extract_entities(nlp, sources, cache, batch_size=32, n_process=1, max_chars=None):
+    """
+    Drop-in replacement for inference.extract_entities that consults `cache` first.
+    """
+    pairs = ((text, doc_id) for doc_id, text in iter_inputs(sources))
+    for text, doc_id, entities in cached_pipe_entities(nlp, pairs, cache, batch_size, n_process, max_chars):
+        yield entities_to_record(doc_id, text, entities)
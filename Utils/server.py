@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from inference import MODEL_PATH, entities_to_record, load_model, pipe_entities
+from pdf_extraction import extract_pdf, pdf_record
+from result_cache import load_model_meta, map_to_original, normalize_text, open_result_cache
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+               500: "Internal Server Error"}
+
+_worker_nlp = None
+_worker_max_chars = None
+
+
+def _init_worker(model_path, max_chars, contacts=None, skill_gazetteer=None, skill_gazetteer_ents=False):
+    global _worker_nlp, _worker_max_chars
+    _worker_nlp = load_model(model_path, contacts=contacts, skill_gazetteer=skill_gazetteer,
+                             skill_gazetteer_ents=skill_gazetteer_ents)
+    _worker_max_chars = max_chars
+
+
+def _parse_batch(texts):
+    """Worker entry point: run one micro-batch through the pipeline."""
+    items = ((text, None) for text in texts)
+    return [entities for _, _, entities in
+            pipe_entities(_worker_nlp, items, batch_size=len(texts), max_chars=_worker_max_chars)]
+
+
+def _extract_upload(data):
+    return extract_pdf("<upload>", data=data)
+
+
+class MicroBatcher:
+    """
+    Gather concurrent parse requests into micro-batches. A batch is closed once it
+    holds `max_batch_size` texts or `max_wait` seconds after its first text
+    arrived, then runs on `executor`. At most `max_concurrent` batches run at once;
+    while all of them are busy, new requests keep queueing, so batches grow with load.
+    """
+
+    def __init__(self, executor, max_batch_size=32, max_wait=0.01, max_concurrent=1):
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrent = max_concurrent
+        self.queue = asyncio.Queue()
+        self.n_batches = 0
+        self.n_texts = 0
+        self._tasks = set()
+
+    async def submit(self, text):
+        """Parse one text; returns (entities, queue_seconds, batch_size)."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_concurrent)
+        while True:
+            await slots.acquire()
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._run_batch(batch, slots))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch, slots):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(self.executor, _parse_batch, [text for text, _, _ in batch])
+        except Exception as e:
+            logging.exception("Batch failed")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            self.n_batches += 1
+            self.n_texts += len(batch)
+            for (_, future, queued), entities in zip(batch, results):
+                if not future.done():
+                    future.set_result((entities, started - queued, len(batch)))
+        finally:
+            slots.release()
+
+
+class BodyTooLarge(Exception):
+    """The request declares a body larger than the server accepts (413)."""
+
+
+async def read_request(reader, max_body):
+    """
+    Read one HTTP/1.1 request; returns (method, path, headers, body) or None at EOF.
+    Raises BodyTooLarge past `max_body` and ValueError for a malformed request
+    line or Content-Length.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length < 0:
+        raise ValueError(f"invalid Content-Length {length}")
+    if length > max_body:
+        raise BodyTooLarge(length)
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def http_response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+class ParsingServer:
+    """
+    HTTP front end: POST /parse with {"text": ...}, POST /parse/pdf with the raw
+    PDF bytes, GET /health for counters. Texts go through the micro-batcher;
+    with a ResultCache, repeated CVs are answered without touching the model.
+    The cache's SQLite calls run on `cache_executor`, a single thread that owns
+    the connection, so lookups and writes never block the event loop.
+    """
+
+    def __init__(self, batcher, cache=None, pdf_executor=None, max_body=20 << 20, cache_executor=None):
+        self.batcher = batcher
+        self.cache = cache
+        self.cache_executor = cache_executor
+        self.pdf_executor = pdf_executor
+        self.max_body = max_body
+        self.n_requests = 0
+
+    async def parse_text(self, text):
+        """(entities, info) for one text, consulting the cache first."""
+        if self.cache is None:
+            entities, queued, batch_size = await self.batcher.submit(text)
+            return entities, {"queue_ms": round(queued * 1000, 2), "batch_size": batch_size, "cached": False}
+        loop = asyncio.get_running_loop()
+        norm_text = normalize_text(text)
+        key = self.cache.key(norm_text)
+        entities = await loop.run_in_executor(self.cache_executor, self.cache.get, key)
+        info = {"cached": entities is not None}
+        if entities is None:
+            entities, queued, batch_size = await self.batcher.submit(norm_text)
+            await loop.run_in_executor(self.cache_executor, self.cache.put, key, entities)
+            info.update(queue_ms=round(queued * 1000, 2), batch_size=batch_size)
+        return map_to_original(text, norm_text, entities), info
+
+    async def dispatch(self, method, path, headers, body):
+        if method == "GET" and path == "/health":
+            return 200, {
+                "requests": self.n_requests,
+                "batches": self.batcher.n_batches,
+                "mean_batch_size": round(self.batcher.n_texts / max(self.batcher.n_batches, 1), 2),
+                "queued": self.batcher.queue.qsize(),
+                "cache_hits": self.cache.hits if self.cache is not None else 0,
+                "cache_misses": self.cache.misses if self.cache is not None else 0,
+            }
+        if method == "POST" and path == "/parse":
+            try:
+                text = json.loads(body)["text"]
+            except (ValueError, KeyError, TypeError):
+                return 400, {"error": 'expected a JSON body {"text": ...}'}
+            if not isinstance(text, str):
+                return 400, {"error": '"text" must be a string'}
+            entities, info = await self.parse_text(text)
+            return 200, {**entities_to_record(None, text, entities), **info}
+        if method == "POST" and path == "/parse/pdf":
+            loop = asyncio.get_running_loop()
+            try:
+                pdf_text = await loop.run_in_executor(self.pdf_executor, _extract_upload, body)
+            except Exception as e:
+                return 400, {"error": f"could not read PDF: {e}"}
+            entities, info = await self.parse_text(pdf_text.text)
+            return 200, {**pdf_record(pdf_text, entities), **info}
+        return 404, {"error": f"no route for {method} {path}"}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, self.max_body)
+                except BodyTooLarge:
+                    writer.write(http_response(413, {"error": "request body too large"}, keep_alive=False))
+                    break
+                except ValueError as e:
+                    writer.write(http_response(400, {"error": f"malformed request: {e}"}, keep_alive=False))
+                    break
+                except asyncio.IncompleteReadError:
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                start = time.perf_counter()
+                self.n_requests += 1
+                try:
+                    status, payload = await self.dispatch(method, path, headers, body)
+                except Exception as e:
+                    logging.exception(f"{method} {path} failed")
+                    status, payload = 500, {"error": str(e)}
+                payload["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(args):
+    if args.processes:
+        executor = ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                       initargs=(args.model, args.max_chars, args.contacts, args.skill_gazetteer,
+                                                 args.skill_gazetteer_ents))
+        max_concurrent = args.workers
+    else:
+        # One thread owns the pipeline; batches run one at a time off the event loop
+        executor = ThreadPoolExecutor(max_workers=1, initializer=_init_worker,
+                                      initargs=(args.model, args.max_chars, args.contacts, args.skill_gazetteer,
+                                                args.skill_gazetteer_ents))
+        max_concurrent = 1
+    loop = asyncio.get_running_loop()
+    cache = None
+    # SQLite connections are bound to the thread that opened them, so the cache is
+    # opened, used and closed on one dedicated thread
+    cache_executor = ThreadPoolExecutor(max_workers=1)
+    if args.cache:
+        cache = await loop.run_in_executor(cache_executor, functools.partial(
+            open_result_cache, args.cache, load_model_meta(args.model), args.max_chars, contacts=args.contacts,
+            skill_gazetteer=args.skill_gazetteer, skill_gazetteer_ents=args.skill_gazetteer_ents))
+    # Load the model in every worker before accepting traffic
+    await asyncio.gather(*[loop.run_in_executor(executor, _parse_batch, ["warm up"])
+                           for _ in range(max_concurrent)])
+    batcher = MicroBatcher(executor, args.max_batch_size, args.max_wait_ms / 1000, max_concurrent)
+    app = ParsingServer(batcher, cache, ProcessPoolExecutor(max_workers=args.pdf_workers),
+                        cache_executor=cache_executor)
+    server = await asyncio.start_server(app.handle, args.host, args.port)
+    logging.info(f"Serving on http://{args.host}:{args.port} "
+                 f"(max_batch_size={args.max_batch_size}, max_wait={args.max_wait_ms}ms)")
+    batching = asyncio.create_task(batcher.run())
+    # Shut down cleanly on Ctrl+C / SIGTERM, so the result cache is committed
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        logging.info("Shutting down")
+        batching.cancel()
+        await asyncio.gather(batching, return_exceptions=True)
+        if cache is not None:
+            await loop.run_in_executor(cache_executor, cache.close)
+        cache_executor.shutdown()
+        executor.shutdown(cancel_futures=True)
+        app.pdf_executor.shutdown(cancel_futures=True)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Resume parsing HTTP service with micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--processes", action="store_true",
+                        help="run batches in a process pool of --workers model replicas instead of one thread")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--pdf-workers", type=int, default=2)
+    parser.add_argument("--max-chars", type=int, default=None)
+    parser.add_argument("--contacts", choices=["rules", "only"], default=None,
+                        help="'rules': regex contact fields before ner; 'only': contact fields only, no transformer")
+    parser.add_argument("--skill-gazetteer", type=Path, default=None,
+                        help="pre-annotate skills from this gazetteer ahead of ner")
+    parser.add_argument("--skill-gazetteer-ents", action="store_true",
+                        help="with --skill-gazetteer, preset the matches as Skills entities that ner keeps")
+    parser.add_argument("--cache", type=Path, default=None, help="SQLite result cache")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(_parse_args()))
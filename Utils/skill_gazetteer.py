@@ -0,0 +1,162 @@
+import json
+from collections import Counter, defaultdict
+from spacy.language import Language
+from spacy.matcher import PhraseMatcher
+from spacy.util import filter_spans
+
+from skills import SKILL_MAPPING, normalize_skills
+
+GAZETTEER_VERSION = 1
+# Corpus "skills" longer than this are sentences or whole sections, not skill names
+MAX_TERM_WORDS = 5
+MAX_TERM_CHARS = 50
+
+
+def _term_key(term):
+    return " ".join(term.lower().split())
+
+
+class SkillGazetteer:
+    """
+    Deduplicated skill vocabulary. Terms are keyed on their lowercased,
+    whitespace-collapsed form, so membership and canonicalization are dict
+    lookups. The canonical spelling of a term is the one in SKILL_MAPPING, else
+    the most frequent surface form seen while building.
+    """
+
+    def __init__(self, canonical=None):
+        self.canonical = dict(canonical or {})
+        self._surface_counts = defaultdict(Counter)
+        self._matchers = {}
+
+    def add(self, term, count=1):
+        """Add one surface form; returns False when it does not look like a skill name."""
+        term = " ".join(term.split())
+        if not term or len(term) > MAX_TERM_CHARS or len(term.split()) > MAX_TERM_WORDS:
+            return False
+        key = _term_key(term)
+        if key in SKILL_MAPPING:
+            self.canonical[key] = SKILL_MAPPING[key]
+        else:
+            surface_counts = self._surface_counts[key]
+            surface_counts[term] += count
+            # Most frequent spelling wins; ties go to the alphabetically first for stability
+            self.canonical[key] = min(surface_counts, key=lambda s: (-surface_counts[s], s))
+        self._matchers.clear()
+        return True
+
+    def update(self, terms):
+        for term in terms:
+            self.add(term)
+        return self
+
+    def __contains__(self, term):
+        return _term_key(term) in self.canonical
+
+    def __len__(self):
+        return len(self.canonical)
+
+    def canonicalize(self, term):
+        """Canonical spelling of `term`, or `term` itself when it is unknown."""
+        return self.canonical.get(_term_key(term), term)
+
+    @property
+    def terms(self):
+        """Canonical spellings, sorted."""
+        return sorted(set(self.canonical.values()))
+
+    def to_disk(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": GAZETTEER_VERSION, "terms": self.canonical}, f, ensure_ascii=False,
+                      indent=0, sort_keys=True)
+        return path
+
+    @classmethod
+    def from_disk(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != GAZETTEER_VERSION:
+            raise ValueError(f"{path} is a version {data.get('version')} gazetteer, expected {GAZETTEER_VERSION}")
+        return cls(data["terms"])
+
+    def matcher(self, nlp):
+        """
+        Case-insensitive PhraseMatcher over every known surface form, built once per vocab.
+        Match ids are the canonical spellings.
+        """
+        key = id(nlp.vocab)
+        if key not in self._matchers:
+            matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+            by_canonical = defaultdict(list)
+            for term, canonical in self.canonical.items():
+                by_canonical[canonical].append(term)
+            for canonical, terms in by_canonical.items():
+                matcher.add(canonical, list(nlp.tokenizer.pipe(terms)))
+            self._matchers[key] = matcher
+        return self._matchers[key]
+
+    def find(self, nlp, doc):
+        """Longest non-overlapping skill matches in `doc`, as Spans labelled with their canonical spelling."""
+        return filter_spans(self.matcher(nlp)(doc, as_spans=True))
+
+
+def build_gazetteer(data, extra_terms=()):
+    """
+    Build a gazetteer from the "Skills" spans of a corpus (split on commas and
+    normalized like the training data), SKILL_MAPPING and any `extra_terms`.
+    """
+    gazetteer = SkillGazetteer()
+    gazetteer.update(SKILL_MAPPING)
+    gazetteer.update(SKILL_MAPPING.values())
+    for text, entities in data:
+        for start, end, label in entities:
+            if label != "Skills":
+                continue
+            for term in normalize_skills(text[start:end].replace(";", ",")).split(","):
+                gazetteer.add(term)
+    gazetteer.update(extra_terms)
+    return gazetteer
+
+
+class SkillPreAnnotator:
+    """
+    Pipeline component that marks gazetteer skills. The matches always go to
+    doc.spans[spans_key]; with set_ents they are also preset as "Skills" entities
+    ahead of `ner`, which keeps them and predicts the remaining tokens.
+    """
+
+    def __init__(self, nlp, name, path, spans_key="skills", set_ents=False):
+        self.name = name
+        self.spans_key = spans_key
+        self.set_ents = set_ents
+        self.gazetteer = SkillGazetteer.from_disk(path)
+        self.matcher = self.gazetteer.matcher(nlp)
+
+    def __call__(self, doc):
+        spans = filter_spans(self.matcher(doc, as_spans=True))
+        doc.spans[self.spans_key] = spans
+        if self.set_ents and spans:
+            skills = [doc[span.start:span.end] for span in spans]
+            for span in skills:
+                span.label_ = "Skills"
+            doc.set_ents(filter_spans(list(doc.ents) + skills), default="unmodified")
+        return doc
+
+
+@Language.factory("skill_gazetteer", default_config={"spans_key": "skills", "set_ents": False})
+def make_skill_gazetteer(nlp, name, path, spans_key, set_ents):
+    return SkillPreAnnotator(nlp, name, path, spans_key, set_ents)
+
+
+def add_skill_gazetteer(nlp, path, set_ents=False):
+    """
+    Add the gazetteer component ahead of `ner` (or last when there is no `ner`).
+    Matches go to doc.spans only; `set_ents` also presets them as Skills entities,
+    which `ner` can then no longer label otherwise (e.g. as part of a Designation).
+    """
+    config = {"path": str(path), "set_ents": set_ents}
+    if "ner" in nlp.pipe_names:
+        nlp.add_pipe("skill_gazetteer", before="ner", config=config)
+    else:
+        nlp.add_pipe("skill_gazetteer", config=config)
+    return nlp
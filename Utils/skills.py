@@ -0,0 +1,141 @@
+import json
+import re
+
+# Technology capitalization map, keyed by lowercase surface form
+SKILL_MAPPING = {
+    'javascript': 'JavaScript',
+    'java': 'Java',
+    'python': 'Python',
+    'c++': 'C++',
+    'angular js': 'AngularJS',
+    'html': 'HTML',
+    'css': 'CSS',
+    'aws': 'AWS',
+    'sql': 'SQL',
+    'docker': 'Docker',
+    'git': 'Git',
+    'ms office': 'Microsoft Office',
+    'microsoft office': 'Microsoft Office',
+    'excel': 'Excel',
+    'end user computing': 'End User Computing',
+    'active directory': 'Active Directory',
+    'tally': 'Tally',
+    'velocity': 'Velocity'
+}
+
+SECTION_HEADERS = {"SKILLS", "SKILLS:", "SKILL SETS", "COMPUTER LANGUAGES KNOWN:"}
+NON_SKILLS = {"teaching", "polysaccarides'"}
+
+_EXPERIENCE_PATTERN = re.compile(r'\s*\(([^)]*(?:year|month|yr)[^)]*)\)', re.I)
+_BULLET_PATTERN = re.compile(r'^[•\-\*\d]+\.?\s*')
+_LEADING_MARK_PATTERN = re.compile(r'^\s*[–•:]\s*')
+_TRAILING_PUNCT_PATTERN = re.compile(r'[.;:]$')
+
+
+def _trie_pattern(words):
+    """
+    Build a regex alternation over `words` shaped as a character trie, so shared
+    prefixes are matched once and the cost per position does not grow with the
+    number of words. Longer words win over their prefixes.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+def load_skill_mapping(path):
+    """
+    Load a {surface form: canonical form} mapping from a JSON file.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class SkillNormalizer:
+    """
+    Rewrites every known technology name in a string to its canonical form in a
+    single regex pass. The mapping is compiled once into a trie-shaped pattern,
+    so it can grow to thousands of names without a linear slowdown.
+    """
+
+    def __init__(self, mapping=SKILL_MAPPING):
+        self.mapping = {}
+        self._pattern = None
+        self.update(mapping)
+
+    def update(self, mapping):
+        """Add or override entries and recompile the pattern."""
+        self.mapping.update({skill.lower(): proper for skill, proper in mapping.items()})
+        self._pattern = re.compile(r'\b' + _trie_pattern(self.mapping) + r'\b', re.I)
+
+    def _replace(self, match):
+        found = match.group(0)
+        return self.mapping.get(found.lower(), found)
+
+    def canonicalize(self, text):
+        """Apply the capitalization map only."""
+        return self._pattern.sub(self._replace, text)
+
+    def normalize(self, text):
+        """
+        Normalize skill entries with comprehensive pattern recognition.
+        """
+        # Skip section headers and non-skill text
+        if text.strip().upper() in SECTION_HEADERS:
+            return ""
+
+        # Extract experience info in parentheses (preserve it for output)
+        exp_match = _EXPERIENCE_PATTERN.search(text)
+        if exp_match:
+            experience_info = exp_match.group(1)
+            text = _EXPERIENCE_PATTERN.sub('', text)
+
+        # Remove formatting elements and clean up text
+        text = _BULLET_PATTERN.sub('', text)
+        text = _LEADING_MARK_PATTERN.sub('', text)
+        text = _TRAILING_PUNCT_PATTERN.sub('', text.strip())
+
+        # Skip non-skill entries
+        if text.lower().strip() in NON_SKILLS:
+            return ""
+
+        # Apply skill-specific capitalization
+        text = self.canonicalize(text)
+
+        # Reattach experience info if present
+        if exp_match:
+            text = f"{text} ({experience_info})"
+
+        return text.strip()
+
+    def normalize_batch(self, texts):
+        return [self.normalize(text) for text in texts]
+
+
+_default_normalizer = SkillNormalizer()
+
+
+def normalize_skills(text):
+    """
+    Normalize skill entries with comprehensive pattern recognition.
+    """
+    return _default_normalizer.normalize(text)
+
+
+def normalize_skills_batch(texts):
+    """
+    Normalize a list of skill strings with the default normalizer.
+    """
+    return _default_normalizer.normalize_batch(texts)
@@ -0,0 +1,160 @@
+import numpy as np
+
+from overlaps import resolve_overlaps
+from readers import Record
+
+
+class SpanCorpus:
+    """
+    Columnar store for an annotated corpus.
+    Entity spans of all documents live in flat arrays: int32 `starts` / `ends`,
+    uint16 `label_ids` indexing into the interned `labels` list, and int64
+    `offsets` such that the spans of document i are offsets[i]:offsets[i + 1].
+    Iterating yields Record objects, so code written against lists of Records
+    (DocBin writers, the augmenter) works on it unchanged.
+    """
+
+    def __init__(self, texts, starts, ends, label_ids, offsets, labels):
+        self.texts = texts
+        self.starts = starts
+        self.ends = ends
+        self.label_ids = label_ids
+        self.offsets = offsets
+        self.labels = labels
+        self._label_index = {label: i for i, label in enumerate(labels)}
+
+    @classmethod
+    def from_records(cls, records, labels=()):
+        """
+        Build a corpus from (text, entities) records, interning labels as they appear.
+        """
+        labels = list(labels)
+        label_index = {label: i for i, label in enumerate(labels)}
+        texts = []
+        starts = []
+        ends = []
+        label_ids = []
+        offsets = [0]
+        for text, entities in records:
+            texts.append(text)
+            for start, end, label in entities:
+                label_id = label_index.get(label)
+                if label_id is None:
+                    label_id = label_index[label] = len(labels)
+                    labels.append(label)
+                starts.append(start)
+                ends.append(end)
+                label_ids.append(label_id)
+            offsets.append(len(starts))
+        if len(labels) > np.iinfo(np.uint16).max:
+            raise ValueError(f"Too many distinct labels ({len(labels)}) for uint16 label ids")
+        return cls(
+            texts,
+            np.asarray(starts, dtype=np.int32),
+            np.asarray(ends, dtype=np.int32),
+            np.asarray(label_ids, dtype=np.uint16),
+            np.asarray(offsets, dtype=np.int64),
+            labels,
+        )
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __iter__(self):
+        for i in range(len(self.texts)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        return Record(self.texts[i], self.entities(i))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_label_index"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._label_index = {label: i for i, label in enumerate(self.labels)}
+
+    @property
+    def n_spans(self):
+        return len(self.starts)
+
+    @property
+    def nbytes(self):
+        """Memory held by the span arrays (texts excluded)."""
+        return self.starts.nbytes + self.ends.nbytes + self.label_ids.nbytes + self.offsets.nbytes
+
+    def label_id(self, label):
+        """Interned id of `label`, or None if the corpus never uses it."""
+        return self._label_index.get(label)
+
+    def doc_arrays(self, i):
+        """Views of the (starts, ends, label_ids) arrays of document i."""
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return self.starts[lo:hi], self.ends[lo:hi], self.label_ids[lo:hi]
+
+    def entities(self, i):
+        """Entities of document i as (start, end, label) tuples."""
+        starts, ends, label_ids = self.doc_arrays(i)
+        labels = self.labels
+        return [(s, e, labels[l]) for s, e, l in zip(starts.tolist(), ends.tolist(), label_ids.tolist())]
+
+    def doc_index(self):
+        """Document index of every span, aligned with `starts`."""
+        return np.repeat(np.arange(len(self.texts), dtype=np.int64), np.diff(self.offsets))
+
+    def slice(self, lo, hi):
+        """Documents lo:hi as a new corpus sharing the label vocabulary."""
+        a, b = self.offsets[lo], self.offsets[hi]
+        return SpanCorpus(
+            self.texts[lo:hi],
+            self.starts[a:b],
+            self.ends[a:b],
+            self.label_ids[a:b],
+            self.offsets[lo:hi + 1] - a,
+            self.labels,
+        )
+
+    def select(self, mask):
+        """Keep only the spans where the boolean `mask` is set."""
+        mask = np.asarray(mask, dtype=bool)
+        kept = np.concatenate([[0], np.cumsum(mask, dtype=np.int64)])
+        return SpanCorpus(
+            self.texts,
+            self.starts[mask],
+            self.ends[mask],
+            self.label_ids[mask],
+            kept[self.offsets],
+            self.labels,
+        )
+
+    def non_overlapping(self):
+        """
+        Drop overlapping spans in every document, keeping the earliest start,
+        longest first, as filter_non_overlapping_spans does.
+        """
+        return self.select(resolve_overlaps(self.starts, self.ends, self.offsets))
+
+    def count_by_label(self):
+        """Number of spans per label, as {label: count}."""
+        counts = np.bincount(self.label_ids, minlength=len(self.labels))
+        return {label: int(count) for label, count in zip(self.labels, counts) if count}
+
+    def texts_of_label(self, label):
+        """Surface strings of every span carrying `label`, in corpus order."""
+        label_id = self.label_id(label)
+        if label_id is None:
+            return []
+        (idx,) = np.nonzero(self.label_ids == label_id)
+        docs = self.doc_index()[idx].tolist()
+        texts = self.texts
+        return [texts[d][s:e] for d, s, e in zip(docs, self.starts[idx].tolist(), self.ends[idx].tolist())]
+
+    def map_entities(self, func):
+        """
+        Rebuild the corpus by applying func(text, entities) -> entities to every document.
+        """
+        return SpanCorpus.from_records(
+            ((text, func(text, entities)) for text, entities in self), labels=self.labels
+        )
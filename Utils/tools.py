@@ -5,135 +5,71 @@ from pathlib import Path
 from tqdm import tqdm
 import json
 import re
-
-def filter_non_overlapping_spans(spans):
+import hashlib
+import itertools
+import logging
+from collections import Counter
+import numpy as np
+from readers import Record, read_records
+from span_store import SpanCorpus
+from skills import normalize_skills
+from overlaps import filter_non_overlapping_spans
+from docbin_builder import make_training_doc, DocBinShardWriter, write_docbin
+
+def split_bucket(text, seed=0):
     """
-    Given a list of spaCy Span objects, return only non-overlapping spans.
-    Uses a set to track covered token indices for overlap detection.
+    Map a record to a deterministic value in [0, 1) from a seeded hash of its text,
+    so the train/dev split is stable without a global shuffle.
     """
-    filtered = []
-    covered = set()
-    for span in sorted(spans, key=lambda s: (s.start, -s.end)):
-        span_range = set(range(span.start, span.end))
-        if not span_range & covered:
-            filtered.append(span)
-            covered.update(span_range)
-    return filtered
-
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8, salt=str(seed).encode("utf-8")[:16])
+    return int.from_bytes(digest.digest(), "big") / 2 ** 64
 
 
-def create_spacy_files(path1,path2, train_path, dev_path, exclude_entities,split_skill_entities, train_ratio=0.8):
+def stream_spacy_files(path1, path2, train_dir, dev_dir, exclude_entities, split_skill_entities,
+                       train_ratio=0.8, seed=0, shard_size=1000):
+    """
+    Constant-memory variant of create_spacy_files.
+    Records are parsed, cleaned and routed to train or dev one at a time using a
+    seeded hash of their text, and written as DocBin shards of `shard_size` docs.
+    Point `paths.train` / `paths.dev` at the shard directories: spacy.Corpus reads
+    every .spacy file it finds there.
+    """
     nlp = spacy.blank("en")
-    
-    data=[]
-    with open(path1, "r", encoding="utf-8") as f:
-        for line in f:
-            item = json.loads(line)
-            text = item["content"]
-            entities = item["annotation"]
-            entity_spans = []
-            for annotation in entities:
-                # Safely extract label
-                if isinstance(annotation["label"], list):
-                    if not annotation["label"]:
-                        continue  # skip if label list is empty
-                    label = annotation["label"][0]
-                else:
-                    label = annotation["label"]
-                if label in exclude_entities:
-                    continue
-                if split_skill_entities and label == "Skills":
-                    # Split the skill entity into individual skills
-                    for point in annotation["points"]:
-                        if not isinstance(point, dict):
-                            continue
-                        start = int(point["start"])
-                        end = int(point["end"])
-                        skill_text = text[start:end]
-                        # Use comma/semicolon to split skills
-                        if "," in skill_text or ";" in skill_text:
-                            normalized = skill_text.replace(";", ",")
-                            normalized = normalize_skills(normalized)
-                            for skill in [s.strip() for s in normalized.split(",") if s.strip()]:
-                                skill_start = text.find(skill, start, end)
-                                if skill_start != -1:
-                                    skill_end = skill_start + len(skill)
-                                    if 0 <= skill_start < skill_end <= len(text):
-                                        entity_spans.append((skill_start, skill_end, label))
-                        else:
-                            if 0 <= start < end <= len(text):
-                                entity_spans.append((start, end, label))
-                else:
-                    for point in annotation["points"]:
-                        if not isinstance(point, dict):
-                            continue
-                        start = int(point["start"])
-                        end = int(point["end"])
-                        if start is not None and end is not None:
-                            try:
-                                start, end = int(start), int(end)
-                                # Skip invalid ranges
-                                if not (0 <= start < end <= len(text)):
-                                    continue
-                                entity_spans.append((start, end, label))
-                            except (ValueError, TypeError):
-                                continue
-            data.append((text, {"entities": entity_spans}))
-    
-
-    data2 = []
-    json_data = json.load(open(Path(path2)))
-    
-    for cv in json_data:
-            
-        text = cv[0]
-        entities = cv[1]['entities']
-        entity_spans = []
-        for annotation in entities:
-            # Safely extract label
-            label = annotation[2]
-            if label in exclude_entities:
-                continue
-
-            point={"start":annotation[0],"end":annotation[1]}
-            
-            
-            if not isinstance(point, dict):
-                continue
-            start = int(point["start"])
-            end = int(point["end"])
-            if start is not None and end is not None:
-                try:
-                    start, end = int(start), int(end)
-                    # Skip invalid ranges
-                    if not (0 <= start < end <= len(text)):
-                        continue
-                    entity_spans.append((start, end, label))
-                except (ValueError, TypeError):
-                    continue
-        data2.append((text, {"entities": entity_spans}))
-
-    data.extend(data2)
+    writers = {
+        "train": DocBinShardWriter(train_dir, "train", shard_size),
+        "dev": DocBinShardWriter(dev_dir, "dev", shard_size),
+    }
+    records = itertools.chain(
+        read_records(path1, "dataturks", exclude_entities=exclude_entities,
+                     split_skill_entities=split_skill_entities),
+        read_records(path2, "spacy_json", exclude_entities=exclude_entities),
+    )
+    stats = Counter()
+    for text, entities in tqdm(records, desc="Streaming records"):
+        split = "train" if split_bucket(text, seed) < train_ratio else "dev"
+        doc = make_training_doc(nlp, text, clean_entities(text, entities, stats))
+        writers[split].add(doc)
+    shards = {split: writer.close() for split, writer in writers.items()}
+    if stats["out_of_bounds"]:
+        logging.warning(f"Skipped {stats['out_of_bounds']} out-of-bounds entities")
+    logging.info(f"Streamed {writers['train'].n_docs} train docs into {len(shards['train'])} shards, "
+                 f"{writers['dev'].n_docs} dev docs into {len(shards['dev'])} shards")
+    return shards
+
+
+def create_spacy_files(path1,path2, train_path, dev_path, exclude_entities,split_skill_entities, train_ratio=0.8, n_process=1):
+    data = list(read_records(path1, "dataturks", exclude_entities=exclude_entities,
+                             split_skill_entities=split_skill_entities))
+    data.extend(read_records(path2, "spacy_json", exclude_entities=exclude_entities))
     random.shuffle(data)
     #print(data[:2])  # Debug: print first 2 samples to verify content
     split = int(len(data) * train_ratio)
-    data = [(text, {"entities": clean_entities(text, entities["entities"])}) for text, entities in data]    
+    data = clean_corpus(data)
     train_data = data[:split]
     #print(f"First training sample: {train_data[0]}")  # Debug: print first training sample
     dev_data = data[split:]
     for dataset, out_path in [(train_data, train_path), (dev_data, dev_path)]:
-        doc_bin = DocBin()
-        for text, entities in tqdm(dataset, desc=f"Processing {out_path}"):
-            doc = nlp.make_doc(text)
-            spans = []
-            for start, end, label in entities["entities"]:
-                span = doc.char_span(start, end, label=label, alignment_mode="strict")
-                if span is not None:
-                    spans.append(span)
-            filtered_spans = filter_non_overlapping_spans(spans)
-            doc.ents = filtered_spans
-            doc_bin.add(doc)
-        doc_bin.to_disk(out_path)
+        write_docbin(dataset, out_path, n_process=n_process)
         print(f"Saved train to {train_path}, dev to {dev_path}")
     print("Saved !!!")
 
@@ -145,142 +81,106 @@ def create_spacy_files(path1,path2, train_path, dev_path, exclude_entities,split
 
 
 
-def normalize_skills(text):
+# Every code point for which str.isspace() is true (the highest is U+3000)
+_WHITESPACE_CODEPOINTS = np.array([c for c in range(0x3001) if chr(c).isspace()], dtype=np.uint32)
+
+def whitespace_mask(text):
     """
-    Normalize skill entries with comprehensive pattern recognition.
+    Boolean array marking the characters of `text` for which str.isspace() holds.
     """
-    # Skip section headers and non-skill text
-    if text.strip().upper() in ["SKILLS", "SKILLS:", "SKILL SETS", "COMPUTER LANGUAGES KNOWN:"]:
-        return ""
-    
-    # Extract experience info in parentheses (preserve it for output)
-    exp_pattern = r'\s*\(([^)]*(?:year|month|yr)[^)]*)\)'
-    exp_match = re.search(exp_pattern, text, re.I)
-    
-    if exp_match:
-        experience_info = exp_match.group(1)
-        text = re.sub(exp_pattern, '', text)
-    
-    # Remove formatting elements and clean up text
-    text = re.sub(r'^[•\-\*\d]+\.?\s*', '', text)
-    text = re.sub(r'^\s*[–•:]\s*', '', text)
-    text = re.sub(r'[.;:]$', '', text.strip())
-    
-    # Skip non-skill entries
-    if text.lower().strip() in ["teaching", "polysaccarides'"]:
-        return ""
-    
-    # Technology capitalization map
-    skill_mapping = {
-        'javascript': 'JavaScript',
-        'java': 'Java',
-        'python': 'Python',
-        'c++': 'C++',
-        'angular js': 'AngularJS',
-        'html': 'HTML',
-        'css': 'CSS',
-        'aws': 'AWS',
-        'sql': 'SQL',
-        'docker': 'Docker',
-        'git': 'Git',
-        'ms office': 'Microsoft Office',
-        'microsoft office': 'Microsoft Office',
-        'excel': 'Excel',
-        'end user computing': 'End User Computing',
-        'active directory': 'Active Directory',
-        'tally': 'Tally',
-        'velocity': 'Velocity'
-    }
-    
-    # Apply skill-specific capitalization
-    for skill, proper_form in skill_mapping.items():
-        text = re.sub(r'\b' + re.escape(skill) + r'\b', proper_form, text, flags=re.I)
-    
-    # Reattach experience info if present
-    if exp_match:
-        text = f"{text} ({experience_info})"
-    
-    return text.strip()
-
-def clean_entities(text, entities):
-    cleaned = []
-    text_len = len(text)
-    for ent in entities:
-        
-        start, end, label = ent
-        # Ensure indices are within bounds
-        if not (0 <= start < end <= text_len):
-            print(f"Out-of-bounds entity skipped: {ent}")
-            continue
-        new_start = start
-        new_end = end
-        # Remove leading whitespace
-        while new_start < new_end and new_start < text_len and text[new_start].isspace():
-            new_start += 1
-        # Remove trailing whitespace
-        while new_end > new_start and new_end - 1 < text_len and text[new_end - 1].isspace():
-            new_end -= 1
-        # Only add if non-empty after trimming
-        if new_start < new_end:
-            cleaned.append((new_start, new_end, label))
-    return cleaned
+    codepoints = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    return np.isin(codepoints, _WHITESPACE_CODEPOINTS)
 
 
+def trim_spans(text, starts, ends, stats=None):
+    """
+    Vectorised whitespace trimming of all spans of one document.
+    The whitespace mask is computed once per document; every span then gets its
+    first and last non-space character from two prefix scans.
+    Returns (new_starts, new_ends, keep) where `keep` drops out-of-bounds spans and
+    spans that are empty after trimming. Out-of-bounds spans are counted in `stats`
+    (a Counter, when given) instead of being printed.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    text_len = len(text)
+    # Ensure indices are within bounds
+    in_bounds = (0 <= starts) & (starts < ends) & (ends <= text_len)
+    n_out = int(len(starts) - np.count_nonzero(in_bounds))
+    if n_out and stats is not None:
+        stats["out_of_bounds"] += n_out
+    if not text_len or not in_bounds.any():
+        return starts, ends, in_bounds
+    is_space = whitespace_mask(text)
+    positions = np.arange(text_len, dtype=np.int64)
+    # First non-space position at or after i, and last one at or before i
+    next_solid = np.minimum.accumulate(np.where(is_space, text_len, positions)[::-1])[::-1]
+    prev_solid = np.maximum.accumulate(np.where(is_space, -1, positions))
+    safe_starts = np.where(in_bounds, starts, 0)
+    safe_ends = np.where(in_bounds, ends, 1)
+    new_starts = next_solid[safe_starts]
+    new_ends = prev_solid[safe_ends - 1] + 1
+    # Only keep spans that are non-empty after trimming
+    keep = in_bounds & (new_starts < new_ends)
+    return new_starts, new_ends, keep
+
+
+def clean_entities(text, entities, stats=None):
+    """
+    Strip leading/trailing whitespace from (start, end, label) spans, dropping
+    out-of-bounds spans and spans that are only whitespace.
+    """
+    if not entities:
+        return []
+    starts, ends, labels = zip(*entities)
+    new_starts, new_ends, keep = trim_spans(text, starts, ends, stats)
+    return [(s, e, label) for s, e, label, k in
+            zip(new_starts.tolist(), new_ends.tolist(), labels, keep.tolist()) if k]
 
 
-def create_spacy_files2(json_path,exclude_entities,train_path,dev_path, train_ratio=0.8):
-    nlp = spacy.blank("en")
-    data = []
-    json_data = json.load(open(Path(json_path)))
-    print(json_data[0][1]['entities'])
-    for cv in json_data:
-            
-        text = cv[0]
-        entities = cv[1]['entities']
-        entity_spans = []
-        for annotation in entities:
-            # Safely extract label
-            label = annotation[2]
-            if label in exclude_entities:
+def clean_corpus(data):
+    """
+    Apply clean_entities to every document. A SpanCorpus stays columnar and is
+    trimmed array-wise document by document; any other iterable of (text, entities)
+    records becomes a list of Records. Out-of-bounds spans are logged once.
+    """
+    stats = Counter()
+    if isinstance(data, SpanCorpus):
+        new_starts = data.starts.copy()
+        new_ends = data.ends.copy()
+        keep = np.zeros(data.n_spans, dtype=bool)
+        offsets = data.offsets.tolist()
+        for i, text in enumerate(data.texts):
+            lo, hi = offsets[i], offsets[i + 1]
+            if lo == hi:
                 continue
+            s, e, k = trim_spans(text, data.starts[lo:hi], data.ends[lo:hi], stats)
+            new_starts[lo:hi] = np.where(k, s, 0)
+            new_ends[lo:hi] = np.where(k, e, 0)
+            keep[lo:hi] = k
+        cleaned = SpanCorpus(data.texts, new_starts, new_ends, data.label_ids, data.offsets,
+                             data.labels).select(keep)
+    else:
+        cleaned = [Record(text, clean_entities(text, entities, stats)) for text, entities in data]
+    if stats["out_of_bounds"]:
+        logging.warning(f"Skipped {stats['out_of_bounds']} out-of-bounds entities")
+    return cleaned
 
-            point={"start":annotation[0],"end":annotation[1]}
-            
-            
-            if not isinstance(point, dict):
-                continue
-            start = int(point["start"])
-            end = int(point["end"])
-            if start is not None and end is not None:
-                try:
-                    start, end = int(start), int(end)
-                    # Skip invalid ranges
-                    if not (0 <= start < end <= len(text)):
-                        continue
-                    entity_spans.append((start, end, label))
-                except (ValueError, TypeError):
-                    continue
-        data.append((text, {"entities": entity_spans}))
+
+
+
+def create_spacy_files2(json_path,exclude_entities,train_path,dev_path, train_ratio=0.8, n_process=1):
+    data = list(read_records(json_path, "spacy_json", exclude_entities=exclude_entities))
+    print(data[0].entities)
     random.shuffle(data)
     #print(data[:2])  # Debug: print first 2 samples to verify content
     split = int(len(data) * train_ratio)
-    data = [(text, {"entities": clean_entities(text, entities["entities"])}) for text, entities in data]    
+    data = clean_corpus(data)
     train_data = data[:split]
     #print(f"First training sample: {train_data[0]}")  # Debug: print first training sample
     dev_data = data[split:]
     for dataset, out_path in [(train_data, train_path), (dev_data, dev_path)]:
-        doc_bin = DocBin()
-        for text, entities in tqdm(dataset, desc=f"Processing {out_path}"):
-            doc = nlp.make_doc(text)
-            spans = []
-            for start, end, label in entities["entities"]:
-                span = doc.char_span(start, end, label=label, alignment_mode="strict")
-                if span is not None:
-                    spans.append(span)
-            filtered_spans = filter_non_overlapping_spans(spans)
-            doc.ents = filtered_spans
-            doc_bin.add(doc)
-        doc_bin.to_disk(out_path)
+        write_docbin(dataset, out_path, n_process=n_process)
         print(f"Saved train to {train_path}, dev to {dev_path}")
     print("Saved !!!")
 
@@ -290,110 +190,21 @@ def create_spacy_files2(json_path,exclude_entities,train_path,dev_path, train_ra
 
 
 def debug_data(config_path, train_path, dev_path):
-    import subprocess
-    result = subprocess.run(
-        ["python", "-m", "spacy", "debug", "data", 
-            config_path, 
-            "--paths.train", train_path,
-            "--paths.dev", dev_path],
-        capture_output=True, text=True
-    )
-    if result.returncode == 0:
+    # Imported here so loading tools does not pull in the training loop and batcher registry
+    from training import run_debug_data
+
+    if run_debug_data(config_path, train_path, dev_path):
         print("Data validation successful!")
-        print(result.stdout)
     else:
         print("Data validation failed!")
-        print(result.stderr)
 
 
 def debug_data_comp(path1, path2,exclude_entities, split_skill_entities):
-    data=[]
-    with open(path1, "r", encoding="utf-8") as f:
-        for line in f:
-            item = json.loads(line)
-            text = item["content"]
-            entities = item["annotation"]
-            entity_spans = []
-            for annotation in entities:
-                # Safely extract label
-                if isinstance(annotation["label"], list):
-                    if not annotation["label"]:
-                        continue  # skip if label list is empty
-                    label = annotation["label"][0]
-                else:
-                    label = annotation["label"]
-                if label in exclude_entities:
-                    continue
-                if split_skill_entities and label == "Skills":
-                    # Split the skill entity into individual skills
-                    for point in annotation["points"]:
-                        if not isinstance(point, dict):
-                            continue
-                        start = int(point["start"])
-                        end = int(point["end"])
-                        skill_text = text[start:end]
-                        # Use comma/semicolon to split skills
-                        if "," in skill_text or ";" in skill_text:
-                            normalized = skill_text.replace(";", ",")
-                            normalized = normalize_skills(normalized)
-                            for skill in [s.strip() for s in normalized.split(",") if s.strip()]:
-                                skill_start = text.find(skill, start, end)
-                                if skill_start != -1:
-                                    skill_end = skill_start + len(skill)
-                                    if 0 <= skill_start < skill_end <= len(text):
-                                        entity_spans.append((skill_start, skill_end, label))
-                        else:
-                            if 0 <= start < end <= len(text):
-                                entity_spans.append((start, end, label))
-                else:
-                    for point in annotation["points"]:
-                        if not isinstance(point, dict):
-                            continue
-                        start = int(point["start"])
-                        end = int(point["end"])
-                        if start is not None and end is not None:
-                            try:
-                                start, end = int(start), int(end)
-                                # Skip invalid ranges
-                                if not (0 <= start < end <= len(text)):
-                                    continue
-                                entity_spans.append((start, end, label))
-                            except (ValueError, TypeError):
-                                continue
-            data.append((text, {"entities": entity_spans}))
-    print(data[0])
-
-    data2 = []
-    json_data = json.load(open(Path(path2)))
-    
-    for cv in json_data:
-            
-        text = cv[0]
-        entities = cv[1]['entities']
-        entity_spans = []
-        for annotation in entities:
-            # Safely extract label
-            label = annotation[2]
-            if label in exclude_entities:
-                continue
+    data = read_records(path1, "dataturks", exclude_entities=exclude_entities,
+                        split_skill_entities=split_skill_entities)
+    print(next(data))
 
-            point={"start":annotation[0],"end":annotation[1]}
-            
-            
-            if not isinstance(point, dict):
-                continue
-            start = int(point["start"])
-            end = int(point["end"])
-            if start is not None and end is not None:
-                try:
-                    start, end = int(start), int(end)
-                    # Skip invalid ranges
-                    if not (0 <= start < end <= len(text)):
-                        continue
-                    entity_spans.append((start, end, label))
-                except (ValueError, TypeError):
-                    continue
-        data2.append((text, {"entities": entity_spans}))
+    data2 = read_records(path2, "spacy_json", exclude_entities=exclude_entities)
 
     print("******************")
     print("******************")
@@ -403,7 +214,7 @@ def debug_data_comp(path1, path2,exclude_entities, split_skill_entities):
     print("******************")
     print("******************")
 
-    print(data2[0])
+    print(next(data2))
 
 
 
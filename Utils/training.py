@@ -0,0 +1,381 @@
+import argparse
+import hashlib
+import json
+import logging
+import random
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import spacy
+from spacy.cli.debug_data import debug_data
+from spacy.cli.init_config import init_config
+from spacy.schemas import ConfigSchemaTraining
+from spacy.tokens import DocBin
+from spacy.training import Corpus
+from spacy.training.initialize import init_nlp
+from spacy.training.loop import create_evaluation_callback, create_train_batches, train_while_improving
+from spacy.util import load_config, registry, resolve_dot_names
+from thinc.api import fix_random_seed
+
+import batching  # registers cv_parsing.batch_by_length_buckets.v1
+
+CONFIG_PATH = Path(r"C:\ML\CV-Parsing\config.cfg")
+TRAIN_PATH = Path(r"C:\ML\CV-Parsing\Data\augmented_training_data.spacy")
+DEV_PATH = Path(r"C:\ML\CV-Parsing\Data\dev.spacy")
+OUTPUT_DIR = Path(r"C:\ML\CV-Parsing\training_output")
+CHECKPOINT_DIR = "checkpoint"
+STATE_NAME = "state.json"
+LOG_NAME = "train_log.jsonl"
+
+# Deserialized DocBins, shared by every pipeline in the process
+_docbin_cache = {}
+_docs_cache = {}
+
+
+def _load_docbin(path):
+    path = Path(path).resolve()
+    key = (str(path), path.stat().st_mtime_ns)
+    if key not in _docbin_cache:
+        _docbin_cache[key] = DocBin().from_disk(path)
+    return key, _docbin_cache[key]
+
+
+class CachedCorpus(Corpus):
+    """
+    spacy.Corpus.v1 that reads each .spacy file once per process. The DocBin is
+    kept in memory and its docs are kept per vocab, so debug-data, every training
+    epoch, every evaluation and the final evaluation reuse the same corpus instead
+    of re-reading and re-deserializing it.
+    """
+
+    def read_docbin(self, vocab, locs):
+        i = 0
+        for loc in locs:
+            loc = Path(loc)
+            if not loc.name.endswith(".spacy"):
+                continue
+            key, doc_bin = _load_docbin(loc)
+            docs_key = (key, id(vocab))
+            if docs_key not in _docs_cache:
+                _docs_cache[docs_key] = (vocab, [doc for doc in doc_bin.get_docs(vocab) if len(doc)])
+            for doc in _docs_cache[docs_key][1]:
+                yield doc
+                i += 1
+                if self.limit >= 1 and i >= self.limit:
+                    break
+
+
+@registry.readers("cv_parsing.CachedCorpus.v1")
+def create_cached_corpus(path, gold_preproc=False, max_length=0, limit=0, augmenter=None):
+    return CachedCorpus(path, gold_preproc=gold_preproc, max_length=max_length, limit=limit, augmenter=augmenter)
+
+
+def clear_corpus_cache():
+    _docbin_cache.clear()
+    _docs_cache.clear()
+
+
+def config_overrides(train_path, dev_path, overrides=None):
+    """Paths plus the in-memory corpus reader for both corpora, on top of `overrides`."""
+    return {
+        "paths.train": str(train_path),
+        "paths.dev": str(dev_path),
+        "corpora.train.@readers": "cv_parsing.CachedCorpus.v1",
+        "corpora.dev.@readers": "cv_parsing.CachedCorpus.v1",
+        **(overrides or {}),
+    }
+
+
+def ensure_config(config_path, lang="en", pipeline=("ner",)):
+    """Write a default config (like `spacy init config`) when `config_path` does not exist."""
+    config_path = Path(config_path)
+    if not config_path.exists():
+        init_config(lang=lang, pipeline=list(pipeline)).to_disk(config_path)
+        logging.info(f"Wrote default config to {config_path}")
+    return config_path
+
+
+def run_debug_data(config_path, train_path, dev_path, overrides=None):
+    """`spacy debug data` in-process; returns False when the data has errors."""
+    try:
+        debug_data(Path(config_path), config_overrides=config_overrides(train_path, dev_path, overrides))
+    except SystemExit as e:
+        return not e.code
+    return True
+
+
+class JsonlTrainLogger:
+    """
+    Structured training log: one JSON object per line, a "step" event after every
+    update (losses, words/sec) and an "eval" event with the scores whenever the dev
+    set is evaluated, with the batcher's padding stats when it keeps any. Lines
+    are flushed as they are written, so the file can be tailed while training runs.
+    """
+
+    def __init__(self, path, log_every=50):
+        self.path = Path(path)
+        self.log_every = log_every
+        self._f = open(self.path, "a", encoding="utf-8")
+        self._last = (time.perf_counter(), 0)
+
+    def _write(self, event):
+        self._f.write(json.dumps(event) + "\n")
+        self._f.flush()
+
+    def step(self, step, info, step_losses):
+        now = time.perf_counter()
+        last_time, last_words = self._last
+        words_per_sec = (info["words"] - last_words) / max(now - last_time, 1e-9)
+        self._last = (now, info["words"])
+        self._write({"event": "step", "step": step, "epoch": info["epoch"], "losses": step_losses,
+                     "words": info["words"], "words_per_sec": round(words_per_sec, 1),
+                     "seconds": info["seconds"]})
+        if self.log_every and step % self.log_every == 0:
+            losses = ", ".join(f"{name} {loss:.2f}" for name, loss in step_losses.items())
+            logging.info(f"step {step} epoch {info['epoch']}: {losses} ({words_per_sec:.0f} words/s)")
+
+    def evaluation(self, step, info, is_best, batcher_stats=None):
+        scores = {key: value for key, value in info["other_scores"].items()
+                  if isinstance(value, (int, float, dict))}
+        event = {"event": "eval", "step": step, "epoch": info["epoch"], "score": info["score"],
+                 "best": bool(is_best), "scores": scores}
+        if batcher_stats is not None:
+            event["batcher"] = batcher_stats.to_dict()
+        self._write(event)
+        logging.info(f"step {step} eval: score {info['score']:.4f}"
+                     f"{' (best)' if is_best else ''}, ents_f {scores.get('ents_f', 0.0):.4f}")
+
+    def close(self):
+        self._f.close()
+
+
+def save_checkpoint(nlp, output_dir, state, optimizer=None):
+    """Save the pipeline and the loop state (step, epoch, scores, rng states) under output_dir/checkpoint."""
+    checkpoint = Path(output_dir) / CHECKPOINT_DIR
+    tmp = checkpoint.with_name(CHECKPOINT_DIR + ".tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    if optimizer is not None and optimizer.averages:
+        with nlp.use_params(optimizer.averages):
+            nlp.to_disk(tmp)
+    else:
+        nlp.to_disk(tmp)
+    state = dict(state, python_random=random.getstate(), numpy_random=np.random.get_state())
+    with open(tmp / STATE_NAME, "w", encoding="utf-8") as f:
+        json.dump(state, f, default=lambda value: value.tolist() if hasattr(value, "tolist") else str(value))
+    if checkpoint.exists():
+        shutil.rmtree(checkpoint)
+    tmp.rename(checkpoint)
+    return checkpoint
+
+
+def _path_id(path):
+    path = Path(path).resolve()
+    stat = path.stat() if path.exists() else None
+    return {"path": str(path), "size": stat.st_size if stat else None, "mtime_ns": stat.st_mtime_ns if stat else None}
+
+
+def run_identity(config_path, train_path, dev_path, overrides=None):
+    """
+    What a run trains on: the config file (path and content hash), the train/dev
+    corpora (path, size, mtime) and the config overrides. Stored with every
+    checkpoint so a different run is never resumed from it.
+    """
+    return {
+        "config": str(Path(config_path).resolve()),
+        "config_sha256": hashlib.sha256(Path(config_path).read_bytes()).hexdigest(),
+        "train": _path_id(train_path),
+        "dev": _path_id(dev_path),
+        "overrides": json.loads(json.dumps(overrides or {}, sort_keys=True, default=str)),
+    }
+
+
+def mark_completed(output_dir):
+    """Flag the checkpoint of a finished run, so it is not resumed."""
+    state_path = Path(output_dir) / CHECKPOINT_DIR / STATE_NAME
+    if not state_path.exists():
+        return
+    with open(state_path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    state["completed"] = True
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+
+def load_checkpoint(output_dir, overrides, identity=None):
+    """
+    (nlp, state) from output_dir/checkpoint, or None when there is no checkpoint.
+    Raises ValueError when the checkpoint belongs to a finished run, or to a run
+    with another config, corpus or overrides than `identity` (see run_identity).
+    """
+    checkpoint = Path(output_dir) / CHECKPOINT_DIR
+    if not (checkpoint / STATE_NAME).exists():
+        return None
+    with open(checkpoint / STATE_NAME, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("completed"):
+        raise ValueError(f"{checkpoint} is from a finished run; train with resume=False (--no-resume) "
+                         "or another output directory to start over")
+    if identity is not None and state.get("run") != identity:
+        raise ValueError(f"{checkpoint} was trained with another config, corpus or overrides "
+                         f"({state.get('run')}); train with resume=False (--no-resume) to start over")
+    nlp = spacy.load(checkpoint, config=overrides)
+    random.setstate(tuple(tuple(item) if isinstance(item, list) else item for item in state["python_random"]))
+    numpy_state = state["numpy_random"]
+    np.random.set_state((numpy_state[0], np.array(numpy_state[1], dtype=np.uint32), *numpy_state[2:]))
+    return nlp, state
+
+
+def train(config_path, output_dir, train_path, dev_path, overrides=None, resume=True, log_every=50):
+    """
+    Train a pipeline in this process with spacy.training.loop.train_while_improving,
+    the same loop as `spacy train`. Progress goes to output_dir/train_log.jsonl (see
+    JsonlTrainLogger). The pipeline and loop state are checkpointed at every
+    evaluation; with `resume`, an interrupted run restarts from its last checkpoint
+    with the learning-rate schedule advanced to that step (the Adam moments are
+    not restored). A checkpoint is only resumed by the same run (see
+    run_identity) and never once the run has finished. model-best / model-last
+    are written like `spacy train` does. Returns the trained nlp.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    identity = run_identity(config_path, train_path, dev_path, overrides)
+    overrides = config_overrides(train_path, dev_path, overrides)
+
+    restored = load_checkpoint(output_dir, overrides, identity) if resume else None
+    if restored is None:
+        # A checkpoint of an earlier run must not be resumed if this one stops before its first evaluation
+        shutil.rmtree(output_dir / CHECKPOINT_DIR, ignore_errors=True)
+        nlp = init_nlp(load_config(config_path, overrides=overrides, interpolate=False))
+        state = {"step": 0, "epoch": 0, "checkpoints": []}
+    else:
+        nlp, state = restored
+        logging.info(f"Resuming from {output_dir / CHECKPOINT_DIR} at step {state['step']}")
+
+    config = nlp.config.interpolate()
+    if restored is None and config["training"]["seed"] is not None:
+        fix_random_seed(config["training"]["seed"])
+    T = registry.resolve(config["training"], schema=ConfigSchemaTraining)
+    train_corpus, dev_corpus = resolve_dot_names(config, [T["train_corpus"], T["dev_corpus"]])
+    optimizer = T["optimizer"]
+    for _ in range(state["step"]):
+        optimizer.step_schedules()
+    max_steps = T["max_steps"] - state["step"] if T["max_steps"] else 0
+    if T["max_steps"] and max_steps <= 0:
+        logging.info("Checkpoint already reached max_steps")
+        mark_completed(output_dir)
+        return nlp
+
+    steps = train_while_improving(
+        nlp,
+        optimizer,
+        create_train_batches(nlp, train_corpus, T["batcher"], T["max_epochs"]),
+        create_evaluation_callback(nlp, dev_corpus, T["score_weights"]),
+        dropout=T["dropout"],
+        accumulate_gradient=T["accumulate_gradient"],
+        patience=T["patience"],
+        max_steps=max_steps,
+        eval_frequency=T["eval_frequency"],
+        exclude=T["frozen_components"],
+        annotating_components=T["annotating_components"],
+        before_update=T["before_update"],
+    )
+    train_logger = JsonlTrainLogger(output_dir / LOG_NAME, log_every)
+    logging.info(f"Pipeline: {nlp.pipe_names}, initial learn rate: {optimizer.learn_rate}")
+    best_score = max((score for score, _ in state["checkpoints"]), default=None)
+    previous_losses = {}
+    try:
+        for _, info, is_best_checkpoint in steps:
+            step = state["step"] + info["step"]
+            # info["losses"] accumulates until the next evaluation; log what this step added
+            step_losses = {name: float(loss - previous_losses.get(name, 0.0)) for name, loss in info["losses"].items()}
+            previous_losses = dict(info["losses"])
+            train_logger.step(step, info, step_losses)
+            if is_best_checkpoint is None:
+                continue
+            previous_losses = {}
+            is_best = best_score is None or info["score"] > best_score
+            if is_best:
+                best_score = info["score"]
+            train_logger.evaluation(step, info, is_best, getattr(T["batcher"], "stats", None))
+            save_checkpoint(nlp, output_dir, {
+                "run": identity,
+                "step": step + 1,
+                "epoch": state["epoch"] + info["epoch"],
+                "checkpoints": state["checkpoints"] + [[score, state["step"] + s] for score, s in info["checkpoints"]],
+            }, optimizer)
+            if is_best:
+                shutil.rmtree(output_dir / "model-best", ignore_errors=True)
+                shutil.copytree(output_dir / CHECKPOINT_DIR, output_dir / "model-best",
+                                ignore=shutil.ignore_patterns(STATE_NAME))
+    finally:
+        train_logger.close()
+    mark_completed(output_dir)
+    if optimizer.averages:
+        with nlp.use_params(optimizer.averages):
+            nlp.to_disk(output_dir / "model-last")
+    else:
+        nlp.to_disk(output_dir / "model-last")
+    logging.info(f"Saved pipeline to {output_dir / 'model-last'}")
+    return nlp
+
+
+def evaluate_pipeline(nlp, dev_path, metrics_path=None):
+    """
+    Score `nlp` (a Language or a path) on a .spacy file with the in-memory corpus,
+    like `spacy evaluate`. Writes the scores to `metrics_path` when given.
+    """
+    if not isinstance(nlp, spacy.language.Language):
+        nlp = spacy.load(nlp)
+    examples = list(CachedCorpus(dev_path)(nlp))
+    start = time.perf_counter()
+    scores = nlp.evaluate(examples)
+    scores["speed"] = sum(len(eg) for eg in examples) / (time.perf_counter() - start)
+    if metrics_path is not None:
+        with open(metrics_path, "w", encoding="utf-8") as f:
+            json.dump(scores, f, indent=2)
+    return scores
+
+
+def run_training(config_path, output_dir, train_path, dev_path, overrides=None, resume=True, debug=True,
+                 metrics_path=None):
+    """debug-data, train and evaluate model-best in one process, sharing the loaded corpora."""
+    if debug and not run_debug_data(config_path, train_path, dev_path, overrides):
+        logging.warning("spacy debug data reported errors, training anyway")
+    train(config_path, output_dir, train_path, dev_path, overrides, resume)
+    best = Path(output_dir) / "model-best"
+    scores = evaluate_pipeline(best if best.exists() else Path(output_dir) / "model-last", dev_path, metrics_path)
+    logging.info(f"Dev scores: ents_f {scores.get('ents_f', 0.0):.4f}, "
+                 f"ents_p {scores.get('ents_p', 0.0):.4f}, ents_r {scores.get('ents_r', 0.0):.4f}")
+    return scores
+
+
+def _parse_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Train and evaluate the NER pipeline in-process.")
+    parser.add_argument("--config", type=Path, default=CONFIG_PATH)
+    parser.add_argument("--output", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--train", type=Path, default=TRAIN_PATH)
+    parser.add_argument("--dev", type=Path, default=DEV_PATH)
+    parser.add_argument("--metrics", type=Path, default=None, help="write the dev scores of model-best here")
+    parser.add_argument("--no-resume", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--no-debug", action="store_true", help="skip spacy debug data")
+    parser.add_argument("--set", nargs=2, action="append", default=[], metavar=("KEY", "VALUE"),
+                        help="config override, e.g. --set training.max_steps 2000")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = _parse_args()
+    overrides = {key: _parse_value(value) for key, value in args.set}
+    run_training(args.config, args.output, args.train, args.dev, overrides, resume=not args.no_resume,
+                 debug=not args.no_debug, metrics_path=args.metrics)
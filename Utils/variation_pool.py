@@ -0,0 +1,113 @@
+import json
+from collections import Counter
+from collections.abc import Sequence
+from itertools import accumulate
+
+from entity_variations import SUBSTITUTION_RATES, build_variations, extract_entities_of_type
+
+POOLS_VERSION = 1
+
+
+class VariationPool(Sequence):
+    """
+    Deduplicated replacement strings for one label. Without weights, sample()
+    is rng.choice over the items; with weights, the cumulative weights are
+    computed once so each draw is a single bisect (random.choices with
+    cum_weights). A pool is a read-only sequence, so it can be passed anywhere
+    a list of variations was used before.
+    """
+
+    def __init__(self, items, weights=None, swap_rate=None):
+        # Probability of swapping an entity of this label; None keeps SUBSTITUTION_RATES
+        self.swap_rate = swap_rate
+        if weights is None:
+            self.items = list(dict.fromkeys(items))
+            self.cum_weights = None
+        else:
+            # Duplicates pool their weight on the first occurrence
+            merged = {}
+            for item, weight in zip(items, weights):
+                merged[item] = merged.get(item, 0.0) + float(weight)
+            self.items = list(merged)
+            self.cum_weights = list(accumulate(merged.values()))
+        self._members = frozenset(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def __contains__(self, item):
+        return item in self._members
+
+    def sample(self, rng):
+        if self.cum_weights is None:
+            return rng.choice(self.items)
+        return rng.choices(self.items, cum_weights=self.cum_weights)[0]
+
+    def sample_many(self, rng, k):
+        if self.cum_weights is None:
+            return [rng.choice(self.items) for _ in range(k)]
+        return rng.choices(self.items, cum_weights=self.cum_weights, k=k)
+
+    def to_dict(self):
+        return {"items": self.items, "cum_weights": self.cum_weights, "swap_rate": self.swap_rate}
+
+    @classmethod
+    def from_dict(cls, data):
+        pool = cls(data["items"], swap_rate=data.get("swap_rate"))
+        pool.cum_weights = data["cum_weights"]
+        return pool
+
+
+def rarity_weights(items, texts):
+    """Weight 1 / (1 + occurrences in `texts`): variations the corpus already has plenty of are drawn less."""
+    seen = Counter(texts)
+    return [1.0 / (1 + seen[item]) for item in items]
+
+
+def label_swap_rates(data, rates):
+    """
+    Raise the swap rate of rare labels: a label's base rate in `rates` moves
+    towards 1 in proportion to how far its corpus count is below the most
+    frequent label's, so the replicas vary rare labels more often.
+    """
+    counts = {label: len(extract_entities_of_type(data, label)) for label in rates}
+    ceiling = max(counts.values(), default=0)
+    if not ceiling:
+        return dict(rates)
+    return {label: rate + (1.0 - rate) * (1.0 - counts[label] / ceiling) for label, rate in rates.items()}
+
+
+def build_variation_pools(data, fake, gazetteer=None, weighting=None, label_rarity=False):
+    """
+    Build the VariationPool of every swappable label once (see build_variations).
+    weighting="rarity" favours variations that are rare in the corpus;
+    label_rarity swaps entities of rare labels more often (see label_swap_rates).
+    """
+    swap_rates = label_swap_rates(data, SUBSTITUTION_RATES) if label_rarity else {}
+    pools = {}
+    for label, items in build_variations(data, fake, gazetteer).items():
+        weights = None
+        if weighting == "rarity":
+            weights = rarity_weights(items, extract_entities_of_type(data, label))
+        elif weighting is not None:
+            raise ValueError(f"Unknown weighting '{weighting}', expected 'rarity' or None")
+        pools[label] = VariationPool(items, weights, swap_rates.get(label))
+    return pools
+
+
+def save_variation_pools(pools, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": POOLS_VERSION, "pools": {label: pool.to_dict() for label, pool in pools.items()}},
+                  f, ensure_ascii=False)
+    return path
+
+
+def load_variation_pools(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != POOLS_VERSION:
+        raise ValueError(f"{path} holds version {data.get('version')} pools, expected {POOLS_VERSION}")
+    return {label: VariationPool.from_dict(pool) for label, pool in data["pools"].items()}
@@ -3,35 +3,26 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from collections import Counter
 import os
-def visualize_data():
+from readers import read_records
+# Path to your annotated resume data
+DATA_PATH = r"C:\ML\CV-Parsing\Data\augmented_train_data.json"
+
+
+def visualize_data(data_path=DATA_PATH, fmt="augmented_json"):
     """
     Visualize entity distribution and lengths in the annotated resume data.
+    `fmt` is any format registered in readers (e.g. "augmented_jsonl").
     """
-    # Path to your annotated resume data
-    DATA_PATH = r"C:\ML\CV-Parsing\Data\augmented_train_data.json"
-
     # Load data
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        data = [json.loads(line) for line in f if line.strip()]
+    data = list(read_records(data_path, fmt))
 
     # Extract entities
     entity_counts = Counter()
     entity_lengths = []
-    for item in data:
-        for annotation in item.get("annotation", []):
-            label = annotation.get("label")
-            if isinstance(label, list):
-                if not label:
-                    continue  # skip if label list is empty
-                label = label[0]
-            if not isinstance(label, str):
-                continue  # skip if label is not a string
-            for point in annotation.get("points", []):
-                start = point.get("start")
-                end = point.get("end")
-                if start is not None and end is not None:
-                    entity_counts[label] += 1
-                    entity_lengths.append(end - start)
+    for text, entities in data:
+        for start, end, label in entities:
+            entity_counts[label] += 1
+            entity_lengths.append(end - start)
 
     # Plot entity type distribution
     plt.figure(figsize=(10,6))
@@ -55,23 +46,11 @@ def visualize_data():
     # Show the most frequent value for each entity type
     from collections import defaultdict
     entity_value_counts = defaultdict(Counter)
-    for item in data:
-        text = item.get("content", "")
-        for annotation in item.get("annotation", []):
-            label = annotation.get("label")
-            if isinstance(label, list):
-                if not label:
-                    continue
-                label = label[0]
-            if not isinstance(label, str):
-                continue
-            for point in annotation.get("points", []):
-                start = point.get("start")
-                end = point.get("end")
-                if start is not None and end is not None:
-                    value = text[start:end].strip()
-                    if value:
-                        entity_value_counts[label][value] += 1
+    for text, entities in data:
+        for start, end, label in entities:
+            value = text[start:end].strip()
+            if value:
+                entity_value_counts[label][value] += 1
 
     # Prepare data for plotting
     labels = []
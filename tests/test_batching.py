@@ -0,0 +1,91 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Utils"))
+
+import spacy  # noqa: E402
+from spacy.tokens import Doc, Span  # noqa: E402
+from spacy.training import Example  # noqa: E402
+
+from batching import PaddingStats, minibatch_by_length_buckets, window_bounds, window_item  # noqa: E402
+
+LABELS = ["Skills", "Designation", "Companies worked at"]
+
+
+def random_doc(vocab, rng, n_tokens, max_ent=4):
+    doc = Doc(vocab, words=[f"w{i}" for i in range(n_tokens)])
+    ents, i = [], 0
+    while i < n_tokens:
+        if rng.random() < 0.3:
+            end = min(n_tokens, i + rng.randrange(1, max_ent + 1))
+            ents.append(Span(doc, i, end, label=rng.choice(LABELS)))
+            i = end
+        else:
+            i += 1
+    doc.ents = ents
+    return doc
+
+
+def entity_tokens(docs):
+    """(label, token texts) of every entity, in order, across `docs`."""
+    return [(ent.label_, [token.text for token in ent]) for doc in docs for ent in doc.ents]
+
+
+def test_window_bounds_cover_doc_without_cutting_entities():
+    rng = random.Random(0)
+    vocab = spacy.blank("en").vocab
+    for _ in range(200):
+        doc = random_doc(vocab, rng, rng.randrange(1, 120))
+        max_length = rng.randrange(5, 40)
+        bounds = window_bounds(doc, max_length)
+        assert bounds[0][0] == 0 and bounds[-1][1] == len(doc)
+        assert all(end == next_start for (_, end), (next_start, _) in zip(bounds, bounds[1:]))
+        assert all(0 < end - start <= max_length for start, end in bounds)
+        assert all(doc[start].ent_iob_ != "I" for start, _ in bounds)
+
+
+def test_entity_longer_than_window_is_cut():
+    doc = Doc(spacy.blank("en").vocab, words=[f"w{i}" for i in range(12)])
+    doc.ents = [Span(doc, 1, 11, label="Skills")]
+    assert window_bounds(doc, 4) == [(0, 4), (4, 8), (8, 12)]
+
+
+def test_window_item_keeps_tokens_and_entities():
+    rng = random.Random(1)
+    nlp = spacy.blank("en")
+    for _ in range(100):
+        doc = random_doc(nlp.vocab, rng, rng.randrange(1, 150))
+        windows = window_item(doc, 20)
+        assert [token.text for window in windows for token in window] == [token.text for token in doc]
+        assert entity_tokens(windows) == entity_tokens([doc])
+
+        example = Example(nlp.make_doc(doc.text), doc)
+        windows = window_item(example, 20)
+        assert all(len(window.reference) <= 20 for window in windows)
+        assert entity_tokens(window.reference for window in windows) == entity_tokens([doc])
+        assert [token.text for window in windows for token in window.predicted] == [token.text for token in doc]
+
+
+def test_window_item_rebuilds_predicted_with_other_tokenization():
+    nlp = spacy.blank("en")
+    reference = Doc(nlp.vocab, words=["New York", "is", "big", "and", "old"], spaces=[True] * 4 + [False])
+    reference.ents = [Span(reference, 0, 1, label="Location")]
+    example = Example(nlp.make_doc(reference.text), reference)
+    windows = window_item(example, 2)
+    assert [[token.text for token in window.predicted] for window in windows] == [
+        ["New York", "is"], ["big", "and"], ["old"]]
+    assert [window.reference.text for window in windows] == ["New York is ", "big and ", "old"]
+
+
+def test_batcher_keeps_every_token_within_budget():
+    rng = random.Random(2)
+    vocab = spacy.blank("en").vocab
+    docs = [random_doc(vocab, rng, rng.randrange(0, 300)) for _ in range(200)]
+    stats = PaddingStats()
+    batches = list(minibatch_by_length_buckets(docs, size=256, buffer=64, max_length=64, stats=stats,
+                                               report_every=0))
+    assert all(max(len(doc) for doc in batch) * len(batch) <= 256 for batch in batches)
+    assert sum(len(doc) for batch in batches for doc in batch) == sum(len(doc) for doc in docs)
+    assert sorted(ent for batch in batches for ent in entity_tokens(batch)) == sorted(entity_tokens(docs))
+    assert stats.batches == len(batches) and stats.windowed == sum(len(doc) > 64 for doc in docs)
@@ -0,0 +1,63 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Utils"))
+
+import spacy  # noqa: E402
+
+from chunking import chunk_spans, pipe_chunked  # noqa: E402
+
+PATTERNS = ["machine learning", "data scientist", "New York", "Bachelor of Technology", "Python"]
+FILLER = ["worked", "on", "the", "team", "at", "a", "company", "with", "projects", "and", "clients", "for", "years"]
+SEPARATORS = [" ", " ", " ", " ", ". ", "\n", "\n\n", " • ", "\nSKILLS "]
+
+
+def random_text(rng, n_words):
+    parts = []
+    for _ in range(n_words):
+        parts.append(rng.choice(PATTERNS) if rng.random() < 0.1 else rng.choice(FILLER))
+        parts.append(rng.choice(SEPARATORS))
+    return "".join(parts).strip()
+
+
+def test_short_text_is_one_window():
+    assert chunk_spans("short resume", max_chars=100) == [(0, 12)]
+    assert chunk_spans("", max_chars=100) == [(0, 0)]
+
+
+def test_windows_cover_the_text():
+    rng = random.Random(0)
+    for _ in range(200):
+        text = random_text(rng, rng.randrange(1, 400))
+        max_chars, overlap = rng.choice([(200, 40), (500, 100), (80, 0)])
+        spans = chunk_spans(text, max_chars, overlap)
+        assert spans[0][0] == 0 and spans[-1][1] == len(text)
+        for (start, end), (next_start, _) in zip(spans, spans[1:]):
+            assert start < next_start <= end
+            assert end - next_start <= overlap
+        assert all(0 < end - start <= max_chars for start, end in spans)
+
+
+def test_cut_prefers_section_boundary():
+    text = "a" * 60 + "\n\n" + "word " * 30
+    spans = chunk_spans(text, max_chars=100, overlap=0)
+    assert spans[0] == (0, 62)
+
+
+def test_unbreakable_text_is_cut_hard():
+    assert chunk_spans("x" * 250, max_chars=100, overlap=20) == [(0, 100), (100, 200), (200, 250)]
+
+
+def test_chunked_entities_match_whole_document():
+    nlp = spacy.blank("en")
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.add_patterns([{"label": "Skills", "pattern": pattern} for pattern in PATTERNS])
+    rng = random.Random(1)
+    items = [(random_text(rng, rng.randrange(1, 600)), i) for i in range(30)]
+
+    chunked = list(pipe_chunked(nlp, items, max_chars=300, overlap=60, batch_size=8))
+    assert [context for _, context, _ in chunked] == list(range(30))
+    for (text, _), (chunked_text, _, entities) in zip(items, chunked):
+        assert chunked_text == text
+        assert entities == [(ent.start_char, ent.end_char, ent.label_) for ent in nlp(text).ents]
@@ -0,0 +1,69 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Utils"))
+
+import spacy  # noqa: E402
+
+from contact_rules import EMAIL_LABEL, PHONE_LABEL, add_contact_rules, find_contacts  # noqa: E402
+
+EMAILS = ["jane.doe@example.com", "j_smith+cv@mail.co.uk", "a@b.io"]
+LINKS = ["indeed.com/r/Jane-Doe/0123456789abcdef", "https://www.indeed.com/r/Raj-Kumar/fedcba9876543210"]
+PHONES = ["+91 98765 43210", "(555) 123-4567", "9876543210", "+1-202-555-0143"]
+WORDS = ["Python", "engineer", "at", "Infosys", "2015", "-", "B.Tech", "Pune,", "Email:", "Phone:", "|", "12 years",
+         "v1.2.3", "ISO 9001"]
+
+
+def test_known_contacts():
+    text = "Jane Doe | jane.doe@example.com | +91 98765 43210 | indeed.com/r/Jane-Doe/0123456789abcdef"
+    assert find_contacts(text) == [
+        (11, 31, EMAIL_LABEL),
+        (34, 49, PHONE_LABEL),
+        (52, 90, EMAIL_LABEL),
+    ]
+
+
+def test_rejects_non_contacts():
+    assert find_contacts("Worked 2012 - 2016 at ACME, ISO 9001 certified, v1.2.3") == []
+    assert find_contacts("call 12345") == []
+    assert find_contacts("id ab9876543210 or 98765432101234567") == []
+    assert find_contacts("no domain@ here") == []
+
+
+def test_random_resumes_match_inserted_contacts():
+    rng = random.Random(0)
+    for _ in range(300):
+        tokens = []
+        for _ in range(rng.randrange(1, 60)):
+            roll = rng.random()
+            if roll < 0.05:
+                tokens.append((rng.choice(EMAILS), EMAIL_LABEL))
+            elif roll < 0.08:
+                tokens.append((rng.choice(LINKS), EMAIL_LABEL))
+            elif roll < 0.12:
+                tokens.append((rng.choice(PHONES), PHONE_LABEL))
+            else:
+                tokens.append((rng.choice(WORDS), None))
+        parts, expected, position = [], [], 0
+        for i, (token, label) in enumerate(tokens):
+            if label:
+                expected.append((position, position + len(token), label))
+            # A plain space would run a phone number into neighbouring digits
+            near_phone = label == PHONE_LABEL or (i + 1 < len(tokens) and tokens[i + 1][1] == PHONE_LABEL)
+            separator = rng.choice(["\n", " | ", ", "] if near_phone else [" ", " ", "\n", " | ", ", "])
+            parts.append(token + separator)
+            position += len(token) + len(separator)
+        assert find_contacts("".join(parts)) == expected
+
+
+def test_component_keeps_existing_entities():
+    nlp = spacy.blank("en")
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.add_patterns([{"label": "Name", "pattern": "Jane"}])
+    add_contact_rules(nlp)
+    doc = nlp("Jane jane.doe@example.com 9876543210")
+    assert [(ent.text, ent.label_) for ent in doc.ents] == [
+        ("Jane", "Name"), ("jane.doe@example.com", EMAIL_LABEL), ("9876543210", PHONE_LABEL)]
+    # Tokens outside the rule matches stay unset for ner
+    assert add_contact_rules(spacy.blank("en"))("hello")[0].ent_iob_ == ""
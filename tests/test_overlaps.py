@@ -0,0 +1,70 @@
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Utils"))
+
+import spacy  # noqa: E402
+
+from overlaps import filter_non_overlapping_offsets, filter_non_overlapping_spans, resolve_overlaps  # noqa: E402
+
+
+def set_based_filter(entities):
+    """The previous implementation: track every covered position in a set."""
+    filtered = []
+    covered = set()
+    for ent in sorted(entities, key=lambda e: (e[0], -e[1])):
+        positions = set(range(ent[0], ent[1]))
+        if not positions & covered:
+            filtered.append(ent)
+            covered.update(positions)
+    return filtered
+
+
+def random_entities(rng, n, length=60):
+    entities = []
+    for _ in range(n):
+        start = rng.randrange(length)
+        # Includes empty spans and duplicates
+        end = min(length, start + rng.randrange(0, 12))
+        entities.append((start, end, rng.choice(["Skills", "Name", "Degree"])))
+    return entities
+
+
+def test_offsets_match_set_based_filter():
+    rng = random.Random(0)
+    for _ in range(500):
+        entities = random_entities(rng, rng.randrange(0, 25))
+        assert filter_non_overlapping_offsets(entities) == set_based_filter(entities)
+
+
+def test_spans_match_set_based_filter():
+    rng = random.Random(0)
+    nlp = spacy.blank("en")
+    doc = nlp(" ".join(f"w{i}" for i in range(60)))
+    for _ in range(100):
+        entities = random_entities(rng, rng.randrange(0, 25))
+        spans = [doc[start:end] for start, end, _ in entities]
+        expected = set_based_filter([(span.start, span.end, i) for i, span in enumerate(spans)])
+        kept = filter_non_overlapping_spans(spans)
+        assert [(span.start, span.end) for span in kept] == [(start, end) for start, end, _ in expected]
+
+
+def test_resolve_overlaps_matches_per_document_filter():
+    rng = random.Random(1)
+    docs = [random_entities(rng, rng.randrange(0, 15)) for _ in range(50)]
+    starts = [ent[0] for ents in docs for ent in ents]
+    ends = [ent[1] for ents in docs for ent in ents]
+    offsets = np.cumsum([0] + [len(ents) for ents in docs])
+    keep = resolve_overlaps(starts, ends, offsets)
+
+    for i, ents in enumerate(docs):
+        kept = [ent for ent, k in zip(ents, keep[offsets[i]:offsets[i + 1]]) if k]
+        assert sorted(kept, key=lambda e: (e[0], -e[1])) == filter_non_overlapping_offsets(ents)
+
+
+def test_resolve_overlaps_single_document():
+    keep = resolve_overlaps([0, 2, 5, 5], [4, 6, 5, 8])
+    assert keep.tolist() == [True, False, True, True]
@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Utils"))
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("spacy_transformers")
+
+import spacy  # noqa: E402
+
+import quantization  # noqa: E402
+
+WORDS = ["senior", "data", "scientist", "at", "example", "corp", "python", "engineer", "jane", "doe"]
+TEXT = "Jane Doe, senior data scientist at Example Corp. Skills: Python"
+
+
+@pytest.fixture(scope="module")
+def fp32_pipeline(tmp_path_factory):
+    """A transformer + ner pipeline around a tiny randomly initialised BERT, saved to disk."""
+    root = tmp_path_factory.mktemp("quantization")
+    hf_dir = root / "tiny-bert"
+    hf_dir.mkdir()
+    vocab_file = hf_dir / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ".", ",", ":"] + WORDS) + "\n",
+                          encoding="utf-8")
+    transformers.BertTokenizerFast(vocab_file=str(vocab_file)).save_pretrained(hf_dir)
+    config = transformers.BertConfig(vocab_size=len(WORDS) + 8, hidden_size=32, num_hidden_layers=1,
+                                     num_attention_heads=2, intermediate_size=37, max_position_embeddings=64)
+    transformers.BertModel(config).save_pretrained(hf_dir)
+
+    nlp = spacy.blank("en")
+    nlp.add_pipe("transformer", config={"model": {"name": str(hf_dir)}})
+    ner = nlp.add_pipe("ner", config={"model": {
+        "@architectures": "spacy.TransitionBasedParser.v2",
+        "state_type": "ner",
+        "extra_state_tokens": False,
+        "hidden_width": 16,
+        "maxout_pieces": 2,
+        "use_upper": False,
+        "tok2vec": {
+            "@architectures": "spacy-transformers.TransformerListener.v1",
+            "grad_factor": 1.0,
+            "pooling": {"@layers": "reduce_mean.v1"},
+        },
+    }})
+    ner.add_label("Designation")
+    nlp.initialize()
+    nlp.to_disk(root / "fp32")
+    return root
+
+
+@pytest.mark.parametrize("backend", quantization.BACKENDS)
+def test_quantized_pipeline_round_trip(fp32_pipeline, backend):
+    if backend == "onnx":
+        pytest.importorskip("onnxruntime")
+    fp32_path = fp32_pipeline / "fp32"
+    int8_path = quantization.export_quantized(fp32_path, fp32_pipeline / f"int8-{backend}", backend=backend)
+
+    nlp = spacy.load(int8_path)
+    assert nlp.meta["quantization"]["backend"] == backend
+    hf_model = quantization._hf_shim(nlp.get_pipe("transformer"))._hfmodel.transformer
+    if backend == "torch":
+        assert any(isinstance(module, torch.ao.nn.quantized.dynamic.Linear) for module in hf_model.modules())
+    else:
+        assert hasattr(hf_model, "session")
+    doc = nlp(TEXT)
+    assert doc._.trf_data is not None
+
+    fp32_doc = spacy.load(fp32_path)(TEXT)
+    assert [token.text for token in doc] == [token.text for token in fp32_doc]
+
+    # A loaded int8 pipeline saves and reloads like any other
+    nlp.to_disk(fp32_pipeline / f"resaved-{backend}")
+    reloaded = spacy.load(fp32_pipeline / f"resaved-{backend}")
+    assert [token.text for token in reloaded(TEXT)] == [token.text for token in doc]
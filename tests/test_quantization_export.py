@@ -0,0 +1,71 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Utils"))
+
+import spacy  # noqa: E402
+from spacy.language import Language  # noqa: E402
+from spacy.util import load_config  # noqa: E402
+
+import quantization  # noqa: E402
+
+
+@pytest.fixture
+def transformer_pipeline(tmp_path):
+    """A saved blank pipeline whose config lists a `transformer` component (no torch needed)."""
+    path = tmp_path / "fp32"
+    nlp = spacy.blank("en")
+    nlp.meta["name"] = "cv_parser"
+    nlp.to_disk(path)
+    config = load_config(path / "config.cfg")
+    config["nlp"]["pipeline"] = ["transformer"]
+    config["components"]["transformer"] = {"factory": "transformer", "max_batch_items": 4096}
+    config.to_disk(path / "config.cfg")
+    (path / "transformer").mkdir()
+    (path / "transformer" / "cfg").write_text("{}", encoding="utf-8")
+    return path
+
+
+def test_factory_registered():
+    assert Language.has_factory("quantized_transformer")
+    defaults = Language.get_factory_meta("quantized_transformer").default_config
+    assert defaults["backend"] == "torch"
+    assert defaults["num_threads"] == 0
+
+
+def test_export_rewrites_config(transformer_pipeline, tmp_path):
+    out = quantization.export_quantized(transformer_pipeline, tmp_path / "int8", backend="torch", num_threads=2)
+
+    component = load_config(out / "config.cfg")["components"]["transformer"]
+    assert component["factory"] == "quantized_transformer"
+    assert component["backend"] == "torch"
+    assert component["num_threads"] == 2
+    assert component["max_batch_items"] == 4096
+    # The fp32 weights are copied as they are; quantization happens on load
+    assert (out / "transformer" / "cfg").exists()
+    assert load_config(transformer_pipeline / "config.cfg")["components"]["transformer"]["factory"] == "transformer"
+
+    meta = json.loads((out / "meta.json").read_text(encoding="utf-8"))
+    assert meta["name"] == "cv_parser_torch_int8"
+    assert meta["quantization"] == {"component": "transformer", "backend": "torch", "dtype": "qint8",
+                                    "source": str(transformer_pipeline)}
+
+
+def test_export_overwrites_previous_output(transformer_pipeline, tmp_path):
+    out = tmp_path / "int8"
+    quantization.export_quantized(transformer_pipeline, out)
+    (out / "stale.txt").write_text("old", encoding="utf-8")
+    quantization.export_quantized(transformer_pipeline, out)
+    assert not (out / "stale.txt").exists()
+
+
+def test_export_rejects_bad_input(transformer_pipeline, tmp_path):
+    with pytest.raises(ValueError):
+        quantization.export_quantized(transformer_pipeline, tmp_path / "int8", backend="fp16")
+    with pytest.raises(ValueError):
+        quantization.export_quantized(transformer_pipeline, transformer_pipeline)
+    with pytest.raises(ValueError):
+        quantization.export_quantized(transformer_pipeline, tmp_path / "int8", component="ner")
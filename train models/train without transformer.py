@@ -1,7 +1,9 @@
-import subprocess
+import sys
 import logging
 from pathlib import Path
-import spacy
+
+sys.path.append(r"C:\ML\CV-Parsing\Utils")
+from training import ensure_config, run_training
 
 
 train_output_path = Path(r"C:\ML\CV-Parsing\Data\augmented_training_data.spacy")  
@@ -12,45 +14,19 @@ logger = logging.getLogger(__name__)
 
 
 logger.info("Initializing spaCy config...")
-config_path = Path("./config.cfg")
-if not config_path.exists():
-    subprocess.run(
-        ["python", "-m", "spacy", "init", "config", "config.cfg", "--lang", "en", "--pipeline", "ner"],
-        check=True
-    )
+config_path = ensure_config(Path("./config.cfg"), lang="en", pipeline=["ner"])
 
 
-logger.info("Validating spaCy data...")
 logger.info(f"Training data path: {train_output_path}")
-
-result = subprocess.run(
-    ["python", "-m", "spacy", "debug", "data", 
-        "config.cfg", 
-        "--paths.train", train_output_path,
-        "--paths.dev", dev_output_path],
-    capture_output=True, text=True
-)
-
-
-logger.info("Starting spaCy training...")
+logger.info("Validating spaCy data, then training and evaluating in this process...")
 
 output_dir = Path(r"C:\ML\CV-Parsing\training_output")  # where the trained model will be saved
 output_dir.mkdir(parents=True, exist_ok=True)
 
-train_result = subprocess.run(
-    [
-        "python", "-m", "spacy", "train", "config.cfg",
-        "--output", str(output_dir),
-        "--paths.train", str(train_output_path),
-        "--paths.dev", str(dev_output_path)
-    ],
-    capture_output=True, text=True
-)
-
-if train_result.returncode == 0:
-    logger.info("Training completed successfully!")
-    logger.info(train_result.stdout)
-else:
-    logger.error("Training failed!")
-    logger.error(train_result.stderr)
-logger.info("Training process finished.")
\ No newline at end of file
+# debug data, training and evaluation share the loaded corpora; progress is streamed to
+# training_output/train_log.jsonl and an interrupted run resumes from training_output/checkpoint
+scores = run_training(config_path, output_dir, train_output_path, dev_output_path,
+                      metrics_path=output_dir / "metrics.json")
+
+logger.info("Training completed successfully!")
+logger.info("Training process finished.")